@@ -1,8 +1,7 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory, session
+from flask import Flask, request, jsonify, render_template, send_from_directory, session, Response, stream_with_context
 import os
 from dotenv import load_dotenv
 import json
-import re
 import requests
 # import boto3
 # from botocore.exceptions import NoCredentialsError
@@ -13,6 +12,10 @@ import base64
 import csv
 import traceback
 import tempfile
+from http_pool import get_session
+import jobs
+import payload_codec
+import upload_stream
 
 # .env 파일 로드
 load_dotenv()
@@ -21,6 +24,9 @@ app = Flask(__name__,
            static_folder='static')
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'solapi-secret-key-for-session')
 
+# 업로드 파일은 청크 단위로 임시 파일에 받으며 크기 제한과 SHA-256 계산을 수신 중에 처리
+upload_stream.init_app(app)
+
 # 디버그 로그 추가
 print("환경 변수:")
 print(f"DEBUG_MODE: {os.environ.get('DEBUG_MODE', '설정되지 않음')}")
@@ -42,6 +48,222 @@ if not os.path.exists(DATA_FOLDER):
 LAMBDA_FUNCTION_URL = os.environ.get('LAMBDA_FUNCTION_URL', '')
 print(f"Lambda Function URL: {LAMBDA_FUNCTION_URL}")
 
+# Lambda 실행 방식 ('http': Lambda 함수 URL 호출, 'local': 같은 프로세스에서 lambda_handler 직접 호출)
+EXECUTION_BACKEND = os.environ.get('EXECUTION_BACKEND', 'http').lower()
+print(f"Lambda 실행 방식: {EXECUTION_BACKEND}")
+
+# 업로드 파일 전달 방식 ('base64': JSON 본문에 base64로 포함, 's3': S3에 올리고 객체 키만 전달)
+UPLOAD_TRANSFER_MODE = os.environ.get('UPLOAD_TRANSFER_MODE', 'base64').lower()
+
+# 브라우저에서 S3로 직접 업로드(presigned POST) 허용 여부
+DIRECT_UPLOAD_ENABLED = os.environ.get('DIRECT_UPLOAD_ENABLED', 'False').lower() == 'true'
+DIRECT_UPLOAD_EXTENSIONS = ('xlsx', 'csv')
+
+# Lambda 호출용 공유 세션 (요청 간 keep-alive 연결 재사용)
+lambda_session = get_session('lambda')
+
+# Lambda 요청 본문 압축 방식 ('auto': Lambda가 지원을 알린 뒤부터 압축, 'gzip', 'zstd', 'none')
+# 응답 본문은 Accept-Encoding으로 협상하며 'none'이면 압축을 요청하지 않음
+LAMBDA_COMPRESSION = os.environ.get('LAMBDA_COMPRESSION', 'auto').lower()
+
+# Lambda가 응답 헤더로 알린 지원 압축 방식 (auto 모드에서 사용)
+lambda_accept_encoding = None
+
+# 백그라운드 작업에서 Lambda 호출 시 제한 시간(초)
+# 배포된 Lambda 제한 시간(lambda/serverless.yml의 timeout)과 같게 설정 - 늘릴 때는 둘을 함께 변경
+JOB_LAMBDA_TIMEOUT = int(os.environ.get('JOB_LAMBDA_TIMEOUT', '30'))
+
+# 백그라운드 대량 발송 작업에서 Lambda 1회 호출당 수신자 수 (배치마다 진행 상황 갱신)
+JOB_BATCH_SIZE = int(os.environ.get('JOB_BATCH_SIZE', '1000'))
+
+def use_local_backend():
+    """Lambda 처리를 같은 프로세스에서 실행하는지 확인합니다."""
+    return EXECUTION_BACKEND == 'local'
+
+def lambda_available():
+    """Lambda 처리를 호출할 수 있는지 확인합니다. (로컬 실행이거나 함수 URL이 설정된 경우)"""
+    return use_local_backend() or bool(LAMBDA_FUNCTION_URL)
+
+def file_field(file):
+    """
+    업로드 파일을 Lambda 요청의 파일 필드로 변환합니다.
+    로컬 실행은 원본 바이트(content)를, S3 전송 모드는 업로드 스트림을 S3에 올린 뒤 객체 키(s3Key)만 전달합니다.
+    수신 중 계산한 SHA-256(sha256)도 함께 전달합니다.
+    """
+    size, sha256 = upload_stream.file_info(file)
+    print(f"업로드 파일 수신: {file.filename}, 크기={size} bytes, sha256={sha256[:12]}...")
+    file.stream.seek(0)
+    
+    if use_local_backend():
+        return {'content': file.read(), 'filename': file.filename, 'sha256': sha256}
+    
+    if UPLOAD_TRANSFER_MODE == 's3':
+        from s3_helper import upload_fileobj_to_s3
+        success, message, s3_key = upload_fileobj_to_s3(file.stream, file.filename)
+        if not success:
+            raise RuntimeError(f'S3 업로드 실패: {message}')
+        print(f"업로드 파일 S3 전달: {file.filename} -> {s3_key}")
+        return {'s3Key': s3_key, 'filename': file.filename, 'sha256': sha256}
+    
+    return {'data': upload_stream.read_base64(file), 'filename': file.filename, 'sha256': sha256}
+
+def file_summary(file):
+    """테스트 모드 응답용 업로드 파일 정보 (파일명, 크기, SHA-256 - 원본 바이트나 S3 업로드 없이)"""
+    size, sha256 = upload_stream.file_info(file)
+    return {'filename': file.filename, 'size': size, 'sha256': sha256}
+
+def to_log_json(data):
+    """로그 출력용 JSON 문자열을 만듭니다. 원본 바이트는 크기만 표시합니다."""
+    return json.dumps(data, default=lambda obj: f"<{len(obj)} bytes>" if isinstance(obj, bytes) else str(obj))
+
+def lambda_request_encoding():
+    """Lambda 요청 본문에 사용할 압축 방식을 반환합니다. 압축하지 않으면 None."""
+    if LAMBDA_COMPRESSION in ('gzip', 'zstd'):
+        return LAMBDA_COMPRESSION
+    if LAMBDA_COMPRESSION == 'auto':
+        return payload_codec.choose_encoding(lambda_accept_encoding)
+    return None
+
+def post_to_lambda(lambda_data, timeout=None):
+    """Lambda 함수 URL에 요청을 보냅니다. 협상된 방식으로 요청 본문을 압축하고 압축 응답을 요청합니다."""
+    global lambda_accept_encoding
+    
+    body = json.dumps(lambda_data).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if LAMBDA_COMPRESSION != 'none':
+        headers['Accept-Encoding'] = payload_codec.accept_encoding_value()
+    
+    encoding = lambda_request_encoding()
+    if encoding and len(body) >= payload_codec.PAYLOAD_COMPRESSION_MIN_SIZE:
+        original_size = len(body)
+        body = payload_codec.compress(body, encoding)
+        # 압축 본문은 함수 URL에서 바이너리(base64)로 전달되도록 octet-stream으로 보냄
+        headers['Content-Type'] = 'application/octet-stream'
+        headers['Content-Encoding'] = encoding
+        print(f"Lambda 요청 본문 압축: {encoding}, {original_size} → {len(body)} bytes")
+    
+    response = lambda_session.post(LAMBDA_FUNCTION_URL, data=body, headers=headers, timeout=timeout)
+    
+    advertised = response.headers.get(payload_codec.ACCEPT_ENCODING_HEADER)
+    if advertised:
+        lambda_accept_encoding = advertised
+    return response
+
+def call_lambda(lambda_data, timeout=None, on_progress=None, error_prefix='Lambda 함수 호출 실패'):
+    """
+    Lambda 처리를 실행하고 (결과, HTTP 상태 코드)를 반환합니다.
+    로컬 실행이면 lambda_handler를 직접 호출하고 on_progress로 청크 진행 상황을 받습니다.
+    """
+    if use_local_backend():
+        # openpyxl 등 Lambda 처리 모듈은 로컬 실행일 때만 로드
+        import lambda_update
+        return lambda_update.lambda_handler(lambda_data, None, on_progress=on_progress), 200
+    
+    response = post_to_lambda(lambda_data, timeout)
+    
+    if response.status_code == 200:
+        content = payload_codec.decompress(response.content, response.headers.get('Content-Encoding'))
+        return json.loads(content), 200
+    
+    print(f"Lambda 응답: status_code={response.status_code}, text={response.text[:100]}...")
+    return {
+        'success': False,
+        'message': f'{error_prefix}: {response.text}'
+    }, response.status_code
+
+def wants_async(data=None):
+    """요청이 비동기 작업 방식(async=true)인지 확인합니다."""
+    value = request.args.get('async')
+    if value is None:
+        source = data if data is not None else request.form
+        value = source.get('async')
+    return is_flag_set(value)
+
+def is_flag_set(value):
+    """폼/JSON 요청의 선택 플래그 값이 참인지 확인합니다. ('1', 'true', 'yes' 또는 True)"""
+    return str(value or '').lower() in ('1', 'true', 'yes')
+
+def run_bulk_job(lambda_data, recipient_numbers, on_progress):
+    """
+    수신자 목록을 정제하고 중복을 제거한 뒤(배치를 나누기 전에 전체 목록 기준으로) JOB_BATCH_SIZE 단위로 나누어
+    Lambda를 호출하고, 배치가 끝날 때마다 누적 진행 상황을 on_progress로 전달합니다.
+    """
+    # 같은 번호가 다른 배치에 들어가 두 번 발송되지 않도록 전체 목록에서 먼저 중복 제거 (PhoneIndex)
+    # numpy/pandas를 쓰는 수신자 파이프라인은 Flask 시작 시간을 늘리지 않도록 필요할 때 로드
+    import recipient_pipeline
+    recipient_numbers, invalid_count, duplicate_count = recipient_pipeline.select_phone_list(recipient_numbers)
+    if not recipient_numbers:
+        return {'success': False, 'message': '유효한 수신번호가 없습니다.', 'invalidCount': invalid_count}
+    
+    total = len(recipient_numbers)
+    batch_count = (total + JOB_BATCH_SIZE - 1) // JOB_BATCH_SIZE
+    sent = 0
+    failed = 0
+    failed_list = []
+    
+    for batch_index, start in enumerate(range(0, total, JOB_BATCH_SIZE), 1):
+        batch = recipient_numbers[start:start + JOB_BATCH_SIZE]
+        batch_data = dict(lambda_data, recipients=json.dumps(batch))
+        
+        try:
+            result, _ = call_lambda(batch_data, timeout=JOB_LAMBDA_TIMEOUT)
+        except Exception as e:
+            result = {'success': False, 'message': str(e)}
+        
+        if result.get('success'):
+            # 실제로 발송한 건수 (Lambda에서 제외한 번호는 발송 건수에 포함하지 않음)
+            batch_total = result.get('total', len(batch))
+            batch_failed = result.get('failedCount', 0) or 0
+            failed_list.extend(result.get('failedList') or [])
+            invalid_count += result.get('invalidCount', 0) or 0
+            duplicate_count += result.get('duplicateCount', 0) or 0
+        else:
+            # 배치 전체 실패
+            batch_total = len(batch)
+            batch_failed = len(batch)
+            failed_list.extend({'to': r, 'reason': result.get('message', '발송 실패')} for r in batch)
+        
+        failed += batch_failed
+        sent += batch_total - batch_failed
+        on_progress({
+            'total': total,
+            'sent': sent,
+            'failed': failed,
+            'chunksDone': batch_index,
+            'chunkCount': batch_count
+        })
+    
+    return {
+        'success': True,
+        'total': sent + failed,
+        'failedCount': failed,
+        'failedList': failed_list,
+        'message': '대량 메시지가 성공적으로 발송되었습니다.',
+        'text': lambda_data.get('text'),
+        'invalidCount': invalid_count,
+        'duplicateCount': duplicate_count
+    }
+
+def submit_send_job(kind, lambda_data, total=None, runner=None):
+    """
+    발송 요청을 백그라운드 작업으로 등록하고 작업 ID를 즉시 반환합니다.
+    runner(job_id)를 주지 않으면 Lambda를 한 번 호출합니다. (로컬 실행이면 청크 진행 상황도 전달)
+    """
+    if runner is None:
+        runner = lambda job_id: call_lambda(
+            lambda_data, timeout=JOB_LAMBDA_TIMEOUT, on_progress=jobs.progress_callback(job_id)
+        )[0]
+    
+    job_id = jobs.submit_job(kind, runner, total=total)
+    return jsonify({
+        'success': True,
+        'jobId': job_id,
+        'status': 'queued',
+        'statusUrl': f'/api/jobs/{job_id}',
+        'eventsUrl': f'/api/jobs/{job_id}/events',
+        'message': '발송 작업이 등록되었습니다.'
+    }), 202
+
 # 템플릿 다운로드 경로
 BULK_TEMPLATE_PATH = os.path.join(DATA_FOLDER, 'sample_template.csv')
 AUTO_TEMPLATE_PATH = os.path.join(DATA_FOLDER, 'automation_template.xlsx')
@@ -86,7 +308,7 @@ def send_sms():
         DEBUG_MODE = os.environ.get('DEBUG_MODE', 'True').lower() == 'true'
         
         # Lambda 함수 URL이 비어 있는 경우 또는 디버깅 모드일 경우 테스트 응답 반환
-        if not LAMBDA_FUNCTION_URL or DEBUG_MODE:
+        if not lambda_available() or DEBUG_MODE:
             print("테스트 모드에서 실행 중입니다. 테스트 응답을 반환합니다.")
             return jsonify({
                 'success': True,
@@ -95,18 +317,9 @@ def send_sms():
             })
         
         # Lambda 함수 호출
-        print(f"Lambda 함수 호출: {LAMBDA_FUNCTION_URL}")
-        response = requests.post(LAMBDA_FUNCTION_URL, json=lambda_data)
-        print(f"Lambda 응답: status_code={response.status_code}, text={response.text[:100]}...")
-        
-        if response.status_code == 200:
-            result = response.json()
-            return jsonify(result)
-        else:
-            return jsonify({
-                'success': False,
-                'message': f'메시지 발송 실패: {response.text}'
-            }), response.status_code
+        print(f"Lambda 함수 호출: {EXECUTION_BACKEND}")
+        result, status_code = call_lambda(lambda_data, error_prefix='메시지 발송 실패')
+        return jsonify(result), status_code
         
     except Exception as e:
         print(f"오류 발생: {str(e)}")
@@ -133,39 +346,31 @@ def send_single():
             'message': message
         }
         
-        # 이미지가 있는 경우 처리
-        if image and image.filename:
-            image_data = base64.b64encode(image.read()).decode('utf-8')
-            lambda_data['image'] = {
-                'data': image_data,
-                'filename': image.filename
-            }
+        has_image = bool(image and image.filename)
         
         # 디버깅 모드 활성화
         DEBUG_MODE = os.environ.get('DEBUG_MODE', 'True').lower() == 'true'
         
-        # Lambda 함수 URL이 비어 있는 경우 또는 디버깅 모드일 경우 테스트 응답 반환
-        if not LAMBDA_FUNCTION_URL or DEBUG_MODE:
+        # Lambda 함수 URL이 비어 있는 경우 또는 디버깅 모드일 경우 테스트 응답 반환 (이미지는 정보만 표시, 업로드하지 않음)
+        if not lambda_available() or DEBUG_MODE:
             print("테스트 모드에서 실행 중입니다. 테스트 응답을 반환합니다.")
+            test_data = dict(lambda_data)
+            if has_image:
+                test_data['image'] = file_summary(image)
             return jsonify({
                 'success': True,
                 'message': '테스트 모드: 메시지가 성공적으로 발송된 것으로 처리됩니다.',
-                'test_data': lambda_data
+                'test_data': test_data
             })
         
-        # Lambda 함수 호출
-        print(f"Lambda 함수 호출: {LAMBDA_FUNCTION_URL}")
-        response = requests.post(LAMBDA_FUNCTION_URL, json=lambda_data)
-        print(f"Lambda 응답: status_code={response.status_code}, text={response.text[:100]}...")
+        # 이미지가 있는 경우 처리
+        if has_image:
+            lambda_data['image'] = file_field(image)
         
-        if response.status_code == 200:
-            result = response.json()
-            return jsonify(result)
-        else:
-            return jsonify({
-                'success': False,
-                'message': f'메시지 발송 실패: {response.text}'
-            }), response.status_code
+        # Lambda 함수 호출
+        print(f"Lambda 함수 호출: {EXECUTION_BACKEND}")
+        result, status_code = call_lambda(lambda_data, error_prefix='메시지 발송 실패')
+        return jsonify(result), status_code
         
     except Exception as e:
         print(f"오류 발생: {str(e)}")
@@ -254,18 +459,10 @@ def send_bulk():
         print(f"recipients JSON 예상 파싱 결과: {json.loads(lambda_data['recipients'])}")
         print("=" * 80)
         
-        # 이미지가 있는 경우 처리
-        if image and image.filename:
-            image_data = base64.b64encode(image.read()).decode('utf-8')
-            lambda_data['image'] = {
-                'data': image_data,
-                'filename': image.filename
-            }
-        
         # 디버깅 모드 활성화
         DEBUG_MODE = os.environ.get('DEBUG_MODE', 'True').lower() == 'true'
         
-        # 디버깅 모드일 경우 테스트 응답 반환
+        # 디버깅 모드일 경우 테스트 응답 반환 (이미지는 업로드하지 않음)
         if DEBUG_MODE:
             print("테스트 모드에서 실행 중입니다. 대량 메시지 발송 테스트 응답을 반환합니다.")
             total_count = len(recipient_numbers)
@@ -277,20 +474,23 @@ def send_bulk():
                 'failedCount': 0
             })
         
+        # 이미지가 있는 경우 처리
+        if image and image.filename:
+            lambda_data['image'] = file_field(image)
+        
+        # 비동기 작업 요청이면 작업 ID만 바로 반환
+        if wants_async():
+            # 로컬 실행은 청크 진행 상황을 직접 받으므로 배치로 나누지 않음
+            runner = None
+            if not use_local_backend():
+                runner = lambda job_id: run_bulk_job(lambda_data, recipient_numbers, jobs.progress_callback(job_id))
+            return submit_send_job('send_bulk', lambda_data, total=len(recipient_numbers), runner=runner)
+        
         # Lambda 함수 호출
-        print(f"Lambda 함수 호출: {LAMBDA_FUNCTION_URL}")
-        response = requests.post(LAMBDA_FUNCTION_URL, json=lambda_data)
-        print(f"Lambda 응답: status_code={response.status_code}, text={response.text}")
-        
-        if response.status_code == 200:
-            result = response.json()
-            print(f"Lambda 응답 파싱: {json.dumps(result, ensure_ascii=False)}")
-            return jsonify(result)
-        else:
-            return jsonify({
-                'success': False,
-                'message': f'메시지 발송 실패: {response.text}'
-            }), response.status_code
+        print(f"Lambda 함수 호출: {EXECUTION_BACKEND}")
+        result, status_code = call_lambda(lambda_data, error_prefix='메시지 발송 실패')
+        print(f"Lambda 응답 파싱: {json.dumps(result, ensure_ascii=False)}")
+        return jsonify(result), status_code
         
     except Exception as e:
         print(f"오류 발생: {str(e)}")
@@ -326,23 +526,17 @@ def upload_excel():
                 'recipients': test_recipients
             })
             
-        # Lambda 요청 데이터 준비
-        excel_data = base64.b64encode(file.read()).decode('utf-8')
-        
+        # Lambda 요청 데이터 준비 (이 API는 전체 수신자 목록을 반환하므로 fullPreview 요청)
         lambda_data = {
             'type': 'auto_excel_preview',
-            'excel': {
-                'data': excel_data,
-                'filename': file.filename
-            }
+            'excel': file_field(file),
+            'fullPreview': True
         }
         
         # Lambda 함수 호출
-        response = requests.post(LAMBDA_FUNCTION_URL, json=lambda_data)
+        result, status_code = call_lambda(lambda_data, error_prefix='엑셀 파일 처리 실패')
         
-        if response.status_code == 200:
-            result = response.json()
-            
+        if status_code == 200:
             # 결과 처리
             if result.get('success'):
                 recipients = result.get('recipients', [])
@@ -356,10 +550,7 @@ def upload_excel():
                     'message': result.get('message', '엑셀 파일 처리 실패')
                 }), 400
         else:
-            return jsonify({
-                'success': False,
-                'message': f'엑셀 파일 처리 실패: {response.text}'
-            }), response.status_code
+            return jsonify(result), status_code
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -368,14 +559,12 @@ def upload_excel():
 def send_excel():
     """엑셀 기반 메시지 발송 API"""
     try:
-        # 파일 확인
-        if 'file' not in request.files:
-            return jsonify({'success': False, 'message': '파일이 필요합니다.'}), 400
-            
-        file = request.files['file']
+        # 파일 확인 (미리보기에서 받은 준비된 캠페인 토큰이 있으면 파일 없이 발송)
+        file = request.files.get('file')
         image = request.files.get('image')
+        campaign_token = request.form.get('campaignToken')
         
-        if not file or not file.filename:
+        if (not file or not file.filename) and not campaign_token:
             return jsonify({'success': False, 'message': '파일이 필요합니다.'}), 400
             
         # 디버깅 모드 활성화
@@ -392,35 +581,61 @@ def send_excel():
             })
             
         # Lambda 요청 데이터 준비
-        excel_data = base64.b64encode(file.read()).decode('utf-8')
-        
-        lambda_data = {
-            'type': 'auto_excel_send',
-            'excel': {
-                'data': excel_data,
-                'filename': file.filename
-            }
-        }
+        lambda_data = {'type': 'auto_excel_send'}
+        if file and file.filename:
+            lambda_data['excel'] = file_field(file)
+        if campaign_token:
+            lambda_data['campaignToken'] = campaign_token
         
         # 이미지가 있는 경우 처리
         if image and image.filename:
-            image_data = base64.b64encode(image.read()).decode('utf-8')
-            lambda_data['image'] = {
-                'data': image_data,
-                'filename': image.filename
-            }
+            lambda_data['image'] = file_field(image)
+        
+        # 비동기 작업 요청이면 작업 ID만 바로 반환
+        if wants_async():
+            return submit_send_job('send_excel', lambda_data)
         
         # Lambda 함수 호출
-        response = requests.post(LAMBDA_FUNCTION_URL, json=lambda_data)
+        result, status_code = call_lambda(lambda_data, error_prefix='메시지 발송 실패')
+        return jsonify(result), status_code
         
-        if response.status_code == 200:
-            result = response.json()
-            return jsonify(result)
-        else:
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/upload-url', methods=['POST'])
+def upload_url():
+    """브라우저 직접 업로드용 presigned URL 발급 API"""
+    try:
+        if not DIRECT_UPLOAD_ENABLED:
+            # 프론트엔드는 이 응답을 받으면 기존 방식(서버 경유 업로드)으로 전송
+            return jsonify({'success': False, 'enabled': False, 'message': '직접 업로드가 비활성화되어 있습니다.'})
+        
+        data = request.get_json(silent=True) or {}
+        filename = data.get('filename', '')
+        file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        if file_ext not in DIRECT_UPLOAD_EXTENSIONS:
+            return jsonify({'success': False, 'message': 'XLSX 또는 CSV 형식의 파일만 지원합니다.'}), 400
+        
+        from s3_helper import generate_presigned_upload, PRESIGNED_UPLOAD_MAX_SIZE
+        size = int(data.get('size') or 0)
+        if size > PRESIGNED_UPLOAD_MAX_SIZE:
             return jsonify({
                 'success': False,
-                'message': f'메시지 발송 실패: {response.text}'
-            }), response.status_code
+                'message': f'파일 크기가 너무 큽니다. (최대 {PRESIGNED_UPLOAD_MAX_SIZE // (1024 * 1024)}MB)'
+            }), 413
+        
+        success, post, s3_key = generate_presigned_upload(filename)
+        if not success:
+            return jsonify({'success': False, 'message': f'업로드 URL 생성 실패: {post}'}), 500
+        
+        print(f"직접 업로드 URL 발급: {filename} -> {s3_key}")
+        return jsonify({
+            'success': True,
+            'enabled': True,
+            'url': post['url'],
+            'fields': post['fields'],
+            'key': s3_key
+        })
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -500,14 +715,9 @@ def parse_recipients_only():
             })
             
         # Lambda 요청 데이터 준비
-        excel_data = base64.b64encode(file.read()).decode('utf-8')
-        
         lambda_data = {
             'type': 'parse_recipients',
-            'excel': {
-                'data': excel_data,
-                'filename': file.filename
-            }
+            'excel': file_field(file)
         }
         
         # 추가: 메시지 내용이 있으면 Lambda 데이터에 추가
@@ -516,16 +726,8 @@ def parse_recipients_only():
             print(f"Lambda 요청에 text 필드 추가: '{text}'")
         
         # Lambda 함수 호출
-        response = requests.post(LAMBDA_FUNCTION_URL, json=lambda_data)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return jsonify(result)
-        else:
-            return jsonify({
-                'success': False,
-                'message': f'수신자 파싱 실패: {response.text}'
-            }), response.status_code
+        result, status_code = call_lambda(lambda_data, error_prefix='수신자 파싱 실패')
+        return jsonify(result), status_code
             
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -552,25 +754,21 @@ def parse_recipients_only_from_file(file, text=''):
                 'text': text  # 메시지 내용도 반환
             }
         
-        # 실제 CSV 파일 처리 로직
-        file.seek(0)  # 파일 포인터를 처음으로 되돌립니다
-        recipients = []
-        csv_reader = csv.reader(file.read().decode('utf-8').splitlines())
-        
-        for row in csv_reader:
-            if len(row) > 0:
-                phone_number = row[0].strip()
-                # 전화번호 형식 검증
-                if re.match(r'^\d{10,13}$', re.sub(r'[^0-9]', '', phone_number)):
-                    recipients.append(re.sub(r'[^0-9]', '', phone_number))
+        # 실제 CSV 파일 처리 로직 - 파일 전체를 메모리에 올리지 않고 한 줄씩 읽음 (A열 전화번호, 10~13자리)
+        file.stream.seek(0)  # 파일 포인터를 처음으로 되돌립니다
+        import recipient_pipeline
+        result = recipient_pipeline.parse_csv(file.stream, phone_index=0, has_header=False, max_digits=13)
         
-        if not recipients:
+        if not result['recipients']:
             return {'success': False, 'message': '파일에서 유효한 전화번호를 찾을 수 없습니다.'}
         
         return {
             'success': True,
-            'recipients': recipients,
-            'count': len(recipients),
+            'recipients': result['recipients'],
+            'count': result['count'],
+            'encoding': result['encoding'],
+            'invalidCount': result['invalidCount'],
+            'duplicateCount': result['duplicateCount'],
             'text': text  # 메시지 내용도 반환
         }
             
@@ -607,14 +805,8 @@ def lambda_api():
                     # 파일 확장자 확인
                     file_ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
                     
-                    # 파일 데이터를 base64로 인코딩
-                    file_data = base64.b64encode(file.read()).decode('utf-8')
-                    
-                    # 파일 정보 추가 - excel 필드로 변환
-                    data['excel'] = {
-                        'filename': file.filename,
-                        'data': file_data
-                    }
+                    # 파일 정보 추가 - excel 필드로 변환 (로컬 실행은 원본 바이트 그대로)
+                    data['excel'] = file_field(file)
                     print(f"'file' 필드를 'excel' 필드로 변환 완료: {file.filename}")
             
             # 이미지 처리
@@ -622,14 +814,8 @@ def lambda_api():
                 image = request.files['image']
                 if image and image.filename:
                     print(f"이미지 업로드 감지: {image.filename}")
-                    # 이미지 데이터를 base64로 인코딩
-                    image_data = base64.b64encode(image.read()).decode('utf-8')
-                    
                     # 이미지 정보 추가
-                    data['image'] = {
-                        'filename': image.filename,
-                        'data': image_data
-                    }
+                    data['image'] = file_field(image)
                     print(f"이미지 데이터 추가 완료: {image.filename}")
         
         # get_template 요청인 경우 로컬에서 직접 처리
@@ -674,14 +860,10 @@ def lambda_api():
                 if not file.filename.lower().endswith('.xlsx'):
                     return jsonify({'success': False, 'message': 'XLSX 형식의 엑셀 파일만 지원합니다.'}), 400
                 
-                # 엑셀 데이터 준비
-                excel_data = base64.b64encode(file.read()).decode('utf-8')
+                # 엑셀 데이터 준비 (위에서 excel 필드로 변환한 결과 재사용 - 업로드 파일을 다시 읽거나 올리지 않음)
                 lambda_data = {
                     'type': 'auto_excel_preview',
-                    'excel': {
-                        'data': excel_data,
-                        'filename': file.filename
-                    }
+                    'excel': data['excel']
                 }
             # excel 필드가 JSON 문자열로 전달된 경우
             elif 'excel' in data:
@@ -704,6 +886,10 @@ def lambda_api():
             else:
                 return jsonify({'success': False, 'message': '파일이 필요합니다.'}), 400
             
+            # 이미지 첨부 여부(MMS로 예상 비용 계산)와 전체 행 예상 비용 계산 요청 전달 (미리보기에 이미지 자체는 필요 없음)
+            lambda_data['hasImage'] = bool(data.get('image')) or is_flag_set(data.get('hasImage'))
+            lambda_data['estimateCost'] = is_flag_set(data.get('estimateCost'))
+            
             # 디버깅 모드 확인
             DEBUG_MODE = os.environ.get('DEBUG_MODE', 'True').lower() == 'true'
             
@@ -723,8 +909,8 @@ def lambda_api():
                 })
             
             # Lambda 함수 호출 
-            if not LAMBDA_FUNCTION_URL:
-                # 로컬 Lambda 함수 직접 호출 대신 테스트 응답 반환
+            if not lambda_available():
+                # Lambda 함수 URL도 로컬 실행도 설정되지 않은 경우 테스트 응답 반환
                 print("Lambda 함수 URL이 설정되지 않았습니다. 테스트 응답을 반환합니다.")
                 preview_data = [
                     {'index': 1, 'phone': '01012345678', 'text': '안녕하세요 홍길동님, 2025-03-22에 주문하신 스마트폰 케이스가 배송되었습니다.'},
@@ -738,29 +924,17 @@ def lambda_api():
                     'message': '자동 메시지 미리보기가 준비되었습니다.'
                 })
             else:
-                # Lambda 함수 URL 호출
-                print(f"Lambda 함수 URL 호출: {LAMBDA_FUNCTION_URL}")
-                print(f"Lambda 요청 데이터: {json.dumps(lambda_data)[:200]}...")
+                # Lambda 함수 호출
+                print(f"Lambda 함수 호출: {EXECUTION_BACKEND}")
+                print(f"Lambda 요청 데이터: {to_log_json(lambda_data)[:200]}...")
                 try:
-                    # 타임아웃 증가 및 요청 헤더 추가
-                    headers = {'Content-Type': 'application/json'}
-                    response = requests.post(
-                        LAMBDA_FUNCTION_URL, 
-                        json=lambda_data, 
-                        headers=headers,
-                        timeout=60
+                    result, status_code = call_lambda(
+                        lambda_data,
+                        timeout=60,
+                        error_prefix='자동 메시지 미리보기 처리 실패'
                     )
-                    
-                    print(f"Lambda 응답 상태 코드: {response.status_code}")
-                    if response.status_code == 200:
-                        result = response.json()
-                        return jsonify(result)
-                    else:
-                        print(f"Lambda 오류 응답: {response.status_code}, {response.text}")
-                        return jsonify({
-                            'success': False,
-                            'message': f'자동 메시지 미리보기 처리 실패: HTTP {response.status_code}, {response.text[:100]}'
-                        }), response.status_code
+                    print(f"Lambda 응답 상태 코드: {status_code}")
+                    return jsonify(result), status_code
                 except requests.exceptions.Timeout:
                     print("Lambda 함수 호출 타임아웃")
                     return jsonify({
@@ -795,14 +969,10 @@ def lambda_api():
                 if not file.filename.lower().endswith('.xlsx'):
                     return jsonify({'success': False, 'message': 'XLSX 형식의 엑셀 파일만 지원합니다.'}), 400
                 
-                # 엑셀 데이터 준비
-                excel_data = base64.b64encode(file.read()).decode('utf-8')
+                # 엑셀 데이터 준비 (위에서 excel 필드로 변환한 결과 재사용 - 업로드 파일을 다시 읽거나 올리지 않음)
                 lambda_data = {
                     'type': 'auto_excel_send',
-                    'excel': {
-                        'data': excel_data,
-                        'filename': file.filename
-                    }
+                    'excel': data['excel']
                 }
             # excel 필드가 JSON 문자열로 전달된 경우
             elif 'excel' in data:
@@ -822,9 +992,15 @@ def lambda_api():
                 except Exception as e:
                     print(f"Excel 데이터 파싱 오류: {str(e)}")
                     return jsonify({'success': False, 'message': 'Excel 데이터 형식이 올바르지 않습니다.'}), 400
+            # 미리보기에서 받은 준비된 캠페인 토큰만 전달된 경우 (엑셀 재업로드 없음)
+            elif data.get('campaignToken'):
+                lambda_data = {'type': 'auto_excel_send'}
             else:
                 return jsonify({'success': False, 'message': '파일이 필요합니다.'}), 400
             
+            if data.get('campaignToken'):
+                lambda_data['campaignToken'] = data['campaignToken']
+            
             try:
                 # 디버깅 모드 확인
                 DEBUG_MODE = os.environ.get('DEBUG_MODE', 'True').lower() == 'true'
@@ -840,17 +1016,8 @@ def lambda_api():
                         'failedList': []
                     })
                 
-                # 이미지가 있는 경우 처리
-                if 'image' in request.files:
-                    image = request.files['image']
-                    if image and image.filename:
-                        image_data = base64.b64encode(image.read()).decode('utf-8')
-                        lambda_data['image'] = {
-                            'data': image_data,
-                            'filename': image.filename
-                        }
-                # 이미지가 JSON 문자열로 전달된 경우
-                elif 'image' in data:
+                # 이미지가 있는 경우 처리 (업로드 파일은 위에서 image 필드로 변환됨, JSON 문자열로 전달될 수도 있음)
+                if 'image' in data:
                     try:
                         if isinstance(data['image'], str):
                             image_info = json.loads(data['image'])
@@ -861,8 +1028,8 @@ def lambda_api():
                         print(f"이미지 데이터 파싱 오류: {str(e)}")
                 
                 # Lambda 함수 호출
-                if not LAMBDA_FUNCTION_URL:
-                    # 로컬 Lambda 함수 직접 호출 대신 테스트 응답 반환
+                if not lambda_available():
+                    # Lambda 함수 URL도 로컬 실행도 설정되지 않은 경우 테스트 응답 반환
                     print("Lambda 함수 URL이 설정되지 않았습니다. 테스트 응답을 반환합니다.")
                     preview_data = [
                         {'index': 1, 'phone': '01012345678', 'text': '안녕하세요 홍길동님, 2025-03-22에 주문하신 스마트폰 케이스가 배송되었습니다.'},
@@ -876,29 +1043,21 @@ def lambda_api():
                         'message': '자동 메시지 미리보기가 준비되었습니다.'
                     })
                 else:
-                    # Lambda 함수 URL 호출
-                    print(f"Lambda 함수 URL 호출: {LAMBDA_FUNCTION_URL}")
-                    print(f"Lambda 요청 데이터: {json.dumps(lambda_data)[:200]}...")
+                    # 비동기 작업 요청이면 작업 ID만 바로 반환
+                    if wants_async(data):
+                        return submit_send_job('auto_excel_send', lambda_data)
+                    
+                    # Lambda 함수 호출
+                    print(f"Lambda 함수 호출: {EXECUTION_BACKEND}")
+                    print(f"Lambda 요청 데이터: {to_log_json(lambda_data)[:200]}...")
                     try:
-                        # 타임아웃 증가 및 요청 헤더 추가
-                        headers = {'Content-Type': 'application/json'}
-                        response = requests.post(
-                            LAMBDA_FUNCTION_URL, 
-                            json=lambda_data, 
-                            headers=headers,
-                            timeout=60
+                        result, status_code = call_lambda(
+                            lambda_data,
+                            timeout=60,
+                            error_prefix='자동 메시지 발송 처리 실패'
                         )
-                        
-                        print(f"Lambda 응답 상태 코드: {response.status_code}")
-                        if response.status_code == 200:
-                            result = response.json()
-                            return jsonify(result)
-                        else:
-                            print(f"Lambda 오류 응답: {response.status_code}, {response.text}")
-                            return jsonify({
-                                'success': False,
-                                'message': f'자동 메시지 발송 처리 실패: HTTP {response.status_code}, {response.text[:100]}'
-                            }), response.status_code
+                        print(f"Lambda 응답 상태 코드: {status_code}")
+                        return jsonify(result), status_code
                     except requests.exceptions.Timeout:
                         print("Lambda 함수 호출 타임아웃")
                         return jsonify({
@@ -939,18 +1098,10 @@ def lambda_api():
                 'request_data': data
             })
         else:
-            # 프로덕션 모드일 경우 Lambda 함수 URL 호출
-            print(f"프로덕션 모드: Lambda 함수 URL 호출: {LAMBDA_FUNCTION_URL}")
-            response = requests.post(LAMBDA_FUNCTION_URL, json=data, timeout=30)  # 타임아웃 30초로 설정
-            
-            if response.status_code == 200:
-                return jsonify(response.json())
-            else:
-                print(f"Lambda 오류 응답: {response.status_code}, {response.text}")
-                return jsonify({
-                    'success': False,
-                    'message': f'Lambda 함수 호출 실패: {response.text}'
-                }), response.status_code
+            # 프로덕션 모드일 경우 Lambda 함수 호출
+            print(f"프로덕션 모드: Lambda 함수 호출: {EXECUTION_BACKEND}")
+            result, status_code = call_lambda(data, timeout=30)  # 타임아웃 30초로 설정
+            return jsonify(result), status_code
     
     except Exception as e:
         print(f"오류 발생: {str(e)}")
@@ -961,5 +1112,52 @@ def lambda_api():
             'message': f'오류 발생: {str(e)}'
         }), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """발송 작업 상태 조회 API"""
+    job = jobs.get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': '작업을 찾을 수 없습니다.'}), 404
+    
+    return jsonify({'success': True, **job})
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """발송 작업 진행 상황 스트림 (Server-Sent Events)"""
+    if not jobs.get_job(job_id):
+        return jsonify({'success': False, 'message': '작업을 찾을 수 없습니다.'}), 404
+    
+    progress_fields = ('jobId', 'type', 'status', 'total', 'sent', 'failed', 'remaining', 'throughput', 'eta', 'message')
+    
+    def stream():
+        version = -1
+        while True:
+            job = jobs.wait_for_update(job_id, version)
+            if job is None:
+                break
+            
+            # 변화가 없으면 연결 유지용 주석만 전송
+            if job['version'] == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = job['version']
+            
+            payload = {key: job.get(key) for key in progress_fields}
+            finished = job['status'] in jobs.FINISHED_STATUSES
+            if finished:
+                payload['result'] = job.get('result')
+            
+            event = 'done' if finished else 'progress'
+            yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            
+            if finished:
+                break
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', debug=True) 
\ No newline at end of file
@@ -0,0 +1,142 @@
+import json
+import asyncio
+
+try:
+    import aiohttp
+    # 요청을 보내기 전의 연결 실패 (연결 시간 초과 예외는 aiohttp 3.10부터 따로 있음)
+    CONNECT_ERRORS = (aiohttp.ClientConnectorError,) + (
+        (aiohttp.ConnectionTimeoutError,) if hasattr(aiohttp, 'ConnectionTimeoutError') else ())
+except ImportError:
+    aiohttp = None
+
+from rate_limiter import is_throttled
+from lambda_update import (
+    API_BASE_URL,
+    SEND_CONNECT_TIMEOUT,
+    SEND_REQUEST_TIMEOUT,
+    SOLAPI_ASYNC_LIMITER,
+    chunk_error_code,
+    get_auth_header,
+    split_into_chunks,
+    make_progress_reporter,
+    merge_chunk_results,
+    new_stream_results,
+    add_chunk_result,
+    finish_chunk_results
+)
+
+def is_available():
+    """aiohttp 설치 여부를 반환합니다."""
+    return aiohttp is not None
+
+def create_client_session(concurrency):
+    """동시 연결 수가 제한된 aiohttp 세션을 생성합니다."""
+    connector = aiohttp.TCPConnector(limit=max(1, int(concurrency)))
+    return aiohttp.ClientSession(connector=connector)
+
+async def _post_json(session, api_key, api_secret, url, data, timeout=None):
+    """속도 제한기를 거쳐 인증 헤더를 붙인 JSON을 POST하고 (상태 코드, 본문 텍스트)를 반환합니다."""
+    await SOLAPI_ASYNC_LIMITER.acquire_async()
+    throttled = None  # 응답을 받지 못하면 속도 제한 신호로 보지 않음
+    try:
+        headers = get_auth_header(api_key, api_secret)
+        client_timeout = aiohttp.ClientTimeout(total=timeout or SEND_REQUEST_TIMEOUT, sock_connect=SEND_CONNECT_TIMEOUT)
+        async with session.post(url, headers=headers, data=json.dumps(data), timeout=client_timeout) as response:
+            body = await response.text()
+            throttled = is_throttled(response.status, body)
+            return response.status, body
+    finally:
+        SOLAPI_ASYNC_LIMITER.release(throttled)
+
+async def send_many_messages_async(session, api_key, api_secret, messages, timeout=None):
+    """send_many_messages와 같은 결과 형식으로 다수의 메시지를 발송합니다."""
+    if not messages:
+        return {"error": "메시지가 없습니다."}
+
+    try:
+        status, body = await _post_json(
+            session, api_key, api_secret, f"{API_BASE_URL}/send-many", {"messages": messages}, timeout
+        )
+        if status == 200:
+            return json.loads(body)
+        return {"error": body, "errorCode": chunk_error_code(status, body)}
+    except CONNECT_ERRORS as e:
+        # 요청을 보내기 전의 연결 실패(DNS, 연결 거부/시간 초과)만 재시도 대상
+        return {"error": str(e), "errorCode": "HttpError"}
+    except asyncio.TimeoutError:
+        # 이미 접수되었을 수 있으므로 재시도하지 않음 (중복 발송 방지)
+        return {"error": "요청 시간 초과", "errorCode": "ResponseTimeout"}
+    except Exception as e:
+        return {"error": str(e), "errorCode": "RequestError"}
+
+async def dispatch_messages_async(api_key, api_secret, messages, chunk_size, concurrency, timeout=None, on_progress=None):
+    """
+    메시지 목록을 청크로 나누어 하나의 이벤트 루프에서 동시에 발송합니다.
+    동시 요청 수는 세마포어로 제한하며 결과는 dispatch_messages와 같은 형태로 합칩니다.
+    """
+    chunks = split_into_chunks(messages, chunk_size)
+    concurrency = max(1, min(int(concurrency), len(chunks)))
+    print(f"asyncio 청크 발송 시작: 총 {len(messages)}건, 청크 {len(chunks)}개 (크기 {chunk_size}), 동시 요청 {concurrency}개")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    report = make_progress_reporter(len(messages), len(chunks), on_progress)
+
+    async with create_client_session(concurrency) as session:
+        async def send_chunk(chunk):
+            async with semaphore:
+                result = await send_many_messages_async(session, api_key, api_secret, chunk, timeout)
+            if report:
+                report(chunk, result)
+            return chunk, result
+
+        results = await asyncio.gather(*(send_chunk(chunk) for chunk in chunks))
+
+    return merge_chunk_results(results, SOLAPI_ASYNC_LIMITER)
+
+def run_dispatch(api_key, api_secret, messages, chunk_size, concurrency, timeout=None, on_progress=None):
+    """호출당 하나의 이벤트 루프로 dispatch_messages_async를 실행합니다."""
+    return asyncio.run(dispatch_messages_async(
+        api_key, api_secret, messages, chunk_size, concurrency, timeout, on_progress
+    ))
+
+async def dispatch_stream_async(api_key, api_secret, chunks, concurrency, timeout=None, on_progress=None):
+    """
+    청크 이터러블을 읽으며 하나의 이벤트 루프에서 동시에 발송합니다.
+    발송 중인 청크가 concurrency개가 되면 하나가 끝날 때까지 다음 청크를 읽지 않습니다.
+    결과는 lambda_update.dispatch_message_stream과 같은 형태로 합칩니다.
+    """
+    concurrency = max(1, int(concurrency))
+    print(f"asyncio 스트리밍 청크 발송 시작: 동시 요청 {concurrency}개")
+    report = make_progress_reporter(None, None, on_progress)
+    merged = new_stream_results()
+
+    def collect(done):
+        for task in done:
+            chunk, result = task.result()
+            merged["total"] += len(chunk)
+            add_chunk_result(merged, chunk, result)
+            if report:
+                report(chunk, result)
+
+    async with create_client_session(concurrency) as session:
+        async def send_chunk(chunk):
+            return chunk, await send_many_messages_async(session, api_key, api_secret, chunk, timeout)
+
+        pending = set()
+        # 다음 청크 생성(엑셀 행 읽기/렌더링)은 이벤트 루프에서 실행되므로 그동안 응답 처리는 잠시 미뤄짐
+        for chunk in chunks:
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+            pending.add(asyncio.create_task(send_chunk(chunk)))
+        if pending:
+            done, _ = await asyncio.wait(pending)
+            collect(done)
+
+    return finish_chunk_results(merged, SOLAPI_ASYNC_LIMITER)
+
+def run_dispatch_stream(api_key, api_secret, chunks, concurrency, timeout=None, on_progress=None):
+    """호출당 하나의 이벤트 루프로 dispatch_stream_async를 실행합니다."""
+    return asyncio.run(dispatch_stream_async(
+        api_key, api_secret, chunks, concurrency, timeout, on_progress
+    ))
@@ -0,0 +1,153 @@
+"""
+Lambda 실행 방식 벤치마크
+
+같은 엑셀 파일로 Flask 미리보기(/api/upload-excel)와 발송(/api/send-excel)을
+HTTP 방식(Lambda 함수 URL 대용 로컬 서버 호출, base64 JSON)과
+로컬 방식(lambda_handler 직접 호출, 원본 바이트)으로 각각 실행해 종단 간 지연 시간을 비교합니다.
+솔라피 API는 로컬 스텁 서버로 대체합니다.
+
+실행: python benchmarks/bench_backends.py [수신자 수] [반복 횟수]
+"""
+import io
+import os
+import base64
+import sys
+import json
+import time
+import threading
+import statistics
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DEBUG_MODE'] = 'False'
+os.environ.setdefault('API_KEY', 'bench-api-key')
+os.environ.setdefault('API_SECRET', 'bench-api-secret')
+os.environ.setdefault('SENDER_PHONE', '0212345678')
+os.environ.setdefault('SOLAPI_RATE_LIMIT', '50')
+os.environ['RETRY_QUEUE_ENABLED'] = 'False'
+
+import openpyxl
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import app as flask_app
+    import lambda_update
+
+class SolapiStubHandler(BaseHTTPRequestHandler):
+    """send-many 성공 응답을 돌려주는 솔라피 대용 핸들러"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self.respond({'failedMessageList': []})
+
+    def respond(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class LambdaUrlHandler(SolapiStubHandler):
+    """Lambda 함수 URL처럼 요청을 이벤트로 바꿔 lambda_handler를 호출하고 응답 형식을 HTTP로 변환하는 핸들러"""
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+        headers = {key.lower(): value for key, value in self.headers.items()}
+
+        # 함수 URL은 텍스트가 아닌 본문을 base64로 인코딩해 전달
+        is_text = headers.get('content-type', '').startswith(('application/json', 'text/')) and 'content-encoding' not in headers
+        event = {
+            'headers': headers,
+            'body': raw.decode('utf-8') if is_text else base64.b64encode(raw).decode('ascii'),
+            'isBase64Encoded': not is_text
+        }
+        result = lambda_update.lambda_handler(event, None)
+
+        body = result.get('body', '')
+        body = base64.b64decode(body) if result.get('isBase64Encoded') else body.encode('utf-8')
+        self.send_response(result.get('statusCode', 200))
+        for key, value in (result.get('headers') or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_server(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def build_workbook(rows):
+    """sample 시트(A2 템플릿)와 data 시트로 구성된 자동 메시지 엑셀 파일을 만듭니다."""
+    wb = openpyxl.Workbook()
+    sample = wb.active
+    sample.title = 'sample'
+    sample['A1'] = '메시지템플릿'
+    sample['A2'] = '안녕하세요 {{이름}}님,\n{{주문일자}}에 주문하신 {{주문상품}}({{주문금액}})이 발송되었습니다.'
+
+    data = wb.create_sheet('data')
+    data.append(['발송여부', '휴대폰번호', '이름', '주문일자', '주문금액', '주문상품'])
+    for i in range(rows):
+        data.append(['TRUE', f"010{i:08d}", f"고객{i}", '2025-03-22', '50,000원', '스마트폰 케이스'])
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def measure(client, path, excel_content, count):
+    """엔드포인트 호출당 지연 시간(ms) 목록을 반환합니다."""
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = client.post(path, data={'file': (io.BytesIO(excel_content), 'bench.xlsx')})
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200 or not response.get_json().get('success'):
+            raise RuntimeError(f"{path} 호출 실패: {response.status_code} {response.get_data(as_text=True)[:200]}")
+    return latencies
+
+def report(label, latencies):
+    print(f"{label:<28} 평균 {statistics.mean(latencies):9.1f}ms  중앙값 {statistics.median(latencies):9.1f}ms")
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    excel_content = build_workbook(rows)
+    solapi_server, solapi_url = start_server(SolapiStubHandler)
+    lambda_server, lambda_url = start_server(LambdaUrlHandler)
+    lambda_update.API_BASE_URL = solapi_url
+    flask_app.LAMBDA_FUNCTION_URL = lambda_url
+    client = flask_app.app.test_client()
+
+    print(f"수신자 {rows}명, 엑셀 {len(excel_content) / 1024:.1f}KB, 반복 {count}회")
+    results = {}
+    try:
+        for backend in ('http', 'local'):
+            flask_app.EXECUTION_BACKEND = backend
+            for label, path in (('미리보기', '/api/upload-excel'), ('발송', '/api/send-excel')):
+                results[(backend, label)] = measure(client, path, excel_content, count)
+    finally:
+        lambda_server.shutdown()
+        solapi_server.shutdown()
+
+    for label in ('미리보기', '발송'):
+        http_latencies = results[('http', label)]
+        local_latencies = results[('local', label)]
+        report(f"{label} - http (base64 JSON)", http_latencies)
+        report(f"{label} - local (원본 바이트)", local_latencies)
+        print(f"{label} 평균 지연 감소: {statistics.mean(http_latencies) - statistics.mean(local_latencies):.1f}ms "
+              f"({statistics.mean(http_latencies) / statistics.mean(local_latencies):.2f}배)")
+
+if __name__ == '__main__':
+    main()
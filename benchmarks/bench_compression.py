@@ -0,0 +1,151 @@
+"""
+Flask ↔ Lambda 본문 압축 벤치마크
+
+10,000명 / 100,000명 캠페인 기준으로 Lambda 링크에 오가는 실제 형태의 본문을 만들고
+압축 방식별(없음, gzip, zstd) 크기와 압축/해제 시간, 대역폭별 예상 전송 시간을 측정합니다.
+  - 요청: auto_excel_send (base64 엑셀 파일 포함 JSON)
+  - 응답: auto_excel_preview (전체 수신자/메시지 목록), send_message (5% 실패 목록 포함)
+로컬 HTTP 서버로 요청 본문을 보내 실제 왕복 시간도 함께 측정합니다.
+
+실행: python benchmarks/bench_compression.py [대역폭 Mbit/s]
+(zstd는 zstandard 모듈이 설치된 경우에만 측정합니다)
+"""
+import io
+import os
+import sys
+import json
+import time
+import base64
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+import requests
+import payload_codec
+
+CAMPAIGN_SIZES = (10000, 100000)
+TEMPLATE = '[자동화 메시지]\n안녕하세요 {name}님,\n주문해주신 상품이 발송되었습니다.\n◎ 주문일자: 2025-03-22\n◎ 주문금액: {amount}원\n\n감사합니다.'
+
+class DecompressHandler(BaseHTTPRequestHandler):
+    """요청 본문을 받아 압축을 해제하고 짧은 응답을 돌려주는 핸들러"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+        json.loads(payload_codec.decompress(raw, self.headers.get('Content-Encoding')))
+        body = b'{"success": true}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def build_send_request(rows):
+    """auto_excel_send 요청 본문 (data 시트에 rows명의 수신자가 있는 엑셀 파일)"""
+    wb = openpyxl.Workbook(write_only=True)
+    sample = wb.create_sheet('sample')
+    sample.append(['메시지템플릿'])
+    sample.append([TEMPLATE.replace('{name}', '{{이름}}').replace('{amount}', '{{주문금액}}')])
+    data = wb.create_sheet('data')
+    data.append(['발송여부', '휴대폰번호', '이름', '주문일자', '주문금액', '주문상품'])
+    for i in range(rows):
+        data.append(['TRUE', f"010{i:08d}", f"고객{i}", '2025-03-22', f"{(i % 90 + 10) * 1000:,}", '블루투스 이어폰'])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    excel = {'data': base64.b64encode(buffer.getvalue()).decode('utf-8'), 'filename': 'campaign.xlsx'}
+    return json.dumps({'type': 'auto_excel_send', 'excel': excel}).encode('utf-8')
+
+def build_preview_response(rows):
+    """auto_excel_preview 응답 본문 (전체 수신자 메시지 목록 + 미리보기)"""
+    recipients = [
+        {
+            'to': f"010{i:08d}",
+            'from': '0212345678',
+            'text': TEMPLATE.format(name=f"고객{i}", amount=f"{(i % 90 + 10) * 1000:,}"),
+            'type': 'LMS'
+        }
+        for i in range(rows)
+    ]
+    preview = [{'index': i + 1, 'phone': r['to'], 'text': r['text']} for i, r in enumerate(recipients[:5])]
+    return json.dumps({'success': True, 'total': rows, 'recipients': recipients, 'preview': preview}).encode('utf-8')
+
+def build_send_response(rows):
+    """send_message 응답 본문 (5% 실패 목록 포함)"""
+    failed = [
+        {'to': f"010{i:08d}", 'statusCode': '3059', 'reason': '유효하지 않은 전화번호'}
+        for i in range(0, rows, 20)
+    ]
+    return json.dumps({
+        'success': True,
+        'total': rows,
+        'failedCount': len(failed),
+        'failedList': failed,
+        'message': '대량 메시지가 성공적으로 발송되었습니다.'
+    }).encode('utf-8')
+
+def timed(fn, repeat=3):
+    """fn 실행 시간(ms)의 중앙값과 마지막 결과를 반환합니다."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations), result
+
+def round_trip(url, body, encoding, repeat=3):
+    """로컬 서버로 본문을 보내는 왕복 시간(ms, 압축 시간 포함)을 측정합니다."""
+    session = requests.Session()
+    def send():
+        payload = payload_codec.compress(body, encoding) if encoding else body
+        headers = {'Content-Type': 'application/json'}
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        session.post(url, data=payload, headers=headers).raise_for_status()
+    elapsed, _ = timed(send, repeat)
+    session.close()
+    return elapsed
+
+def main():
+    bandwidth = float(sys.argv[1]) if len(sys.argv) > 1 else 100.0
+    encodings = [None] + payload_codec.supported_encodings()[::-1]
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DecompressHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    print(f"예상 전송 시간 기준 대역폭: {bandwidth:.0f}Mbit/s, 압축 방식: {', '.join(e or 'none' for e in encodings)}")
+    print(f"{'본문':<28}{'방식':<6}{'크기':>12}{'비율':>8}{'압축':>10}{'해제':>10}{'전송(예상)':>12}{'합계':>10}{'로컬 왕복':>12}")
+    try:
+        for rows in CAMPAIGN_SIZES:
+            payloads = (
+                (f"{rows:,}명 발송 요청", build_send_request(rows)),
+                (f"{rows:,}명 미리보기 응답", build_preview_response(rows)),
+                (f"{rows:,}명 발송 응답", build_send_response(rows))
+            )
+            for label, body in payloads:
+                for encoding in encodings:
+                    if encoding:
+                        compress_ms, compressed = timed(lambda: payload_codec.compress(body, encoding))
+                        decompress_ms, _ = timed(lambda: payload_codec.decompress(compressed, encoding))
+                    else:
+                        compress_ms, decompress_ms, compressed = 0.0, 0.0, body
+                    transfer_ms = len(compressed) * 8 / (bandwidth * 1000)
+                    total_ms = compress_ms + transfer_ms + decompress_ms
+                    loopback_ms = round_trip(url, body, encoding)
+                    print(f"{label:<28}{encoding or 'none':<6}{len(compressed) / 1024:>10.1f}KB"
+                          f"{len(compressed) / len(body):>8.2f}{compress_ms:>8.1f}ms{decompress_ms:>8.1f}ms"
+                          f"{transfer_ms:>10.1f}ms{total_ms:>8.1f}ms{loopback_ms:>10.1f}ms")
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+CSV 수신자 파일 파싱 벤치마크
+
+A열 이름, B열 전화번호(여러 형식과 유효하지 않은 번호 포함)인 CSV 파일로
+  - legacy: 기존 방식 (파일 전체를 UTF-8 문자열로 디코딩, 행마다 숫자 추출과 로그 출력)
+  - utf-8 / cp949: csv_recipients.parse_csv_recipients (인코딩 자동 판별, 스트리밍 읽기, 묶음 단위 정제)
+의 소요 시간과 최대 메모리(RSS)를 측정합니다. 기존 방식은 CP949 파일을 읽지 못하므로 UTF-8 파일로만 측정합니다.
+작업마다 별도 프로세스에서 실행해 최대 메모리가 서로 섞이지 않게 합니다.
+
+실행: python benchmarks/bench_csv.py [행 수]
+"""
+import io
+import os
+import sys
+import csv
+import time
+import random
+import resource
+import tempfile
+import contextlib
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = (('legacy', 'utf-8'), ('utf-8', 'utf-8'), ('cp949', 'cp949'))
+
+def build_csv(path, rows, encoding, seed=42):
+    """수신자 CSV 파일을 만듭니다. (약 5%는 유효하지 않은 번호)"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['이름', '전화번호', '메모'])
+        for i in range(rows):
+            phone = rng.choice((f"010-{i // 10000 % 10000:04d}-{i % 10000:04d}", f"010{i:08d}", f"+82 10 {i:08d}"))
+            if rng.random() < 0.05:
+                phone = rng.choice(('', '없음', f"{i % 1000}"))
+            writer.writerow([f"고객{i}", phone, '서울특별시 강남구'])
+
+def parse_legacy(content):
+    """기존 방식 (lambda_update.parse_recipients_only의 이전 구현)"""
+    reader = csv.reader(io.StringIO(content.decode('utf-8-sig')))
+    next(reader, None)
+    recipients, names = [], []
+    for row_idx, row in enumerate(reader, 1):
+        if len(row) > 1:
+            phone = ''.join(c for c in str(row[1]).strip() if c.isdigit())
+            name = row[0].strip()
+            if phone and len(phone) >= 10:
+                recipients.append(phone)
+                names.append(name)
+                print(f"행 {row_idx}: 전화번호 추출 성공 - {phone}, 이름: {name}")
+            else:
+                print(f"행 {row_idx}: 유효하지 않은 전화번호 형식 - {row[1]}")
+    return recipients
+
+def run_mode(mode, path):
+    """한 가지 작업을 실행하고 소요 시간(초), 추출 건수, 최대 메모리(MB)를 출력합니다. (하위 프로세스에서 호출)"""
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if mode == 'legacy':
+            with open(path, 'rb') as f:
+                count = len(parse_legacy(f.read()))
+        else:
+            import csv_recipients
+            with open(path, 'rb') as f:
+                result = csv_recipients.parse_csv_recipients(f, phone_index=1, name_index=0)
+            if result['encoding'] not in ('utf-8', 'cp949'):
+                raise RuntimeError(f"인코딩 판별 오류: {result['encoding']}")
+            count = result['count']
+    elapsed = time.perf_counter() - started
+
+    # 리눅스의 ru_maxrss 단위는 KB
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.2f} {count} {peak_mb:.1f}")
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as workdir:
+        counts = set()
+        print(f"수신자 {rows:,}행")
+        for mode, encoding in MODES:
+            path = os.path.join(workdir, f"recipients-{encoding}.csv")
+            if not os.path.exists(path):
+                build_csv(path, rows, encoding)
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run', mode, path],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            elapsed, count, peak_mb = output[-3:]
+            counts.add(int(count))
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{mode:<8} ({size_mb:5.1f}MB) {float(elapsed):8.2f}초  추출 {int(count):>9,}건  최대 메모리 {float(peak_mb):8.1f}MB")
+
+        if len(counts) != 1:
+            raise RuntimeError("방식별 추출 건수가 다릅니다.")
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--run':
+        run_mode(sys.argv[2], sys.argv[3])
+    else:
+        main()
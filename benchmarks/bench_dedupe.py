@@ -0,0 +1,67 @@
+"""
+수신번호 중복 제거 벤치마크
+
+정제된 수신번호(약 20% 중복) 목록으로
+  - set: 기존 lambda_function 방식 list(set(...)) (순서가 바뀜, 비교용)
+  - dict: 문자열 키 dict.fromkeys (순서 유지)
+  - 색인 (전체): recipient_columns.PhoneIndex에 한 번에 추가
+  - 색인 (묶음): 스트리밍 읽기와 같이 ROW_BATCH_SIZE건씩 나누어 추가
+의 소요 시간과 색인 크기를 비교하고, 순서를 유지하는 방식의 결과가 같은지 확인합니다.
+
+실행: python benchmarks/bench_dedupe.py [번호 수]
+"""
+import os
+import sys
+import time
+import random
+from itertools import compress
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recipient_columns
+
+def build_phones(count, seed=42):
+    """정제된 수신번호 목록을 만듭니다. (고유 번호를 count의 80%만 만들어 중복 발생)"""
+    rng = random.Random(seed)
+    unique = max(1, count * 4 // 5)
+    return [f"010{rng.randrange(unique):08d}" for _ in range(count)]
+
+def dedupe_index(phones):
+    index = recipient_columns.PhoneIndex()
+    return list(compress(phones, index.add(phones))), index
+
+def dedupe_index_batched(phones):
+    index = recipient_columns.PhoneIndex()
+    size = recipient_columns.ROW_BATCH_SIZE
+    result = []
+    for start in range(0, len(phones), size):
+        batch = phones[start:start + size]
+        result.extend(compress(batch, index.add(batch)))
+    return result, index
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    phones = build_phones(count)
+
+    set_time, unordered = timed(lambda: list(set(phones)))
+    dict_time, expected = timed(lambda: list(dict.fromkeys(phones)))
+    index_time, (indexed, index) = timed(dedupe_index, phones)
+    batch_time, (batched, _) = timed(dedupe_index_batched, phones)
+
+    if indexed != expected or batched != expected or len(unordered) != len(expected):
+        raise RuntimeError("색인 중복 제거 결과가 dict.fromkeys와 다릅니다.")
+
+    dict_size = sys.getsizeof(dict.fromkeys(phones)) + sum(sys.getsizeof(phone) for phone in expected)
+    print(f"{count:,}건 중 고유 번호 {len(expected):,}건, 중복 {index.duplicates:,}건 (결과 일치)")
+    print(f"{'set (순서 바뀜)':<16} {set_time * 1000:9.1f}ms")
+    print(f"{'dict.fromkeys':<16} {dict_time * 1000:9.1f}ms  색인 약 {dict_size / 1024 / 1024:6.1f}MB")
+    print(f"{'색인 (전체)':<16} {index_time * 1000:9.1f}ms  색인 {index.keys.nbytes / 1024 / 1024:6.1f}MB")
+    print(f"{'색인 (묶음)':<16} {batch_time * 1000:9.1f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+HTTP 연결 풀 벤치마크
+
+로컬 HTTPS 서버(자체 서명 인증서)를 솔라피/Lambda 대용으로 띄우고
+매 호출마다 새 연결을 여는 requests.post와 http_pool 세션의 호출당 지연 시간을 비교합니다.
+
+실행: python benchmarks/bench_http_pool.py [호출 횟수]
+(openssl 명령이 필요합니다)
+"""
+import os
+import ssl
+import sys
+import json
+import time
+import tempfile
+import threading
+import subprocess
+import statistics
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from http_pool import create_session
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """send-many 응답 형태를 흉내 내는 핸들러"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        body = json.dumps({'failedMessageList': []}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_https_server(workdir):
+    """자체 서명 인증서로 로컬 HTTPS 서버를 시작합니다."""
+    cert_path = os.path.join(workdir, 'cert.pem')
+    key_path = os.path.join(workdir, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-keyout', key_path, '-out', cert_path, '-days', '1', '-subj', '/CN=localhost'],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), EchoHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"https://127.0.0.1:{server.server_address[1]}/"
+
+def measure(post, url, count):
+    """호출당 지연 시간(ms) 목록을 반환합니다."""
+    payload = {'messages': [{'to': '01012345678', 'from': '0212345678', 'text': '벤치마크'}]}
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = post(url, json=payload, verify=False)
+        response.json()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+def report(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<24} 평균 {statistics.mean(latencies):7.2f}ms  중앙값 {statistics.median(latencies):7.2f}ms  p95 {p95:7.2f}ms")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    warnings.filterwarnings('ignore')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server, url = start_https_server(workdir)
+        try:
+            print(f"로컬 HTTPS 서버: {url}, 호출 횟수: {count}")
+            before = measure(requests.post, url, count)
+            session = create_session()
+            after = measure(session.post, url, count)
+            session.close()
+        finally:
+            server.shutdown()
+
+    report("requests.post (매번 연결)", before)
+    report("http_pool 세션", after)
+    print(f"평균 지연 감소: {statistics.mean(before) / statistics.mean(after):.1f}배")
+
+if __name__ == '__main__':
+    main()
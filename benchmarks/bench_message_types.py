@@ -0,0 +1,68 @@
+"""
+메시지 타입 판별 벤치마크
+
+한글 위주 메시지(길이 30~120자)를 대상으로
+  - 글자 수 기준 (이전 방식: len(text) > 90이면 LMS)
+  - 글자마다 바이트를 더하는 방식 (ASCII 1바이트, 나머지 2바이트)
+  - message_types.tally_texts (CP949 인코딩으로 묶음 단위 바이트 길이 계산)
+의 소요 시간을 측정하고, 글자 수 기준으로 잘못 판별되는 건수와 예상 비용 차이를 출력합니다.
+
+실행: python benchmarks/bench_message_types.py [메시지 수]
+"""
+import os
+import sys
+import time
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import message_types
+
+WORDS = ['안녕하세요', '고객님', '주문하신', '상품이', '발송되었습니다.', 'CJ대한통운', '송장번호', '12345678', '감사합니다!', ':)']
+
+def build_texts(count):
+    rng = random.Random(0)
+    texts = []
+    for _ in range(count):
+        target = rng.randint(30, 120)
+        words = []
+        while sum(len(word) + 1 for word in words) < target:
+            words.append(rng.choice(WORDS))
+        texts.append(' '.join(words)[:target])
+    return texts
+
+def char_byte_length(text):
+    return sum(1 if ord(char) < 128 else 2 for char in text)
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    texts = build_texts(count)
+
+    legacy_time, legacy_types = timed(lambda: ['LMS' if len(text) > 90 else 'SMS' for text in texts])
+    loop_time, loop_lengths = timed(lambda: [char_byte_length(text) for text in texts])
+    tally = message_types.new_tally()
+    batch_time, lengths = timed(lambda: message_types.tally_texts(tally, texts))
+    if list(lengths) != loop_lengths:
+        raise RuntimeError("tally_texts의 바이트 길이가 글자별 계산과 다릅니다.")
+
+    legacy_tally = message_types.new_tally()
+    for msg_type in legacy_types:
+        legacy_tally[msg_type] += 1
+    before = message_types.summarize(legacy_tally)
+    after = message_types.summarize(tally)
+    wrong = sum(1 for msg_type, length in zip(legacy_types, lengths) if msg_type != message_types.classify(int(length)))
+
+    print(f"메시지 {count:,}건")
+    print(f"{'글자 수 기준':<16} {legacy_time:6.3f}초  SMS {before['SMS']:,}건, LMS {before['LMS']:,}건, 예상 비용 {before['estimatedCost']:,.0f}원")
+    print(f"{'글자별 바이트 합':<16} {loop_time:6.3f}초")
+    print(f"{'tally_texts':<16} {batch_time:6.3f}초  SMS {after['SMS']:,}건, LMS {after['LMS']:,}건, 예상 비용 {after['estimatedCost']:,.0f}원")
+    print(f"글자 수 기준으로 잘못 판별된 메시지 {wrong:,}건 (90바이트를 넘는데 SMS로 분류)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+수신번호 정제/발송 대상 선택 벤치마크
+
+여러 형식(하이픈, 공백, +82 국제번호, 숫자형, 빈 값, 자릿수 부족)이 섞인 수신번호 열과 체크박스 열로
+  - 기존 방식: 행마다 파이썬 루프로 체크 여부 확인, 숫자 추출(filter(str.isdigit)), 82 변환, 자릿수 확인
+  - 열 단위 전체: recipient_columns.select_recipients로 열 전체를 한 번에 처리
+  - 열 단위 묶음: 스트리밍 읽기와 같이 {열: 값} 레코드를 ROW_BATCH_SIZE행씩 묶어 처리 (iter_selected_batches)
+의 소요 시간을 비교하고 세 방식의 결과가 같은지 확인합니다.
+
+실행: python benchmarks/bench_normalize.py [행 수]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recipient_columns
+
+def build_columns(rows, seed=42):
+    """수신번호 값과 체크박스 값 목록을 만듭니다."""
+    rng = random.Random(seed)
+    formats = (
+        lambda n: f"010-{n // 10000:04d}-{n % 10000:04d}",
+        lambda n: f"010{n:08d}",
+        lambda n: f"+82 10-{n // 10000:04d}-{n % 10000:04d}",
+        lambda n: f"8210{n:08d}",
+        lambda n: int(f"10{n:08d}"),
+        lambda n: f" 010 {n:08d} ",
+        lambda n: None,
+        lambda n: f"{n % 1000}",
+    )
+    phones = [rng.choice(formats)(rng.randrange(10 ** 8)) for _ in range(rows)]
+    checkboxes = [rng.choice((True, False, 'TRUE', 'Y', 'o', None, 'FALSE')) for _ in range(rows)]
+    return phones, checkboxes
+
+def select_row_by_row(phones, checkboxes):
+    """기존 행 단위 루프 방식 (체크 확인 → 빈 값 확인 → 숫자 추출 → 82 변환 → 자릿수 확인)"""
+    selected = []
+    for idx, (value, checkbox) in enumerate(zip(phones, checkboxes)):
+        if str(checkbox).upper() not in recipient_columns.CHECKED_VALUES:
+            continue
+        if value is None or str(value).strip() == '':
+            continue
+        phone = ''.join(filter(str.isdigit, str(value)))
+        if phone.startswith('82') and len(phone) >= 10:
+            phone = '0' + phone[2:]
+        if len(phone) < 10:
+            continue
+        selected.append((idx, phone))
+    return selected
+
+def select_columnar(phones, checkboxes):
+    """열 전체를 한 번에 처리"""
+    cleaned, mask, _ = recipient_columns.select_recipients(phones, checkboxes)
+    return [(int(idx), cleaned[idx]) for idx in mask.nonzero()[0]]
+
+def select_batched(records):
+    """레코드 스트림을 묶음 단위로 처리"""
+    return [
+        (idx, phone)
+        for idx, _, phone in recipient_columns.iter_selected_rows(records, 'phone', 'checkbox')
+    ]
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    phones, checkboxes = build_columns(rows)
+    records = [{'phone': phone, 'checkbox': checkbox} for phone, checkbox in zip(phones, checkboxes)]
+    print(f"{rows:,}행, 묶음 크기 {recipient_columns.ROW_BATCH_SIZE:,}행")
+
+    # 묶음 처리의 행 단위 경고 로그는 측정에서 제외
+    devnull = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        loop_time, expected = timed(select_row_by_row, phones, checkboxes)
+        column_time, columnar = timed(select_columnar, phones, checkboxes)
+        batch_time, batched = timed(select_batched, records)
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+
+    if columnar != expected or batched != expected:
+        raise RuntimeError("열 단위 처리 결과가 기존 방식과 다릅니다.")
+
+    print(f"발송 대상 {len(expected):,}행 (결과 일치)")
+    print(f"{'기존 행 단위 루프':<20} {loop_time * 1000:9.1f}ms")
+    print(f"{'열 단위 (전체)':<20} {column_time * 1000:9.1f}ms  ({loop_time / column_time:.1f}배)")
+    print(f"{'열 단위 (묶음)':<20} {batch_time * 1000:9.1f}ms  ({loop_time / batch_time:.1f}배)")
+
+if __name__ == '__main__':
+    main()
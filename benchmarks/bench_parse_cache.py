@@ -0,0 +1,101 @@
+"""
+자동 메시지 파싱 캐시 벤치마크
+
+같은 엑셀 파일로 auto_excel_preview 후 auto_excel_send를 호출하는 일반적인 흐름을
+  - 캐시 없음: PARSE_CACHE_ENABLED=False (미리보기와 발송에서 각각 엑셀 파싱)
+  - 캐시 사용: 미리보기에서 파싱/렌더링 결과를 /tmp 캐시에 기록하고 발송은 캐시에서 읽음 (기본 설정)
+  - 토큰 발송: 발송 요청에 엑셀 대신 미리보기 응답의 준비된 캠페인 토큰(campaignToken)만 전달
+으로 실행해 단계별 소요 시간을 비교하고, 두 경우 발송된 메시지가 같은지 확인합니다.
+솔라피 API는 로컬 스텁 서버로 대체합니다.
+
+실행: python benchmarks/bench_parse_cache.py [수신자 수]
+"""
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ['DEBUG_MODE'] = 'False'
+os.environ.setdefault('API_KEY', 'bench-api-key')
+os.environ.setdefault('API_SECRET', 'bench-api-secret')
+os.environ.setdefault('SENDER_PHONE', '0212345678')
+os.environ.setdefault('SOLAPI_RATE_LIMIT', '50')
+os.environ['RETRY_QUEUE_ENABLED'] = 'False'
+
+import lambda_update
+import parse_cache
+from bench_backends import SolapiStubHandler, start_server, build_workbook
+
+sent = []
+
+class RecordingHandler(SolapiStubHandler):
+    """받은 메시지를 기록하는 솔라피 스텁"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        sent.extend(body['messages'])
+        self.respond({'failedMessageList': []})
+
+def call(request_type, excel_content=None, **fields):
+    """요청 하나를 처리하고 (결과, 소요 시간)을 반환합니다. (로그 출력 제외)"""
+    body = dict(fields, type=request_type)
+    if excel_content is not None:
+        body['excel'] = {'content': excel_content, 'filename': 'bench.xlsx'}
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = lambda_update.handle_event(body, None)
+    if not result.get('success'):
+        raise RuntimeError(result.get('message'))
+    return result, time.perf_counter() - started
+
+def run_flow(excel_content, use_token=False):
+    """미리보기 → 발송을 실행하고 (미리보기 시간, 발송 시간, 발송된 메시지)를 반환합니다."""
+    sent.clear()
+    preview, preview_time = call('auto_excel_preview', excel_content)
+    if use_token:
+        _, send_time = call('auto_excel_send', campaignToken=preview['campaignToken'])
+    else:
+        _, send_time = call('auto_excel_send', excel_content)
+    return preview_time, send_time, sorted((m['to'], m['text']) for m in sent)
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    excel_content = build_workbook(rows)
+    server, url = start_server(RecordingHandler)
+    lambda_update.API_BASE_URL = url
+    print(f"수신자 {rows:,}명, 엑셀 {len(excel_content) / 1024 / 1024:.1f}MB")
+
+    try:
+        parse_cache.PARSE_CACHE_ENABLED = False
+        plain = run_flow(excel_content)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            parse_cache.PARSE_CACHE_ENABLED = True
+            parse_cache._cache = parse_cache.ParseCache(cache_dir)
+            cached = run_flow(excel_content)
+            cache_size = sum(entry.stat().st_size for path, _, files in os.walk(cache_dir)
+                             for entry in os.scandir(path) if entry.is_file())
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # 빈 캐시에서 미리보기 후 토큰으로 발송
+            parse_cache._cache = parse_cache.ParseCache(cache_dir)
+            token = run_flow(excel_content, use_token=True)
+    finally:
+        server.shutdown()
+
+    if plain[2] != cached[2] or plain[2] != token[2]:
+        raise RuntimeError("캐시/토큰 사용 시 발송 메시지가 다릅니다.")
+
+    print(f"발송 메시지 {len(cached[2]):,}건 (결과 일치), 캐시 크기 {cache_size / 1024 / 1024:.1f}MB")
+    print(f"발송 요청 엑셀 업로드: 캐시 사용 {len(excel_content) / 1024 / 1024:.1f}MB, 토큰 발송 0MB")
+    for label, (preview_time, send_time, _) in (('캐시 없음', plain), ('캐시 사용', cached), ('토큰 발송', token)):
+        print(f"{label:<10} 미리보기 {preview_time:6.2f}초  발송 {send_time:6.2f}초  합계 {preview_time + send_time:6.2f}초")
+
+if __name__ == '__main__':
+    main()
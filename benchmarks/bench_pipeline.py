@@ -0,0 +1,105 @@
+"""
+수신자 파이프라인 진입점별 벤치마크
+
+같은 수신자(일부 체크 해제, 일부 중복 번호)를 담은 파일로 recipient_pipeline을 사용하는 네 진입점
+  - lambda_update: 자동 메시지 엑셀 전체 렌더링 (process_auto_excel_template)
+  - s3_excel: 엑셀 수신자 읽기 (iter_recipients_from_excel)
+  - lambda_function: CSV 수신자 읽기 (lambda/lambda_function.read_recipients_from_excel)
+  - app: CSV 수신번호만 추출 (parse_recipients_only_from_file과 같은 recipient_pipeline.parse_csv 호출)
+의 소요 시간을 측정하고, 모두 같은 수신번호를 같은 순서로 추출하는지 확인합니다.
+
+실행: python benchmarks/bench_pipeline.py [행 수]
+"""
+import io
+import os
+import sys
+import csv
+import time
+import contextlib
+import openpyxl
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'lambda'))
+
+os.environ['PARSE_CACHE_ENABLED'] = 'False'
+os.environ.setdefault('SENDER_PHONE', '0212345678')
+
+HEADER = ['발송여부', '휴대폰번호', '이름', '주문일자', '주문금액', '주문상품']
+TEMPLATE = '안녕하세요 {{이름}}님, {{주문일자}}에 주문하신 {{주문상품}}이 발송되었습니다.'
+
+def build_rows(count):
+    """10행마다 1행은 체크 해제, 20행마다 1행은 앞 행과 같은 번호"""
+    rows = []
+    for i in range(count):
+        number = i - 1 if i % 20 == 19 else i
+        rows.append(['FALSE' if i % 10 == 9 else 'TRUE', f"010-{number // 10000 % 10000:04d}-{number % 10000:04d}",
+                     f"고객{i}", '2025-03-22', '50,000원', '스마트폰 케이스'])
+    return rows
+
+def build_workbook(rows):
+    wb = openpyxl.Workbook()
+    sample = wb.active
+    sample.title = 'sample'
+    sample['A2'] = TEMPLATE
+    data = wb.create_sheet('data')
+    data.append(HEADER)
+    for row in rows:
+        data.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def build_csv(rows, header=True, phones_only=False):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    if header:
+        writer.writerow(['조건', '휴대폰번호', '이름', '메시지'])
+    for checked, phone, name, *_ in rows:
+        if phones_only:
+            if checked == 'TRUE':
+                writer.writerow([phone])
+        else:
+            writer.writerow([checked, phone, name, f"{name}님 주문이 발송되었습니다."])
+    return output.getvalue().encode('utf-8')
+
+def timed(fn):
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = fn()
+    return time.perf_counter() - started, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = build_rows(count)
+    excel_content = build_workbook(rows)
+    csv_content = build_csv(rows)
+    phones_content = build_csv(rows, header=False, phones_only=True)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import lambda_update
+        import s3_excel
+        import lambda_function
+        import recipient_pipeline
+
+    entry_points = [
+        ('lambda_update', lambda: [m['to'] for m in lambda_update.process_auto_excel_template(
+            excel_content, sender_phone=os.environ['SENDER_PHONE'])['recipients']]),
+        ('s3_excel', lambda: [m['to'] for m in s3_excel.iter_recipients_from_excel(excel_content)]),
+        ('lambda_function', lambda: [m['to'] for m in lambda_function.read_recipients_from_excel(csv_content)]),
+        ('app', lambda: recipient_pipeline.parse_csv(io.BytesIO(phones_content), phone_index=0, has_header=False,
+                                                     max_digits=13)['recipients'])
+    ]
+
+    results = [(label,) + timed(fn) for label, fn in entry_points]
+    expected = results[0][2]
+    for label, _, phones in results:
+        if phones != expected:
+            raise RuntimeError(f"{label}의 수신번호 추출 결과가 다릅니다.")
+
+    print(f"{count:,}행 → 수신번호 {len(expected):,}개 (모든 진입점 결과 일치)")
+    for label, elapsed, _ in results:
+        print(f"{label:<16} {elapsed:7.2f}초  행당 {elapsed / count * 1e6:6.1f}µs")
+
+if __name__ == '__main__':
+    main()
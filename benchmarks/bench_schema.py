@@ -0,0 +1,91 @@
+"""
+열 역할 추론 벤치마크
+
+  - 추론: column_schema.infer_schema를 처음 호출(규칙 검사)할 때와 같은 헤더로 다시 호출(캐시)할 때의 시간
+  - CSV 수신자 읽기: lambda/lambda_function.read_recipients_from_excel의 이전 방식
+    (행마다 헤더 전체를 훑어 전화번호/메시지 열을 다시 찾음)과 열 역할을 한 번만 추론하는 현재 방식
+을 비교하고, 두 방식의 결과가 같은지 확인합니다.
+
+실행: python benchmarks/bench_schema.py [행 수]
+"""
+import io
+import os
+import re
+import sys
+import csv
+import time
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'lambda'))
+
+import column_schema
+
+HEADER = ['조건', '주문번호', '이름', '휴대폰번호', '주문일자', '주문금액', '주문상품', '배송업체', '송장번호', '메시지']
+
+def build_csv(rows):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(HEADER)
+    for i in range(rows):
+        writer.writerow([
+            'TRUE' if i % 10 else 'FALSE', f"A{i:08d}", f"고객{i}", f"010-{i // 10000 % 10000:04d}-{i % 10000:04d}",
+            '2025-03-22', '50,000원', '스마트폰 케이스', 'CJ대한통운', f"{i:012d}", f"{i}번 고객님 주문이 발송되었습니다."
+        ])
+    return output.getvalue().encode('utf-8')
+
+def read_recipients_legacy(excel_data, sender_phone=''):
+    """이전 방식 (행마다 전화번호/메시지 열을 다시 찾음)"""
+    csv_reader = csv.reader(io.StringIO(excel_data.decode('utf-8-sig')))
+    headers = {}
+    for col_idx, header in enumerate(next(csv_reader, None) or []):
+        if header:
+            headers[header.strip()] = col_idx
+
+    recipients = []
+    for row in csv_reader:
+        if '조건' in headers:
+            condition = row[headers['조건']]
+            if not condition or condition.upper() == 'FALSE':
+                continue
+        phone_col = next((headers[h] for h in headers if any(k in h for k in ['휴대폰', '전화', 'phone', '수신'])), None)
+        if phone_col is None:
+            continue
+        phone = re.sub(r'[^0-9]', '', row[phone_col])
+        if not phone:
+            continue
+        text = ""
+        text_col = next((headers[h] for h in headers if any(k in h for k in ['text', '내용', '메시지'])), None)
+        if text_col is not None:
+            text = row[text_col]
+        recipients.append({'to': phone, 'from': sender_phone, 'text': text if text else "", 'type': 'SMS'})
+    return recipients
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import lambda_function
+
+    repeat = 10000
+    infer_time, _ = timed(lambda: [column_schema._infer_positions(tuple(HEADER)) for _ in range(repeat)])
+    cached_time, _ = timed(lambda: [column_schema.infer_schema(HEADER) for _ in range(repeat)])
+    print(f"열 {len(HEADER)}개 헤더 추론: 규칙 검사 {infer_time / repeat * 1e6:6.1f}µs, 캐시 {cached_time / repeat * 1e6:6.1f}µs")
+
+    content = build_csv(rows)
+    legacy_time, expected = timed(read_recipients_legacy, content, lambda_function.SENDER_PHONE)
+    schema_time, result = timed(lambda_function.read_recipients_from_excel, content)
+    if result != expected:
+        raise RuntimeError("열 역할 추론 방식의 수신자 목록이 이전 방식과 다릅니다.")
+
+    print(f"CSV {rows:,}행 → 수신자 {len(result):,}명 (결과 일치)")
+    print(f"{'행마다 열 찾기':<14} {legacy_time:6.2f}초")
+    print(f"{'한 번만 추론':<14} {schema_time:6.2f}초")
+
+if __name__ == '__main__':
+    main()
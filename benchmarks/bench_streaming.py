@@ -0,0 +1,97 @@
+"""
+대용량 엑셀 스트리밍 처리 메모리 벤치마크
+
+수신자 수가 많은 자동 메시지 엑셀 파일로 다음 작업의 최대 메모리(RSS)와 소요 시간을 측정합니다.
+  - dataframe: 기존 방식처럼 데이터 시트 전체를 pandas DataFrame으로 읽기만 함 (비교 기준)
+  - preview: auto_excel_preview (앞 5건만 렌더링, 나머지는 건수만 계산)
+  - send: auto_excel_send (행을 읽는 대로 렌더링해 청크 단위로 발송, 솔라피는 로컬 스텁 서버)
+작업마다 별도 프로세스에서 실행해 최대 메모리가 서로 섞이지 않게 합니다.
+
+실행: python benchmarks/bench_streaming.py [수신자 수]
+"""
+import io
+import os
+import sys
+import time
+import resource
+import tempfile
+import contextlib
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DEBUG_MODE'] = 'False'
+os.environ.setdefault('API_KEY', 'bench-api-key')
+os.environ.setdefault('API_SECRET', 'bench-api-secret')
+os.environ.setdefault('SENDER_PHONE', '0212345678')
+os.environ.setdefault('SOLAPI_RATE_LIMIT', '50')
+os.environ['RETRY_QUEUE_ENABLED'] = 'False'
+
+MODES = ('dataframe', 'preview', 'send')
+
+def build_workbook(path, rows):
+    """write_only 모드로 sample 시트(A2 템플릿)와 data 시트를 가진 엑셀 파일을 만듭니다."""
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    sample = wb.create_sheet('sample')
+    sample.append(['메시지템플릿'])
+    sample.append(['안녕하세요 {{이름}}님,\n{{주문일자}}에 주문하신 {{주문상품}}({{주문금액}})이 발송되었습니다.'])
+    data = wb.create_sheet('data')
+    data.append(['발송여부', '휴대폰번호', '이름', '주문일자', '주문금액', '주문상품'])
+    for i in range(rows):
+        data.append(['TRUE', f"010{i:08d}", f"고객{i}", '2025-03-22', '50,000원', '스마트폰 케이스'])
+    wb.save(path)
+
+def run_mode(mode, path):
+    """한 가지 작업을 실행하고 소요 시간(초), 처리 건수, 최대 메모리(MB)를 출력합니다. (하위 프로세스에서 호출)"""
+    with open(path, 'rb') as f:
+        excel_content = f.read()
+
+    started = time.perf_counter()
+    # 행별 로그가 메모리에 쌓이지 않도록 버림
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if mode == 'dataframe':
+            import pandas as pd
+            total = len(pd.read_excel(io.BytesIO(excel_content), sheet_name='data'))
+        else:
+            import lambda_update
+            from bench_backends import SolapiStubHandler, start_server
+            server, url = start_server(SolapiStubHandler)
+            lambda_update.API_BASE_URL = url
+            request_type = 'auto_excel_preview' if mode == 'preview' else 'auto_excel_send'
+            result = lambda_update.handle_event({
+                'type': request_type,
+                'excel': {'content': excel_content, 'filename': 'bench.xlsx'}
+            }, None)
+            server.shutdown()
+            if not result.get('success'):
+                raise RuntimeError(result.get('message'))
+            total = result['total']
+    elapsed = time.perf_counter() - started
+
+    # 리눅스의 ru_maxrss 단위는 KB
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.2f} {total} {peak_mb:.1f}")
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'bench.xlsx')
+        build_workbook(path, rows)
+        print(f"수신자 {rows:,}명, 엑셀 {os.path.getsize(path) / 1024 / 1024:.1f}MB")
+
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run', mode, path],
+                check=True, capture_output=True, text=True,
+                cwd=os.path.dirname(os.path.abspath(__file__))
+            ).stdout.split()
+            elapsed, total, peak_mb = output[-3:]
+            print(f"{mode:<10} {float(elapsed):8.2f}초  처리 {int(total):>9,}건  최대 메모리 {float(peak_mb):8.1f}MB")
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--run':
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        run_mode(sys.argv[2], sys.argv[3])
+    else:
+        main()
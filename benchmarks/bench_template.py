@@ -0,0 +1,143 @@
+"""
+자동 메시지 템플릿 렌더링 벤치마크
+
+A2 템플릿과 여러 형식(날짜 셀, 날짜 문자열, 금액 숫자/문자열, 빈 값)이 섞인 행 레코드로
+  - 기존 방식: 행마다 변수별로 정규식을 컴파일해 re.search/re.sub로 치환하고,
+    남은 변수를 re.findall로 찾아 다시 치환한 뒤 남은 중괄호를 re.sub로 제거
+  - 컴파일 방식: 템플릿을 한 번만 리터럴/변수 조각으로 분해하고 행마다 join 한 번으로 렌더링
+    (lambda_update.build_auto_excel_renderer)
+의 소요 시간을 비교하고 두 방식의 결과가 같은지 확인합니다.
+
+실행: python benchmarks/bench_template.py [행 수]
+"""
+import os
+import re
+import sys
+import time
+import random
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lambda_update
+
+TEMPLATE = (
+    "[테스트쇼핑몰] 안녕하세요 {{이름}}님,\n"
+    "{{주문일자}}에 주문하신 {{주문상품}}({{주문금액}})이 발송되었습니다.\n"
+    "◎ 결제일: {{결제일자}}\n◎ 배송업체: {{배송업체}}\n◎ 송장번호: {{송장번호}}\n감사합니다."
+)
+COLUMNS = ['발송여부', '휴대폰번호', '이름', '주문일자', '주문금액', '주문상품', '결제일자', '배송업체', '송장번호']
+NAME_COL, DATE_COL, AMOUNT_COL, PRODUCT_COL = '이름', '주문일자', '주문금액', '주문상품'
+
+def build_rows(rows, seed=42):
+    """행 레코드 목록을 만듭니다."""
+    rng = random.Random(seed)
+    dates = (
+        lambda: datetime(2025, rng.randint(1, 12), rng.randint(1, 28)),
+        lambda: f"2025-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        lambda: f"2025-03-2{rng.randint(0, 9)} 00:00:00",
+        lambda: None,
+    )
+    amounts = (
+        lambda: rng.randrange(1000, 1000000),
+        lambda: f"{rng.randrange(1000, 1000000):,}원",
+        lambda: '무료',
+        lambda: None,
+    )
+    records = []
+    for i in range(rows):
+        records.append({
+            '발송여부': True,
+            '휴대폰번호': f"010{i:08d}",
+            '이름': rng.choice((f"고객{i}", None)),
+            '주문일자': rng.choice(dates)(),
+            '주문금액': rng.choice(amounts)(),
+            '주문상품': rng.choice(('스마트폰 케이스', '무선 이어폰', None)),
+            '결제일자': rng.choice(dates)(),
+            '배송업체': rng.choice(('CJ대한통운', '우체국택배', None)),
+            '송장번호': rng.choice((rng.randrange(10 ** 11, 10 ** 12), None)),
+        })
+    return records
+
+def is_missing(value):
+    return value is None or value != value
+
+def render_regex(row):
+    """기존 정규식 치환 방식 (로그 출력 제외)"""
+    name = str(row.get(NAME_COL)) if not is_missing(row.get(NAME_COL)) else ""
+    date = str(row.get(DATE_COL)) if not is_missing(row.get(DATE_COL)) else ""
+    amount = str(row.get(AMOUNT_COL)) if not is_missing(row.get(AMOUNT_COL)) else ""
+    product = str(row.get(PRODUCT_COL)) if not is_missing(row.get(PRODUCT_COL)) else ""
+
+    if date:
+        if ' 00:00:00' in date:
+            date = date.split(' ')[0]
+        elif 'T00:00:00' in date:
+            date = date.split('T')[0]
+        elif '.' in date and len(date) > 10:
+            date = date.split('.')[0]
+        if isinstance(row[DATE_COL], datetime):
+            date = row[DATE_COL].strftime('%Y-%m-%d')
+
+    if amount:
+        numeric_amount = ''.join(filter(str.isdigit, amount))
+        if numeric_amount:
+            formatted_amount = format(int(numeric_amount), ',')
+            if '원' in amount:
+                formatted_amount += '원'
+            amount = formatted_amount
+
+    message_text = TEMPLATE
+    var_dict = {'이름': name, '주문일자': date, '주문금액': amount, '주문상품': product}
+    for var_name, var_value in var_dict.items():
+        if var_value:
+            pattern = re.compile(r'\{\{' + re.escape(var_name) + r'\}\}')
+            if re.search(pattern, message_text):
+                message_text = re.sub(pattern, var_value, message_text)
+
+    remaining_vars = re.findall(r'\{\{([^{}]+)\}\}', message_text)
+    for var_name in remaining_vars:
+        if var_name in row and not is_missing(row[var_name]):
+            var_value = str(row[var_name])
+            if '일자' in var_name or '날짜' in var_name or 'date' in var_name.lower():
+                if ' 00:00:00' in var_value:
+                    var_value = var_value.split(' ')[0]
+                elif 'T00:00:00' in var_value:
+                    var_value = var_value.split('T')[0]
+                if isinstance(row[var_name], datetime):
+                    var_value = row[var_name].strftime('%Y-%m-%d')
+            var_pattern = re.compile(r'\{\{' + re.escape(var_name) + r'\}\}')
+            message_text = re.sub(var_pattern, var_value, message_text)
+
+    if '{{' in message_text and '}}' in message_text:
+        message_text = re.sub(r'\{\{([^{}]+)\}\}', r'\1', message_text)
+    return message_text
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    records = build_rows(rows)
+    print(f"{rows:,}행, 템플릿 변수 {len(re.findall(r'{{', TEMPLATE))}개")
+
+    regex_time, expected = timed(lambda: [render_regex(row) for row in records])
+
+    def render_compiled():
+        render = lambda_update.build_auto_excel_renderer(
+            TEMPLATE, COLUMNS, NAME_COL, DATE_COL, AMOUNT_COL, PRODUCT_COL
+        )
+        return [render(row) for row in records]
+    compiled_time, rendered = timed(render_compiled)
+
+    if rendered != expected:
+        raise RuntimeError("컴파일 방식 렌더링 결과가 기존 방식과 다릅니다.")
+
+    print("렌더링 결과 일치")
+    print(f"{'기존 정규식 치환':<20} {regex_time * 1000:9.1f}ms  ({regex_time / rows * 1e6:.2f}µs/행)")
+    print(f"{'컴파일 템플릿':<20} {compiled_time * 1000:9.1f}ms  ({compiled_time / rows * 1e6:.2f}µs/행, {regex_time / compiled_time:.1f}배)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import io
+import openpyxl
+
+def load_workbook(content):
+    """
+    엑셀 파일 바이트를 메모리에서 엽니다.
+    임시 파일을 쓰지 않으므로 같은 컨테이너에서 동시에 실행되어도 서로 덮어쓰지 않습니다.
+    """
+    return openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+
+def _convert_cell(value):
+    # pd.read_excel과 같이 정수 값의 실수는 정수로, 빈 문자열은 값 없음으로 처리
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if value == '':
+        return None
+    return value
+
+def _column_names(header, width):
+    # pd.read_excel과 같은 열 이름 규칙 (빈 헤더는 'Unnamed: n', 중복 헤더는 '이름.1', '이름.2' ...)
+    names = []
+    seen = {}
+    for i in range(width):
+        value = header[i] if i < len(header) else None
+        name = f"Unnamed: {i}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def iter_sheet_rows(sheet):
+    """빈 행은 건너뛰고 끝의 빈 셀을 잘라낸 행 값 목록을 차례로 반환합니다."""
+    # 파일에 기록된 시트 범위가 실제와 다를 수 있으므로 범위를 다시 계산
+    if hasattr(sheet, 'reset_dimensions'):
+        sheet.reset_dimensions()
+    for row in sheet.iter_rows(values_only=True):
+        values = [_convert_cell(value) for value in row]
+        while values and values[-1] is None:
+            values.pop()
+        if values:
+            yield values
+
+def sheet_records(sheet):
+    """
+    시트의 첫 행을 헤더로 하여 (열 이름 목록, 행 레코드 제너레이터)를 반환합니다.
+    레코드는 {열 이름: 값} 딕셔너리이며 시트를 읽는 대로 하나씩 만들어지므로
+    행 수와 관계없이 메모리 사용량이 일정합니다. (헤더보다 긴 행의 나머지 셀은 무시)
+    """
+    rows = iter_sheet_rows(sheet)
+    header = next(rows, None)
+    if header is None:
+        return [], iter(())
+
+    columns = _column_names(header, len(header))
+    return columns, (dict(zip(columns, values)) for values in rows)
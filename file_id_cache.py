@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+# 업로드된 MMS 이미지 fileId 캐시 설정
+# 솔라피 스토리지 파일은 일정 기간 후 만료되므로 만료 전에 캐시가 먼저 무효화되도록 여유를 둠
+FILE_ID_CACHE_ENABLED = os.environ.get('FILE_ID_CACHE_ENABLED', 'True').lower() == 'true'
+FILE_ID_CACHE_TTL = int(os.environ.get('FILE_ID_CACHE_TTL', str(60 * 60 * 24)))
+FILE_ID_CACHE_STORE = os.environ.get('FILE_ID_CACHE_STORE', 'file').lower()
+FILE_ID_CACHE_PATH = os.environ.get('FILE_ID_CACHE_PATH', '/tmp/solapi_file_ids.json')
+FILE_ID_CACHE_S3_PREFIX = os.environ.get('FILE_ID_CACHE_S3_PREFIX', 'cache/file_ids/')
+
+class JsonFileStore:
+    """로컬 JSON 파일에 캐시 항목을 저장합니다. (로컬 실행 및 같은 컨테이너의 Lambda 호출 간 공유)"""
+
+    def __init__(self, path=None):
+        self.path = path or FILE_ID_CACHE_PATH
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def get(self, key):
+        with self._lock:
+            return self._load().get(key)
+
+    def set(self, key, entry):
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            # 만료된 항목 정리
+            entries = {k: v for k, v in entries.items() if v.get('expiresAt', 0) > now}
+            entries[key] = entry
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.path)
+
+class S3Store:
+    """S3 객체로 캐시 항목을 저장합니다. (Lambda 컨테이너 간 공유)"""
+
+    def __init__(self, prefix=None):
+        self.prefix = prefix or FILE_ID_CACHE_S3_PREFIX
+
+    def get(self, key):
+        from s3_helper import read_object_from_s3
+        success, content = read_object_from_s3(f"{self.prefix}{key}.json")
+        if not success:
+            return None
+        return json.loads(content)
+
+    def set(self, key, entry):
+        from s3_helper import get_s3_client, AWS_BUCKET_NAME
+        get_s3_client().put_object(
+            Bucket=AWS_BUCKET_NAME,
+            Key=f"{self.prefix}{key}.json",
+            Body=json.dumps(entry).encode('utf-8'),
+            ContentType='application/json'
+        )
+
+def create_store(store_type=None):
+    """설정에 맞는 영구 저장소를 생성합니다. 'none'이면 메모리 캐시만 사용합니다."""
+    store_type = (store_type or FILE_ID_CACHE_STORE).lower()
+    if store_type == 'file':
+        return JsonFileStore()
+    if store_type == 's3':
+        return S3Store()
+    return None
+
+class FileIdCache:
+    """이미지 바이트의 SHA-256 → 솔라피 fileId 캐시 (메모리 + 영구 저장소 2단계)"""
+
+    def __init__(self, store=None, ttl=None):
+        self.store = store
+        self.ttl = ttl or FILE_ID_CACHE_TTL
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(file_content, api_key=''):
+        # fileId는 계정별로 발급되므로 API 키도 키에 포함
+        digest = hashlib.sha256(file_content).hexdigest()
+        account = hashlib.sha256(api_key.encode()).hexdigest()[:12]
+        return f"{account}-{digest}"
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is None and self.store is not None:
+            try:
+                entry = self.store.get(key)
+            except Exception as e:
+                print(f"fileId 캐시 저장소 조회 오류: {str(e)}")
+                entry = None
+            if entry:
+                with self._lock:
+                    self._memory[key] = entry
+        if not entry or entry.get('expiresAt', 0) <= now:
+            return None
+        return entry.get('fileId')
+
+    def set(self, key, file_id):
+        entry = {'fileId': file_id, 'expiresAt': time.time() + self.ttl}
+        with self._lock:
+            self._memory[key] = entry
+        if self.store is not None:
+            try:
+                self.store.set(key, entry)
+            except Exception as e:
+                print(f"fileId 캐시 저장소 기록 오류: {str(e)}")
+
+# 웜 Lambda 호출 간에 유지되는 모듈 수준 캐시
+_cache = None
+
+def get_cache():
+    """공유 fileId 캐시를 반환합니다."""
+    global _cache
+    if _cache is None:
+        _cache = FileIdCache(store=create_store())
+    return _cache
@@ -0,0 +1,47 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# HTTP 연결 풀 설정 (환경 변수로 조정 가능)
+HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', '10'))
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '20'))
+
+# 이름별 세션 저장소 - 모듈 수준에 두어 Lambda 웜 스타트와 Flask 요청 간에 재사용
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def create_session(pool_connections=None, pool_maxsize=None):
+    """keep-alive 연결 풀을 사용하는 requests 세션을 생성합니다."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections or HTTP_POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize or HTTP_POOL_MAXSIZE
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session(name='default', pool_connections=None, pool_maxsize=None):
+    """
+    이름별로 공유되는 세션을 반환합니다.
+    최초 호출 시에만 세션을 만들고 이후에는 같은 연결 풀을 재사용합니다.
+    """
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = create_session(pool_connections, pool_maxsize)
+            _sessions[name] = session
+            print(f"HTTP 세션 생성: {name} (pool_connections={pool_connections or HTTP_POOL_CONNECTIONS}, pool_maxsize={pool_maxsize or HTTP_POOL_MAXSIZE})")
+        return session
+
+def close_sessions():
+    """생성된 모든 세션을 닫습니다."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
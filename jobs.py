@@ -0,0 +1,137 @@
+import os
+import time
+import uuid
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# 백그라운드 발송 작업 설정
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '4'))
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', '3600'))
+
+# 작업 상태: queued(대기) → running(실행 중) → done(완료) / failed(오류)
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='send-job')
+_jobs = {}
+_lock = threading.Lock()
+# 작업 상태가 바뀔 때마다 진행 상황 스트림(SSE) 대기자를 깨움
+_changed = threading.Condition(_lock)
+
+# 작업 종료 상태
+FINISHED_STATUSES = ('done', 'failed')
+
+def _cleanup(now):
+    """보관 기간이 지난 완료 작업을 정리합니다."""
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job['finishedAt'] and now - job['finishedAt'] > JOB_RETENTION_SECONDS
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+
+def submit_job(kind, fn, total=None):
+    """
+    발송 작업을 백그라운드 실행기에 등록하고 작업 ID를 바로 반환합니다.
+    fn은 인자로 작업 ID를 받아 발송 결과 딕셔너리를 반환해야 합니다.
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _lock:
+        _cleanup(now)
+        _jobs[job_id] = {
+            'jobId': job_id,
+            'type': kind,
+            'status': 'queued',
+            'total': total,
+            'sent': 0,
+            'failed': 0,
+            'remaining': total,
+            'throughput': 0,
+            'eta': None,
+            'result': None,
+            'message': '',
+            'version': 0,
+            'createdAt': now,
+            'startedAt': None,
+            'finishedAt': None
+        }
+    _executor.submit(_run, job_id, fn)
+    print(f"발송 작업 등록: {job_id} ({kind}, 대상 {total if total is not None else '미정'}건)")
+    return job_id
+
+def update_job(job_id, **fields):
+    """작업 상태 필드를 갱신하고 처리 속도(건/초)와 남은 예상 시간(초)을 다시 계산합니다."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        job.update(fields)
+        if job['total'] is not None:
+            job['remaining'] = max(0, job['total'] - job['sent'] - job['failed'])
+        
+        processed = job['sent'] + job['failed']
+        if job['startedAt'] and processed:
+            elapsed = (job['finishedAt'] or time.time()) - job['startedAt']
+            job['throughput'] = round(processed / elapsed, 1) if elapsed > 0 else 0
+            if job['remaining'] is not None and job['throughput']:
+                job['eta'] = round(job['remaining'] / job['throughput'], 1)
+        if job['status'] in FINISHED_STATUSES:
+            job['eta'] = 0
+        
+        job['version'] += 1
+        _changed.notify_all()
+
+def progress_callback(job_id):
+    """
+    발송 루프(dispatch_messages의 on_progress)에서 호출할 진행 상황 콜백을 만듭니다.
+    스트리밍 발송은 전체 건수/청크 수를 모르므로(None) 작업에 이미 알려진 값을 지우지 않습니다.
+    """
+    def on_progress(progress):
+        fields = {
+            'total': progress.get('total'),
+            'sent': progress.get('sent', 0),
+            'failed': progress.get('failed', 0),
+            'chunksDone': progress.get('chunksDone'),
+            'chunkCount': progress.get('chunkCount')
+        }
+        update_job(job_id, **{key: value for key, value in fields.items() if value is not None})
+    return on_progress
+
+def wait_for_update(job_id, version, timeout=15):
+    """
+    작업의 version이 주어진 값보다 커질 때까지 기다린 뒤 상태 복사본을 반환합니다.
+    제한 시간 안에 변화가 없으면 현재 상태를 그대로 반환합니다.
+    """
+    with _lock:
+        _changed.wait_for(
+            lambda: job_id not in _jobs or _jobs[job_id]['version'] > version,
+            timeout=timeout
+        )
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+def get_job(job_id):
+    """작업 상태의 복사본을 반환합니다. 없으면 None을 반환합니다."""
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+def _run(job_id, fn):
+    update_job(job_id, status='running', startedAt=time.time())
+    try:
+        result = fn(job_id) or {}
+        fields = {
+            'status': 'done' if result.get('success') else 'failed',
+            'result': result,
+            'message': result.get('message', ''),
+            'finishedAt': time.time()
+        }
+        # 발송 결과의 total/failedCount로 최종 집계
+        if 'total' in result:
+            failed = result.get('failedCount', 0) or 0
+            fields.update(total=result['total'], failed=failed, sent=max(0, result['total'] - failed))
+        update_job(job_id, **fields)
+        print(f"발송 작업 완료: {job_id} ({fields['status']})")
+    except Exception as e:
+        traceback.print_exc()
+        update_job(job_id, status='failed', message=str(e), finishedAt=time.time())
+        print(f"발송 작업 오류: {job_id} - {str(e)}")
@@ -0,0 +1,125 @@
+import os
+import threading
+from collections import OrderedDict
+
+# 헤더 구성(열 이름 목록)별 열 역할 추론 결과를 보관하는 최대 개수
+SCHEMA_CACHE_SIZE = int(os.environ.get('SCHEMA_CACHE_SIZE', '256'))
+
+# 역할별 열 이름 규칙 (소문자로 비교)
+#   exact: 열 이름이 정확히 같은 경우 (가장 우선, 앞에 있는 이름 우선)
+#   keywords: 열 이름에 키워드가 포함된 경우 (앞에 있는 열 우선)
+#   weak: 위 규칙으로 찾지 못했을 때만 보는 키워드
+#   exclude: 키워드가 포함되어도 이 역할로 보지 않는 열 이름
+# 역할은 아래 순서로 찾고, 이미 다른 역할로 정해진 열은 다시 쓰지 않습니다.
+COLUMN_RULES = OrderedDict([
+    ('checkbox', {'exact': ['조건', '발송여부', 'send', '전송']}),
+    ('phone', {
+        'exact': ['휴대폰번호', '전화번호'],
+        'keywords': ['수신', '휴대', '전화', '연락', '폰', 'phone', 'mobile', 'tel'],
+        'weak': ['번호'],
+        'exclude': ['수신자', '수신인']
+    }),
+    ('name', {
+        'exact': ['이름', '고객명', '성명', '받는분'],
+        'keywords': ['성명', '고객', '수신자', 'name']
+    }),
+    ('date', {
+        'exact': ['주문일자', 'date'],
+        'keywords': ['주문일자', '주문날짜', '결제일', '주문일', '구매일', 'order date', 'orderdate']
+    }),
+    ('amount', {
+        'exact': ['주문금액'],
+        'keywords': ['주문금액', '결제금액', '금액', '가격', '비용', 'price', 'amount', 'cost']
+    }),
+    ('product', {
+        'exact': ['주문상품'],
+        'keywords': ['주문상품', '상품명', '제품명', '상품', '제품', 'product', 'item']
+    }),
+    ('message', {
+        'exact': ['메시지내용', '비고', '메시지', '내용', 'text'],
+        'keywords': ['내용', '메시지', 'text']
+    }),
+])
+
+class ColumnSchema:
+    """
+    열 역할 추론 결과
+      - checkbox/phone/name/date/amount/product/message: 역할별 열 이름 (없으면 None)
+      - message_columns: 이름이 정확히 일치하는 메시지 열 목록 (우선순위 순, 값이 빈 행은 다음 열 사용)
+      - positions: 역할별 열 위치 (0부터) - CSV처럼 행이 리스트인 경우 사용
+    """
+
+    def __init__(self, columns, positions):
+        self.columns = columns
+        self.positions = positions
+        self.checkbox = self._label('checkbox')
+        self.phone = self._label('phone')
+        self.name = self._label('name')
+        self.date = self._label('date')
+        self.amount = self._label('amount')
+        self.product = self._label('product')
+        self.message = self._label('message')
+        self.message_columns = [columns[position] for position in positions['message_columns']]
+
+    def _label(self, role):
+        position = self.positions.get(role)
+        return None if position is None else self.columns[position]
+
+    def describe(self):
+        """찾은 역할별 열 이름 (로그용)"""
+        return {role: self._label(role) for role in COLUMN_RULES if self.positions.get(role) is not None}
+
+_schemas = OrderedDict()
+_schemas_lock = threading.Lock()
+
+def infer_schema(columns):
+    """
+    열 이름 목록에서 역할별 열을 찾아 ColumnSchema로 반환합니다.
+    같은 헤더 구성(공백을 제거한 열 이름 목록)은 한 번만 추론하고 이후에는 보관한 결과를 사용합니다.
+    """
+    columns = list(columns)
+    signature = tuple(str(column).strip() for column in columns)
+    with _schemas_lock:
+        positions = _schemas.get(signature)
+        if positions is not None:
+            _schemas.move_to_end(signature)
+
+    if positions is None:
+        positions = _infer_positions(signature)
+        with _schemas_lock:
+            _schemas[signature] = positions
+            while len(_schemas) > SCHEMA_CACHE_SIZE:
+                _schemas.popitem(last=False)
+    return ColumnSchema(columns, positions)
+
+def _infer_positions(names):
+    lowered = [name.lower() for name in names]
+    taken = set()
+    positions = {}
+    for role, rule in COLUMN_RULES.items():
+        position = _match_column(lowered, rule, taken)
+        if position is None and role == 'checkbox':
+            # 이름이 없는 열(보통 첫 번째 열)이 체크박스일 수 있음
+            position = next((i for i, name in enumerate(names) if name.startswith('Unnamed') or name == '0'), None)
+        if position is not None:
+            positions[role] = position
+            taken.add(position)
+
+    positions['message_columns'] = [
+        i for alias in COLUMN_RULES['message']['exact']
+        for i, name in enumerate(lowered) if name == alias and (i not in taken or i == positions.get('message'))
+    ]
+    return positions
+
+def _match_column(lowered, rule, taken):
+    for alias in rule.get('exact', ()):
+        for i, name in enumerate(lowered):
+            if name == alias and i not in taken:
+                return i
+    excluded = rule.get('exclude', ())
+    for tier in ('keywords', 'weak'):
+        keywords = rule.get(tier, ())
+        for i, name in enumerate(lowered):
+            if i not in taken and name not in excluded and any(keyword in name for keyword in keywords):
+                return i
+    return None
@@ -0,0 +1,141 @@
+import io
+import os
+import csv
+import codecs
+from itertools import compress
+import recipient_columns
+import column_schema
+
+# 인코딩 판별 시 한 번에 읽는 크기(바이트)
+DETECT_CHUNK_SIZE = 64 * 1024
+
+# 수신자 결과에 행 번호를 담을 유효하지 않은 행의 최대 수 (나머지는 건수만 집계)
+INVALID_ROW_SAMPLES = int(os.environ.get('INVALID_ROW_SAMPLES', '10'))
+
+def detect_encoding(stream):
+    """
+    CSV 스트림의 인코딩을 판별합니다. (읽은 위치는 처음으로 되돌림)
+    UTF-8 BOM이 있으면 'utf-8-sig', ASCII가 아닌 바이트가 처음 나오는 부분이 UTF-8로 읽히면 'utf-8',
+    아니면 한국어 엑셀의 CSV 저장 형식인 'cp949'(EUC-KR 포함)로 봅니다.
+    """
+    start = stream.tell()
+    try:
+        if stream.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8:
+            return 'utf-8-sig'
+        stream.seek(start)
+
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for chunk in iter(lambda: stream.read(DETECT_CHUNK_SIZE), b''):
+            if chunk.isascii():
+                continue
+            try:
+                decoder.decode(chunk)
+            except UnicodeDecodeError:
+                return 'cp949'
+            return 'utf-8'
+        return 'utf-8'
+    finally:
+        stream.seek(start)
+
+def iter_csv_rows(stream, encoding):
+    """
+    CSV 바이트 스트림을 encoding으로 디코딩하며 행(문자열 리스트)을 하나씩 반환합니다. (빈 줄 포함)
+    탐지가 틀린 바이트가 있어도 중단하지 않도록 대체 문자로 읽습니다. (숫자는 영향 없음)
+    """
+    text_stream = io.TextIOWrapper(stream, encoding=encoding, errors='replace', newline='')
+    try:
+        yield from csv.reader(text_stream)
+    finally:
+        # 래퍼가 닫힐 때 원래 스트림까지 닫지 않도록 분리
+        text_stream.detach()
+
+def parse_csv_recipients(stream, phone_index=1, name_index=None, has_header=True, max_digits=None, batch_size=None,
+                         dedupe=None):
+    """
+    CSV 스트림에서 수신번호를 한 줄씩 읽어 추출합니다. 파일 전체를 문자열로 만들지 않으며,
+    번호 정제와 자릿수 확인은 ROW_BATCH_SIZE행씩 묶어 열 단위로 처리합니다. (recipient_columns)
+    phone_index/name_index는 전화번호/이름 열 위치(0부터), max_digits는 허용하는 최대 자릿수입니다.
+    phone_index가 None이면 헤더에서 전화번호 열을 찾습니다. (column_schema)
+    유효하지 않은 행은 행마다 로그를 남기지 않고 건수(invalidCount)와 앞쪽 행 번호(invalidRows)로 보고합니다.
+    같은 번호는 처음 나온 행만 남기고 제거한 건수를 duplicateCount로 보고합니다. (dedupe 기본값은 DEDUPE_RECIPIENTS)
+    """
+    encoding = detect_encoding(stream)
+    batch_size = max(1, int(batch_size or recipient_columns.ROW_BATCH_SIZE))
+    if dedupe is None:
+        dedupe = recipient_columns.DEDUPE_RECIPIENTS
+    index = recipient_columns.PhoneIndex() if dedupe else None
+    result = {
+        'success': True,
+        'encoding': encoding,
+        'recipients': [],
+        'names': [] if name_index is not None else None,
+        'rows': 0,
+        'invalidCount': 0,
+        'invalidRows': [],
+        'duplicateCount': 0
+    }
+
+    reader = iter_csv_rows(stream, encoding)
+    try:
+        if has_header:
+            headers = next(reader, None)
+            if not headers:
+                return {'success': False, 'message': 'CSV 파일에 헤더가 없습니다.'}
+            result['headers'] = headers
+            if phone_index is None:
+                phone_index = column_schema.infer_schema(headers).positions.get('phone')
+        if phone_index is None:
+            return {'success': False, 'message': '수신자 번호 컬럼을 찾을 수 없습니다.'}
+
+        row_numbers, phones, names = [], [], []
+        for row_number, row in enumerate(reader, 1):
+            if not row:
+                continue  # 빈 줄
+            row_numbers.append(row_number)
+            phones.append(row[phone_index] if len(row) > phone_index else None)
+            if name_index is not None:
+                names.append(row[name_index].strip() if len(row) > name_index else '')
+            if len(row_numbers) >= batch_size:
+                _add_batch(result, row_numbers, phones, names, max_digits, index)
+                row_numbers, phones, names = [], [], []
+        if row_numbers:
+            _add_batch(result, row_numbers, phones, names, max_digits, index)
+    finally:
+        reader.close()
+
+    result['count'] = len(result['recipients'])
+    print(f"CSV 처리 완료 ({encoding}): {result['rows']}행 중 {result['count']}개의 전화번호 추출")
+    if result['invalidCount']:
+        sample_rows = ', '.join(map(str, result['invalidRows']))
+        if result['invalidCount'] > len(result['invalidRows']):
+            sample_rows += ' ...'
+        print(f"[경고] 전화번호가 없거나 유효하지 않은 행 {result['invalidCount']}개 건너뛰기 (행 {sample_rows})")
+    if result['duplicateCount']:
+        print(f"[정보] 중복 전화번호 {result['duplicateCount']}개 제외")
+    return result
+
+def parse_csv_bytes(content, **options):
+    """메모리에 있는 CSV 파일 바이트에서 수신번호를 추출합니다. (옵션은 parse_csv_recipients와 같음)"""
+    return parse_csv_recipients(io.BytesIO(content), **options)
+
+def _add_batch(result, row_numbers, phones, names, max_digits, index):
+    cleaned, lengths = recipient_columns.clean_phones(phones)
+    valid = lengths >= recipient_columns.MIN_PHONE_DIGITS
+    if max_digits:
+        valid &= lengths <= max_digits
+
+    invalid_count = len(row_numbers) - int(valid.sum())
+    if invalid_count:
+        result['invalidCount'] += invalid_count
+        room = INVALID_ROW_SAMPLES - len(result['invalidRows'])
+        if room > 0:
+            invalid_rows = [number for number, ok in zip(row_numbers, valid) if not ok]
+            result['invalidRows'].extend(invalid_rows[:room])
+
+    if index is not None:
+        result['duplicateCount'] += recipient_columns.drop_duplicates(cleaned, valid, index)
+
+    result['rows'] += len(row_numbers)
+    result['recipients'].extend(compress(cleaned, valid))
+    if result['names'] is not None:
+        result['names'].extend(compress(names, valid))
@@ -15,6 +15,10 @@ from dotenv import load_dotenv
 import csv
 from io import StringIO
 
+# 공통 모듈(recipient_pipeline과 의존 모듈)은 최상위 모듈의 복사본 (sync_shared.sh로 갱신)
+import recipient_pipeline
+import message_types
+
 # .env 파일 로드
 load_dotenv()
 
@@ -132,10 +136,8 @@ def send_single_message(api_key, api_secret, to, from_number, text, image_id=Non
     """단일 메시지를 발송합니다."""
     headers = get_auth_header(api_key, api_secret)
     
-    # 메시지 타입 결정
-    message_type = "MMS" if image_id else "SMS"
-    if text and len(text) > 90 and not image_id:
-        message_type = "LMS"
+    # 메시지 타입 결정 (EUC-KR 90바이트를 넘으면 LMS)
+    message_type = message_types.message_type(text, image_id)
     
     print(f"메시지 타입: {message_type}, 이미지 ID: {image_id}")
         
@@ -195,70 +197,22 @@ def send_many_messages(api_key, api_secret, messages):
         return {"error": response.text}
 
 def read_recipients_from_excel(excel_data, filename=None):
-    """CSV 파일에서 수신자 목록을 읽어옵니다."""
+    """
+    CSV 파일에서 수신자 목록을 읽어옵니다. (recipient_pipeline)
+    인코딩을 자동 판별하고, 조건(발송 여부) 열이 있으면 체크된 행만, 같은 번호는 처음 나온 행만 사용합니다.
+    """
     try:
-        # CSV 파일 읽기
-        import csv
-        from io import StringIO
+        source = recipient_pipeline.csv_source(io.BytesIO(excel_data))
+        if not source['success'] or source['phone_col'] is None:
+            return []
         
-        # 바이너리 데이터를 문자열로 디코딩
-        csv_text = excel_data.decode('utf-8-sig')  # BOM 처리
-        csv_file = StringIO(csv_text)
-        csv_reader = csv.reader(csv_file)
+        # 별도 텍스트 컬럼이 있으면 사용
+        text_col = source['schema'].message
         
         recipients = []
-        
-        # 헤더 분석
-        headers = {}
-        header_row = next(csv_reader, None)
-        if header_row:
-            for col_idx, header in enumerate(header_row):
-                if header:
-                    headers[header.strip()] = col_idx
-        
-        # 수신자 정보 추출
-        for row in csv_reader:
-            # 조건 열 확인 (조건이 있는 경우, TRUE인 경우만 발송)
-            if '조건' in headers:
-                condition = row[headers['조건']]
-                if not condition or condition.upper() == 'FALSE':
-                    continue
-            
-            # 휴대폰 번호 확인
-            phone_col = next((headers[h] for h in headers if any(k in h for k in ['휴대폰', '전화', 'phone', '수신'])), None)
-            if phone_col is None:
-                continue
-                
-            phone = row[phone_col]
-            if not phone:
-                continue
-                
-            # 전화번호 정제 (숫자만 추출)
-            if isinstance(phone, (int, float)):
-                phone = str(int(phone))
-            elif isinstance(phone, str):
-                phone = re.sub(r'[^0-9]', '', phone)
-            
-            if not phone:
-                continue
-                
-            # 메시지 내용 구성
-            text = ""
-            
-            # 별도 텍스트 컬럼이 있는지 확인
-            text_col = next((headers[h] for h in headers if any(k in h for k in ['text', '내용', '메시지'])), None)
-            if text_col is not None:
-                text = row[text_col]
-            
-            # 한 줄에 모든 수신자 정보가 있는 경우 처리
-            recipient = {
-                'to': phone,
-                'from': SENDER_PHONE,
-                'text': text if text else "",
-                'type': 'SMS'  # 기본 메시지 타입
-            }
-            
-            recipients.append(recipient)
+        for idx, row, phone in recipient_pipeline.iter_source_rows(source):
+            text = row.get(text_col) if text_col is not None else None
+            recipients.append(recipient_pipeline.build_message(phone, text or "", SENDER_PHONE))
         
         return recipients
     except Exception as e:
@@ -266,63 +220,17 @@ def read_recipients_from_excel(excel_data, filename=None):
         return []
 
 def parse_recipients_only(excel_data, filename=None):
-    """CSV 파일에서 수신자 번호만 추출합니다."""
+    """CSV 파일에서 수신자 번호만 추출합니다. (헤더에서 수신자 번호 열을 찾음)"""
     try:
-        # CSV 파일 읽기
-        import csv
-        from io import StringIO
-        
-        # 바이너리 데이터를 문자열로 디코딩
-        csv_text = excel_data.decode('utf-8-sig')  # BOM 처리
-        csv_file = StringIO(csv_text)
-        csv_reader = csv.reader(csv_file)
-        
-        # 헤더 분석
-        headers = {}
-        header_row = next(csv_reader, None)
-        if header_row:
-            for col_idx, header in enumerate(header_row):
-                if header:
-                    headers[header.strip()] = col_idx
-        
-        # 수신자 번호가 있을 것 같은 컬럼 찾기
-        phone_columns = []
-        for header, col_idx in headers.items():
-            header_lower = str(header).lower()
-            if any(keyword in header_lower for keyword in ['휴대폰', '전화', 'phone', '수신', '번호']):
-                phone_columns.append(col_idx)
-        
-        if not phone_columns:
-            return {"success": False, "message": "수신자 번호 컬럼을 찾을 수 없습니다."}
-        
-        # 첫 번째 찾은 컬럼에서 번호 추출
-        phone_col = phone_columns[0]
-        recipients = []
-        
-        for row in csv_reader:
-            if len(row) <= phone_col:
-                continue
-                
-            phone = row[phone_col]
-            if not phone:
-                continue
-                
-            # 전화번호 정제 (숫자만 추출)
-            if isinstance(phone, (int, float)):
-                phone = str(int(phone))
-            elif isinstance(phone, str):
-                phone = re.sub(r'[^0-9]', '', phone)
-            
-            if phone:
-                recipients.append(phone)
-        
-        # 중복 제거
-        recipients = list(set(recipients))
+        result = recipient_pipeline.parse_csv_bytes(excel_data, phone_index=None)
+        if not result['success']:
+            return result
         
         return {
             "success": True,
-            "recipients": recipients,
-            "count": len(recipients)
+            "recipients": result['recipients'],
+            "count": result['count'],
+            "duplicateCount": result['duplicateCount']
         }
     except Exception as e:
         return {"success": False, "message": str(e)}
@@ -503,7 +411,6 @@ def lambda_handler(event, context):
                 
             # 이미지 처리
             image_id = None
-            message_type = "SMS"
             
             if 'image' in body and body['image']:
                 image_data = body['image']
@@ -518,15 +425,14 @@ def lambda_handler(event, context):
                     filename=image_filename
                 )
                 
-                if image_id:
-                    message_type = "MMS"
-                else:
+                if not image_id:
                     return {
                         'success': False,
                         'message': f'이미지 업로드 실패: {image_error}'
                     }
             
-            # 메시지 객체 생성
+            # 메시지 객체 생성 (모든 수신자에게 같은 내용이므로 타입은 한 번만 결정)
+            message_type = message_types.message_type(text, image_id)
             messages = []
             for recipient in recipients:
                 message = {
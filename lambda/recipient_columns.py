@@ -0,0 +1,172 @@
+import os
+import numpy as np
+import pandas as pd
+from itertools import islice
+
+# 엑셀 행을 이 행 수만큼 묶어 열 단위로 수신번호 정제/발송 대상 선택을 수행
+ROW_BATCH_SIZE = int(os.environ.get('ROW_BATCH_SIZE', '10000'))
+
+# 발송 대상 체크박스 열에서 체크된 것으로 보는 값
+CHECKED_VALUES = ['TRUE', '1', 'YES', 'Y', 'O', 'V', 'T', 'OK']
+
+# 유효한 수신번호의 최소 자릿수
+MIN_PHONE_DIGITS = 10
+
+# 같은 수신번호가 여러 번 있으면 처음 나온 행에만 발송
+DEDUPE_RECIPIENTS = os.environ.get('DEDUPE_RECIPIENTS', 'True').lower() == 'true'
+
+# 정수 키로 바꿀 수 있는 최대 자릿수 ('1' + 숫자가 int64 범위 안에 들어가는 길이)
+MAX_KEY_DIGITS = 18
+
+# 숫자(0-9)와 값 구분자(\x00)를 제외한 모든 바이트 (bytes.translate로 한 번에 삭제)
+_NON_DIGIT_BYTES = bytes(b for b in range(256) if not (48 <= b <= 57 or b == 0))
+
+def clean_phones(values):
+    """
+    전화번호 열 전체를 한 번에 정제해 (정제된 전화번호 목록, 자릿수 배열)을 반환합니다.
+    열을 하나의 버퍼로 이어 붙여 숫자가 아닌 문자를 한 번에 지우고, 82로 시작하는 국제번호 형식은
+    0으로 시작하는 국내 형식으로 바꿉니다. 값이 없으면(None, NaN) 빈 문자열이 됩니다.
+    """
+    texts = list(map(str, values))
+    joined = '\x00'.join(texts)
+    if joined.count('\x00') != max(0, len(texts) - 1):
+        # 값 안에 구분자가 들어 있으면 먼저 제거
+        joined = '\x00'.join(text.replace('\x00', '') for text in texts)
+
+    buffer = ('\x00' + joined + '\x00').encode('utf-8').translate(None, _NON_DIGIT_BYTES)
+    buffer = buffer.replace(b'\x0082', b'\x000')
+
+    separators = np.flatnonzero(np.frombuffer(buffer, dtype=np.uint8) == 0)
+    lengths = np.diff(separators) - 1
+    phones = buffer[1:-1].decode('ascii').split('\x00') if texts else []
+    return phones, lengths
+
+def checked_mask(values):
+    """체크박스 열 전체에서 체크된 행을 나타내는 불리언 배열을 만듭니다. (서로 다른 값마다 한 번만 판정)"""
+    codes, uniques = pd.factorize(np.array(list(map(str, values)), dtype=object))
+    checked = np.array([value.upper() in CHECKED_VALUES for value in uniques], dtype=bool)
+    return checked[codes] if len(codes) else np.zeros(0, dtype=bool)
+
+def select_recipients(phone_values, checkbox_values=None):
+    """
+    전화번호 열과 체크박스 열로 (정제된 전화번호 목록, 발송 대상 마스크, 체크 마스크)를 한 번에 계산합니다.
+    발송 대상은 체크된 행(체크박스 열이 없으면 모든 행) 중 숫자가 MIN_PHONE_DIGITS자리 이상인 행입니다.
+    """
+    phones, lengths = clean_phones(phone_values)
+    if checkbox_values is None:
+        checked = np.ones(len(phones), dtype=bool)
+    else:
+        checked = checked_mask(checkbox_values)
+    selected = checked & (lengths >= MIN_PHONE_DIGITS)
+    return phones, selected, checked
+
+def phone_keys(phones):
+    """
+    정제된 전화번호(숫자 문자열) 목록을 정수 키 배열로 바꿉니다.
+    키는 '1' + 숫자를 정수로 읽은 값이라 앞자리 0의 개수가 달라도 서로 구분되며,
+    MAX_KEY_DIGITS자리를 넘는 번호는 -1입니다.
+    """
+    values = np.array(phones, dtype=np.str_)
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+
+    # 고정 폭 유니코드 배열을 (행, 글자) 코드 행렬로 보고 자리마다 한 번에 누적 (빈 칸은 0)
+    codes = values.view(np.uint32).reshape(len(values), -1)
+    keys = np.ones(len(values), dtype=np.int64)
+    for column in codes.T:
+        present = column != 0
+        keys = np.where(present, keys * 10 + (column.astype(np.int64) - 48), keys)
+    if codes.shape[1] > MAX_KEY_DIGITS:
+        keys[(codes != 0).sum(axis=1) > MAX_KEY_DIGITS] = -1
+    return keys
+
+class PhoneIndex:
+    """
+    이미 나온 수신번호를 정수 키의 정렬된 배열로 보관하는 중복 확인용 색인.
+    문자열 집합 대신 번호당 8바이트만 사용하며, 묶음 단위로 add를 호출하면 처음 나온 번호만 True인 마스크를 반환합니다.
+    """
+
+    def __init__(self):
+        self.keys = np.zeros(0, dtype=np.int64)
+        # MAX_KEY_DIGITS자리를 넘는 번호 (음수 키를 부여)
+        self.long_keys = {}
+        self.duplicates = 0
+
+    def add(self, phones):
+        """번호 목록을 색인에 추가하고, 앞에서(이전 묶음 포함) 나온 적 없는 첫 번호만 True인 마스크를 반환합니다."""
+        keys = phone_keys(phones)
+        for row in np.flatnonzero(keys < 0):
+            keys[row] = -2 - self.long_keys.setdefault(phones[row], len(self.long_keys))
+
+        # 묶음 안에서 처음 나온 행만 남긴 뒤, 정렬해서 색인을 찾음 (정렬된 키로 찾으면 메모리 접근이 순차적)
+        rows = np.flatnonzero(~pd.Series(keys).duplicated().to_numpy())
+        order = np.argsort(keys[rows])
+        sorted_keys = keys[rows[order]]
+
+        positions = np.searchsorted(self.keys, sorted_keys)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == sorted_keys[found]
+        added = ~found
+
+        self.keys = _merge_sorted(self.keys, sorted_keys[added], positions[added])
+        self.duplicates += len(keys) - int(added.sum())
+
+        keep = np.zeros(len(keys), dtype=bool)
+        keep[rows[order[added]]] = True
+        return keep
+
+def _merge_sorted(keys, new_keys, positions):
+    # 정렬된 keys의 positions 위치(searchsorted 결과)에 정렬된 new_keys를 끼워 넣은 배열
+    merged = np.empty(len(keys) + len(new_keys), dtype=keys.dtype)
+    new_positions = positions + np.arange(len(new_keys))
+    old_slots = np.ones(len(merged), dtype=bool)
+    old_slots[new_positions] = False
+    merged[new_positions] = new_keys
+    merged[old_slots] = keys
+    return merged
+
+def drop_duplicates(phones, selected, index):
+    """발송 대상 중 색인에 이미 있는 번호의 행을 대상에서 빼고, 뺀 건수를 반환합니다. (selected를 직접 수정)"""
+    rows = np.flatnonzero(selected)
+    keep = index.add([phones[row] for row in rows])
+    selected[rows[~keep]] = False
+    return len(rows) - int(keep.sum())
+
+def iter_selected_batches(records, phone_col, checkbox_col=None, batch_size=None, stats=None, dedupe=None):
+    """
+    레코드 스트림을 batch_size행씩 묶어 열 단위로 수신번호를 정제하고 발송 대상을 선택합니다.
+    (첫 행 번호, 레코드 목록, 정제된 전화번호, 발송 대상 마스크)를 묶음마다 반환하며,
+    stats가 주어지면 rows(읽은 행), checked(체크된 행), skipped(번호가 유효하지 않은 행),
+    duplicates(앞 행과 번호가 같아 뺀 행)를 누적합니다. dedupe 기본값은 DEDUPE_RECIPIENTS입니다.
+    """
+    batch_size = max(1, int(batch_size or ROW_BATCH_SIZE))
+    index = PhoneIndex() if (DEDUPE_RECIPIENTS if dedupe is None else dedupe) else None
+    iterator = iter(records)
+    start = 0
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+
+        checkbox_values = None if checkbox_col is None else [row.get(checkbox_col) for row in batch]
+        phones, selected, checked = select_recipients([row.get(phone_col) for row in batch], checkbox_values)
+
+        checked_count = int(checked.sum())
+        skipped_count = checked_count - int(selected.sum())
+        if skipped_count:
+            print(f"[경고] 행 {start + 1}~{start + len(batch)}: 수신번호가 없거나 유효하지 않은 {skipped_count}개 행 건너뛰기")
+        duplicate_count = drop_duplicates(phones, selected, index) if index is not None else 0
+        if stats is not None:
+            stats['rows'] += len(batch)
+            stats['checked'] += checked_count
+            stats['skipped'] += skipped_count
+            stats['duplicates'] = stats.get('duplicates', 0) + duplicate_count
+
+        yield start, batch, phones, selected
+        start += len(batch)
+
+def iter_selected_rows(records, phone_col, checkbox_col=None, batch_size=None, stats=None, dedupe=None):
+    """발송 대상 행을 (행 번호, 레코드, 정제된 전화번호)로 하나씩 반환합니다."""
+    for start, batch, phones, selected in iter_selected_batches(records, phone_col, checkbox_col, batch_size, stats, dedupe):
+        for offset in np.flatnonzero(selected):
+            yield start + int(offset), batch[offset], phones[offset]
@@ -0,0 +1,168 @@
+import io
+from itertools import compress
+import csv_recipients
+import recipient_columns
+import column_schema
+import excel_reader
+import message_types
+
+# 수신자 처리 파이프라인
+#
+# 엑셀/CSV 수신자 파일을 읽어 발송 메시지를 만드는 모든 진입점(lambda_update, s3_excel, lambda/lambda_function,
+# app의 CSV 수신자 파싱)이 같은 단계를 사용합니다.
+#   1. 디코딩: CSV 인코딩 자동 판별 (csv_recipients.detect_encoding) / 엑셀 메모리 로드 (excel_reader)
+#   2. 파싱: 행 레코드 스트림과 열 역할 추론 (csv_source, sheet_source, column_schema)
+#   3. 정제: 수신번호 열 단위 정제 (recipient_columns.clean_phones)
+#   4. 선택: 체크박스/자릿수 확인과 중복 제거 (iter_source_batches, iter_source_rows, select_phone_list)
+#   5. 렌더링: 템플릿 컴파일 후 행마다 join (message_template)
+#   6. 메시지 생성: 문자 포맷팅과 EUC-KR 바이트 길이로 SMS/LMS/MMS 구분, 타입별 건수 집계 (build_message, build_messages,
+#      tally_texts - message_types)
+
+# ---- 디코딩/파싱 ----
+
+def new_stats():
+    """읽은 행/체크된 행/건너뛴 행/중복 제거된 행 수"""
+    return {'rows': 0, 'checked': 0, 'skipped': 0, 'duplicates': 0}
+
+def recipient_source(columns, records, **extra):
+    """
+    열 이름 목록과 행 레코드({열 이름: 값}) 스트림으로 수신자 소스를 만듭니다.
+    열 역할(schema)은 헤더 구성별로 한 번만 추론하며, extra는 소스에 그대로 추가합니다.
+    """
+    schema = column_schema.infer_schema(columns)
+    print(f"열 역할: {schema.describe()}")
+    source = {
+        'success': True,
+        'columns': columns,
+        'records': records,
+        'schema': schema,
+        'phone_col': schema.phone,
+        'checkbox_col': schema.checkbox,
+        'stats': new_stats()
+    }
+    source.update(extra)
+    return source
+
+def sheet_source(sheet):
+    """엑셀 시트를 수신자 소스로 엽니다. (첫 행은 헤더, 행은 읽는 대로 하나씩)"""
+    columns, records = excel_reader.sheet_records(sheet)
+    return recipient_source(columns, records)
+
+def csv_source(stream):
+    """
+    CSV 바이트 스트림을 수신자 소스로 엽니다. 인코딩을 자동 판별하고 첫 행은 헤더로 사용합니다.
+    행은 읽는 대로 하나씩 레코드로 만들며 빈 줄은 건너뜁니다.
+    """
+    encoding = csv_recipients.detect_encoding(stream)
+    rows = csv_recipients.iter_csv_rows(stream, encoding)
+    headers = next(rows, None)
+    if not headers:
+        rows.close()
+        return {'success': False, 'message': 'CSV 파일에 헤더가 없습니다.'}
+
+    columns = [header.strip() for header in headers]
+    records = (dict(zip(columns, row)) for row in rows if row)
+    return recipient_source(columns, records, encoding=encoding)
+
+def parse_csv(stream, **options):
+    """
+    CSV 수신자 파일에서 수신번호(와 이름)만 추출합니다. 디코딩부터 중복 제거까지 한 번에 처리하며
+    옵션과 결과 형식은 csv_recipients.parse_csv_recipients와 같습니다.
+    """
+    return csv_recipients.parse_csv_recipients(stream, **options)
+
+def parse_csv_bytes(content, **options):
+    """메모리에 있는 CSV 파일 바이트에서 수신번호를 추출합니다. (옵션은 parse_csv와 같음)"""
+    return parse_csv(io.BytesIO(content), **options)
+
+# ---- 정제/선택 ----
+
+def iter_source_batches(source, batch_size=None, dedupe=None):
+    """
+    소스의 행을 ROW_BATCH_SIZE행씩 묶어 수신번호 정제와 발송 대상 선택(체크된 행 중 유효하고 처음 나온 번호)을
+    열 단위로 수행하고 (첫 행 번호, 레코드 목록, 정제된 전화번호, 발송 대상 마스크)를 반환합니다.
+    행 수 통계는 source['stats']에 누적합니다.
+    """
+    return recipient_columns.iter_selected_batches(
+        source['records'], source['phone_col'], source['checkbox_col'],
+        batch_size=batch_size, stats=source['stats'], dedupe=dedupe
+    )
+
+def iter_source_rows(source, batch_size=None, dedupe=None):
+    """발송 대상 행을 (행 번호, 레코드, 정제된 전화번호)로 하나씩 반환합니다."""
+    return recipient_columns.iter_selected_rows(
+        source['records'], source['phone_col'], source['checkbox_col'],
+        batch_size=batch_size, stats=source['stats'], dedupe=dedupe
+    )
+
+def select_phone_list(values, dedupe=None):
+    """
+    수신번호 목록을 열 단위로 정제하고 유효하지 않은 번호와 (dedupe이면) 중복 번호를 뺍니다.
+    (발송할 번호 목록, 유효하지 않은 건수, 중복 건수)를 반환합니다. dedupe 기본값은 DEDUPE_RECIPIENTS입니다.
+    """
+    phones, selected, _ = recipient_columns.select_recipients(values)
+    invalid_count = int((~selected).sum())
+    if invalid_count:
+        print(f"[경고] 유효하지 않은 수신번호 {invalid_count}개 제외")
+
+    duplicate_count = 0
+    if recipient_columns.DEDUPE_RECIPIENTS if dedupe is None else dedupe:
+        # 같은 번호는 처음 나온 순서대로 한 번만 발송
+        duplicate_count = recipient_columns.drop_duplicates(phones, selected, recipient_columns.PhoneIndex())
+        if duplicate_count:
+            print(f"[정보] 중복 수신번호 {duplicate_count}개 제외")
+    return list(compress(phones, selected)), invalid_count, duplicate_count
+
+# ---- 메시지 생성 ----
+
+def format_message_for_sms(text):
+    """
+    문자 메시지에 최적화된 포맷팅을 적용합니다.
+    솔라피 메시지 전송 시 줄바꿈과 공백이 유지되도록 처리합니다.
+    """
+    if not text:
+        return text
+
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = text.replace('\xa0', ' ')
+    text = text.replace(': ', ':').replace(':', ': ')
+    while "  " in text: text = text.replace("  ", " ")
+    return text.replace('\n', '\r\n')
+
+def message_type(text, image_id=None):
+    """메시지 타입 (포맷팅한 원문의 EUC-KR 바이트 길이로 판별, 이미지가 있으면 MMS)"""
+    return message_types.message_type(format_message_for_sms(text), image_id)
+
+def tally_texts(tally, texts, image_id=None):
+    """렌더링된 메시지 원문 묶음을 포맷팅해 바이트 길이와 타입을 한 번에 계산하고 타입별 건수를 tally에 더합니다."""
+    return message_types.tally_texts(tally, [format_message_for_sms(text) for text in texts], image_id)
+
+def build_message(phone, text, sender_phone, image_id=None, subject=None, tally=None):
+    """
+    정제된 전화번호와 메시지 원문으로 발송 메시지를 만듭니다.
+    타입은 실제로 보낼 포맷팅된 원문의 바이트 길이로 정하고, 제목(subject)은 SMS에서 사용할 수 없으므로 LMS/MMS에만 넣습니다.
+    tally가 주어지면 타입별 건수를 더합니다.
+    """
+    text = format_message_for_sms(text)
+    length = message_types.byte_length(text)
+    msg_type = message_types.classify(length, image_id)
+    if tally is not None:
+        message_types.count_message(tally, msg_type, length)
+    message = {
+        'to': phone,
+        'from': sender_phone.replace('-', ''),  # 하이픈 제거
+        'text': text,
+        'type': msg_type
+    }
+    if subject and msg_type != 'SMS':
+        message['subject'] = subject
+    if image_id:
+        message['imageId'] = image_id
+    return message
+
+def build_messages(phones, text, sender_phone, image_id=None, subject=None, tally=None):
+    """모든 수신자에게 같은 내용을 보내는 메시지 목록을 만듭니다. (포맷팅과 타입 결정은 한 번만)"""
+    template = build_message('', text, sender_phone, image_id, subject)
+    if tally is not None:
+        message_types.count_message(tally, template['type'], message_types.byte_length(template['text']), len(phones))
+    return [dict(template, to=phone) for phone in phones]
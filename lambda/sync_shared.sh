@@ -0,0 +1,25 @@
+#!/bin/bash
+
+# 저장소 최상위의 공통 모듈을 lambda/ 디렉터리로 복사합니다.
+# serverless는 lambda/ 디렉터리만 패키징하므로 lambda_function.py가 쓰는 공통 모듈은 복사본을 함께 커밋합니다.
+# 최상위 모듈을 고친 뒤에는 이 스크립트를 실행하고, --check로 복사본이 최신인지 확인할 수 있습니다. (배포 전 확인용)
+
+cd "$(dirname "$0")"
+
+SHARED_MODULES="recipient_pipeline.py csv_recipients.py recipient_columns.py column_schema.py excel_reader.py message_types.py"
+
+if [ "$1" == "--check" ]; then
+    status=0
+    for module in $SHARED_MODULES; do
+        if ! cmp -s "../$module" "$module"; then
+            echo "복사본이 최신이 아닙니다: lambda/$module"
+            status=1
+        fi
+    done
+    exit $status
+fi
+
+for module in $SHARED_MODULES; do
+    cp "../$module" "$module"
+    echo "복사: $module"
+done
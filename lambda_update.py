@@ -13,24 +13,104 @@ import mimetypes
 import platform
 import sys
 import requests
+import urllib3
 import csv
 import re
+import numpy as np
 import pandas as pd
 import traceback
 from io import StringIO
 from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from itertools import islice, chain
+from http_pool import get_session, HTTP_POOL_MAXSIZE
+from rate_limiter import AdaptiveRateLimiter, is_throttled, response_error_code
+import retry_queue
+import file_id_cache
+import payload_codec
+import excel_reader
+import recipient_columns
+import message_template
+import parse_cache
+import recipient_pipeline
+import message_types
 
 # 변경 이력
 # -----------------------------------
 # 2023-07-01: 초기 구현
 # 2023-10-15: 자동 메시지 기능 추가
 # 2024-05-13: auto_excel_preview 타입으로 통일, bulk_excel 타입 참조 제거
+# 2026-10-17: 대량 발송 성능 개선 (청크 병렬/asyncio 발송, 속도 제한, 재시도 큐, 엑셀 스트리밍 처리, 파싱 캐시, 공통 수신자 파이프라인)
 # -----------------------------------
 
 # 솔라피 API URL 상수 추가
 API_BASE_URL = "https://api.solapi.com/messages/v4"
 FILE_UPLOAD_URL = "https://api.solapi.com/storage/v1/files"
 
+# 대량 발송 설정 (send-many 요청 1회당 메시지 수, 동시 요청 수)
+SEND_CHUNK_SIZE = int(os.environ.get('SEND_CHUNK_SIZE', '1000'))
+SEND_CONCURRENCY = int(os.environ.get('SEND_CONCURRENCY', '4'))
+
+# asyncio 백엔드의 동시 요청 수 (스레드 없이 이벤트 루프 하나로 처리하므로 스레드 백엔드보다 크게 설정)
+SEND_ASYNC_CONCURRENCY = int(os.environ.get('SEND_ASYNC_CONCURRENCY', '64'))
+
+# 솔라피 요청 제한 시간(초) - 연결 수립, 응답 대기 (스레드/asyncio 백엔드 공통)
+SEND_CONNECT_TIMEOUT = float(os.environ.get('SEND_CONNECT_TIMEOUT', '3'))
+SEND_REQUEST_TIMEOUT = float(os.environ.get('SEND_REQUEST_TIMEOUT', '10'))
+
+# 자동메시지 미리보기에서 렌더링할 행 수 (나머지 행은 건수만 계산)
+PREVIEW_ROWS = int(os.environ.get('PREVIEW_ROWS', '5'))
+
+# 미리보기(캐시 미스)에서 건수를 세며 모든 행을 렌더링해 파싱 캐시를 채울지 여부 (발송 단계는 엑셀을 다시 읽지 않음)
+# 끄면 미리보기는 앞 PREVIEW_ROWS건만 렌더링하고, 캐시는 첫 발송에서 채워짐
+PREVIEW_FILL_CACHE = os.environ.get('PREVIEW_FILL_CACHE', 'True').lower() == 'true'
+
+# 발송 백엔드 선택 ('thread': requests + 스레드 풀, 'asyncio': aiohttp 이벤트 루프)
+SEND_BACKEND = os.environ.get('SEND_BACKEND', 'thread').lower()
+
+# 솔라피 호출 속도 제한기 - 웜 Lambda 호출 간에 학습된 속도를 유지
+# (asyncio 백엔드는 동시 요청 수 한도가 SEND_ASYNC_CONCURRENCY인 별도 제한기 사용)
+SOLAPI_LIMITER = AdaptiveRateLimiter(max_concurrency=SEND_CONCURRENCY)
+SOLAPI_ASYNC_LIMITER = AdaptiveRateLimiter(max_concurrency=SEND_ASYNC_CONCURRENCY)
+
+# 솔라피 오류 코드별 안내 메시지
+ERROR_MESSAGES = {
+    "ValidationError": "유효성 검사 오류",
+    "HttpError": "HTTP 오류",
+    "InsufficientBalance": "잔액 부족",
+    "NotEnoughBalance": "잔액 부족",
+    "RateLimitError": "요청 한도 초과",
+    "ServerError": "서버 오류",
+    "InvalidPhoneNumber": "유효하지 않은 전화번호",
+    "InvalidFrom": "발신번호 오류",
+    "BlockedNumber": "차단된 번호",
+    "ResponseTimeout": "응답 시간 초과 (발송 여부 확인 필요)",
+    "RequestError": "요청 오류"
+}
+
+# 청크 요청 자체가 실패했을 때 재시도해도 안전한 오류 코드
+# (429/5xx 응답과 요청을 보내기 전의 연결 오류만 HttpError, 응답 대기 중 시간 초과는 이미 접수되었을 수 있어 제외)
+RETRYABLE_STATUS_ERROR_CODES = ('RateLimitError', 'ServerError')
+
+def get_solapi_session():
+    """솔라피 API 호출용 공유 세션을 반환합니다. 병렬 발송 수만큼 연결 풀을 확보합니다."""
+    return get_session('solapi', pool_maxsize=max(HTTP_POOL_MAXSIZE, SEND_CONCURRENCY))
+
+def solapi_post(url, headers, payload):
+    """
+    속도 제한기를 거쳐 솔라피 API에 POST 요청을 보내고 응답 결과로 속도를 조정합니다.
+    응답이 멈춘 연결이 제한기 슬롯과 작업 스레드를 계속 잡고 있지 않도록 연결/응답 대기 시간을 제한합니다.
+    """
+    SOLAPI_LIMITER.acquire()
+    throttled = None  # 응답을 받지 못하면 속도 제한 신호로 보지 않음
+    try:
+        response = get_solapi_session().post(url, headers=headers, json=payload,
+                                             timeout=(SEND_CONNECT_TIMEOUT, SEND_REQUEST_TIMEOUT))
+        throttled = is_throttled(response.status_code, response.text)
+        return response
+    finally:
+        SOLAPI_LIMITER.release(throttled)
+
 def get_auth_header(api_key, api_secret):
     """HTTP 요청 인증을 위한, HMAC 서명 기반 헤더를 생성합니다."""
     date = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
@@ -70,6 +150,16 @@ def upload_file(api_key, api_secret, file_content, filename):
             print("JPG 형식의 파일만 지원됩니다.")
             return None, "INVALID_FILE_TYPE"
         
+        # 같은 이미지를 이미 업로드했다면 캐시된 fileId 재사용
+        cache_key = None
+        if file_id_cache.FILE_ID_CACHE_ENABLED:
+            cache = file_id_cache.get_cache()
+            cache_key = cache.make_key(file_content, api_key)
+            cached_file_id = cache.get(cache_key)
+            if cached_file_id:
+                print(f"캐시된 fileId 사용: fileId={cached_file_id}")
+                return cached_file_id, ""
+        
         # base64 인코딩
         file_base64 = base64.b64encode(file_content).decode('utf-8')
         
@@ -89,11 +179,7 @@ def upload_file(api_key, api_secret, file_content, filename):
         print(f"파일명: {filename}")
         
         # 요청 전송
-        response = requests.post(
-            FILE_UPLOAD_URL,
-            headers=headers,
-            json=payload
-        )
+        response = solapi_post(FILE_UPLOAD_URL, headers, payload)
         
         print(f"API 응답: status_code={response.status_code}, text={response.text}")
         
@@ -102,6 +188,8 @@ def upload_file(api_key, api_secret, file_content, filename):
             if "fileId" in result:
                 file_id = result["fileId"]
                 print(f"파일 업로드 성공: fileId={file_id}")
+                if cache_key:
+                    file_id_cache.get_cache().set(cache_key, file_id)
                 return file_id, ""
             else:
                 print("fileId가 응답에 없음")
@@ -140,10 +228,10 @@ def send_mms(api_key, api_secret, to, from_number, text, image_id):
     print(f"MMS 요청 데이터: {json.dumps(data)}")
     
     # API 요청
-    api_url = "https://api.solapi.com/messages/v4/send"
+    api_url = f"{API_BASE_URL}/send"
     try:
         # requests를 사용한 요청
-        response = requests.post(api_url, headers=headers, json=data)
+        response = solapi_post(api_url, headers, data)
         print(f"Solapi MMS 응답: status_code={response.status_code}, text={response.text}")
         
         if response.status_code == 200:
@@ -170,10 +258,8 @@ def send_sms(api_key, api_secret, to, from_number, text):
     # 인증 헤더 생성
     headers = get_auth_header(api_key, api_secret)
     
-    # 메시지 타입 결정 (SMS 또는 LMS)
-    message_type = "SMS"
-    if text and len(text) > 90:
-        message_type = "LMS"
+    # 메시지 타입 결정 (EUC-KR 90바이트 이하 SMS, 넘으면 LMS)
+    message_type = message_types.message_type(text)
     
     print(f"메시지 타입: {message_type}")
     
@@ -188,10 +274,10 @@ def send_sms(api_key, api_secret, to, from_number, text):
     }
     
     # API 요청
-    api_url = "https://api.solapi.com/messages/v4/send"
+    api_url = f"{API_BASE_URL}/send"
     try:
         # requests를 사용한 요청
-        response = requests.post(api_url, headers=headers, json=data)
+        response = solapi_post(api_url, headers, data)
         print(f"Solapi 응답: status_code={response.status_code}, text={response.text[:200]}")
         
         if response.status_code == 200:
@@ -213,6 +299,32 @@ def send_sms(api_key, api_secret, to, from_number, text):
             "message": f"발송 중 오류: {str(e)}"
         }
 
+def chunk_error_code(status_code, body_text=''):
+    """
+    200이 아닌 청크 응답의 오류 코드를 정합니다.
+    429/5xx는 재시도 대상(솔라피 RateLimitError/ServerError 또는 HttpError)이고,
+    4xx(유효성 검사, 인증, 잔액 부족 등)는 솔라피 오류 코드(없으면 HttpXXX)로 기록해 재시도하지 않습니다.
+    """
+    code = response_error_code(body_text)
+    if status_code == 429 or status_code >= 500:
+        return code if code in RETRYABLE_STATUS_ERROR_CODES else "HttpError"
+    return code or f"Http{status_code}"
+
+def request_exception_code(error):
+    """
+    requests 예외의 오류 코드를 정합니다. 요청을 보내기 전의 연결 실패(DNS, 연결 거부/시간 초과)만 HttpError이고,
+    응답 대기 중 시간 초과는 솔라피가 이미 접수했을 수 있으므로 중복 발송을 막기 위해 재시도하지 않습니다.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return "HttpError"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = getattr(error.args[0], 'reason', error.args[0]) if error.args else None
+        if isinstance(reason, urllib3.exceptions.ConnectTimeoutError):  # NewConnectionError/NameResolutionError 포함
+            return "HttpError"
+    if isinstance(error, requests.exceptions.Timeout):
+        return "ResponseTimeout"
+    return "RequestError"
+
 def send_many_messages(api_key, api_secret, messages):
     """다수의 메시지를 발송합니다."""
     if not messages:
@@ -224,86 +336,348 @@ def send_many_messages(api_key, api_secret, messages):
     # 요청 데이터 구성
     data = {"messages": messages}
     
-    print(f"대량 메시지 발송 요청: {json.dumps(data)}")
+    print(f"대량 메시지 발송 요청: {len(messages)}건")
     
     # API 요청
-    api_url = "https://api.solapi.com/messages/v4/send-many"
+    api_url = f"{API_BASE_URL}/send-many"
     try:
         # requests를 사용한 요청
-        response = requests.post(api_url, headers=headers, json=data)
+        response = solapi_post(api_url, headers, data)
         print(f"Solapi 대량 발송 응답: status_code={response.status_code}, text={response.text[:200]}")
         
         if response.status_code == 200:
             result = response.json()
             return result
         else:
-            return {"error": response.text}
+            return {"error": response.text, "errorCode": chunk_error_code(response.status_code, response.text)}
     except Exception as e:
         print(f"대량 메시지 발송 중 오류 발생: {str(e)}")
-        return {"error": str(e)}
+        return {"error": str(e), "errorCode": request_exception_code(e)}
 
-def parse_recipients_only(excel_data, filename=None):
-    """CSV 파일에서 수신자 번호만 추출합니다."""
+def split_into_chunks(messages, chunk_size):
+    """메시지 목록을 chunk_size 크기의 청크로 나눕니다."""
+    chunk_size = max(1, int(chunk_size))
+    return [messages[i:i + chunk_size] for i in range(0, len(messages), chunk_size)]
+
+def count_chunk_failures(chunk, result):
+    """청크 발송 결과에서 실패 건수를 계산합니다. 요청 자체가 실패하면 청크 전체가 실패입니다."""
+    if not isinstance(result, dict) or "error" in result:
+        return len(chunk)
+    return len(result.get("failedMessageList") or [])
+
+def make_progress_reporter(total, chunk_count, on_progress):
+    """청크가 끝날 때마다 누적 발송/실패 건수를 on_progress로 전달하는 함수를 만듭니다."""
+    if on_progress is None:
+        return None
+    
+    state = {"sent": 0, "failed": 0, "chunksDone": 0}
+    
+    def report(chunk, result):
+        failed = count_chunk_failures(chunk, result)
+        state["failed"] += failed
+        state["sent"] += len(chunk) - failed
+        state["chunksDone"] += 1
+        try:
+            on_progress({
+                "total": total,
+                "sent": state["sent"],
+                "failed": state["failed"],
+                "chunksDone": state["chunksDone"],
+                "chunkCount": chunk_count
+            })
+        except Exception as e:
+            print(f"진행 상황 콜백 오류: {str(e)}")
+    
+    return report
+
+def new_chunk_results():
+    """청크별 발송 결과를 합칠 빈 결과를 만듭니다."""
+    return {
+        "failedMessageList": [],
+        "chunkCount": 0,
+        "failedChunkCount": 0
+    }
+
+def add_chunk_result(merged, chunk, result):
+    """
+    청크 하나의 발송 결과를 합친 결과에 더합니다.
+    청크 전체가 실패한 경우 청크 내 모든 메시지를 청크 오류 코드(errorCode, 없으면 RequestError)로 기록합니다.
+    merged에 failedOriginals가 있으면 실패한 원본 메시지도 함께 모읍니다. (재시도 큐 저장용)
+    """
+    merged["chunkCount"] += 1
+    failed_start = len(merged["failedMessageList"])
+    
+    if not isinstance(result, dict) or "error" in result:
+        # 청크 전체 실패 - 청크 내 모든 메시지를 실패로 기록
+        error = result.get("error") if isinstance(result, dict) else str(result)
+        error_code = (result.get("errorCode") if isinstance(result, dict) else None) or "RequestError"
+        print(f"청크 발송 실패 ({len(chunk)}건, {error_code}): {str(error)[:200]}")
+        merged["failedChunkCount"] += 1
+        for message in chunk:
+            merged["failedMessageList"].append({
+                "to": message.get("to", "알 수 없음"),
+                "errorCode": error_code,
+                "errorMessage": str(error)
+            })
+    elif result.get("failedMessageList"):
+        merged["failedMessageList"].extend(result["failedMessageList"])
+    
+    if "failedOriginals" in merged and len(merged["failedMessageList"]) > failed_start:
+        failed_to = {failed.get("to") for failed in merged["failedMessageList"][failed_start:]}
+        merged["failedOriginals"].extend(message for message in chunk if message.get("to") in failed_to)
+
+def finish_chunk_results(merged, limiter=None):
+    """합친 결과에 현재 허용 속도(limiter, 기본은 스레드 백엔드 제한기)를 기록하고 요약을 출력합니다."""
+    merged["rateLimit"] = (limiter or SOLAPI_LIMITER).snapshot()
+    print(f"청크 발송 완료: 실패 청크 {merged['failedChunkCount']}개, 실패 메시지 {len(merged['failedMessageList'])}건, 현재 허용 속도 {merged['rateLimit']['rate']}req/s")
+    return merged
+
+def merge_chunk_results(results, limiter=None):
+    """(청크, 발송 결과) 목록을 하나의 결과로 합칩니다."""
+    merged = new_chunk_results()
+    for chunk, result in results:
+        add_chunk_result(merged, chunk, result)
+    return finish_chunk_results(merged, limiter)
+
+def dispatch_messages(api_key, api_secret, messages, chunk_size=None, concurrency=None, backend=None, on_progress=None):
+    """
+    메시지 목록을 청크로 나누어 send-many API로 병렬 발송합니다.
+    청크별 failedMessageList를 하나로 합쳐 send_many_messages와 같은 형태로 반환합니다.
+    backend가 'asyncio'이면 async_sender의 이벤트 루프 기반 발송을 사용합니다.
+    on_progress가 주어지면 청크가 끝날 때마다 누적 진행 상황을 전달합니다.
+    """
+    if not messages:
+        return {"error": "메시지가 없습니다."}
+    
+    chunk_size = chunk_size or SEND_CHUNK_SIZE
+    backend = backend or SEND_BACKEND
+    
+    if backend == 'asyncio':
+        from async_sender import is_available, run_dispatch
+        if is_available():
+            return run_dispatch(api_key, api_secret, messages, chunk_size, concurrency or SEND_ASYNC_CONCURRENCY,
+                                on_progress=on_progress)
+        print("aiohttp가 설치되어 있지 않습니다. 스레드 기반 발송을 사용합니다.")
+    
+    concurrency = concurrency or SEND_CONCURRENCY
+    chunks = split_into_chunks(messages, chunk_size)
+    workers = max(1, min(int(concurrency), len(chunks)))
+    print(f"청크 발송 시작: 총 {len(messages)}건, 청크 {len(chunks)}개 (크기 {chunk_size}), 동시 요청 {workers}개")
+    report = make_progress_reporter(len(messages), len(chunks), on_progress)
+    
+    results = []
+    # 단일 청크는 스레드 풀 없이 바로 발송
+    if workers == 1:
+        for chunk in chunks:
+            result = send_many_messages(api_key, api_secret, chunk)
+            results.append((chunk, result))
+            if report:
+                report(chunk, result)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(send_many_messages, api_key, api_secret, chunk): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"error": str(e)}
+                results.append((chunk, result))
+                if report:
+                    report(chunk, result)
+    
+    return merge_chunk_results(results)
+
+def iter_chunks(messages, chunk_size):
+    """메시지 이터러블을 chunk_size 크기의 리스트로 차례로 나눕니다. (전체 목록을 만들지 않음)"""
+    chunk_size = max(1, int(chunk_size))
+    iterator = iter(messages)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def new_stream_results():
+    """스트리밍 발송 결과를 합칠 빈 결과를 만듭니다. (발송 건수와 실패한 원본 메시지 포함)"""
+    merged = new_chunk_results()
+    merged["total"] = 0
+    merged["failedOriginals"] = []
+    return merged
+
+def dispatch_message_stream(api_key, api_secret, messages, chunk_size=None, concurrency=None, backend=None, on_progress=None):
+    """
+    메시지 이터러블(제너레이터)을 청크 단위로 읽으며 send-many API로 병렬 발송합니다.
+    동시에 발송 중인 청크만 메모리에 두므로 수신자 수와 관계없이 메모리 사용량이 일정합니다.
+    결과는 dispatch_messages와 같은 형태에 발송 건수(total)와 실패한 원본 메시지(failedOriginals)가 추가됩니다.
+    전체 건수를 미리 알 수 없으므로 on_progress의 total은 None입니다.
+    """
+    chunk_size = chunk_size or SEND_CHUNK_SIZE
+    backend = backend or SEND_BACKEND
+    chunks = iter_chunks(messages, chunk_size)
+    
+    if backend == 'asyncio':
+        from async_sender import is_available, run_dispatch_stream
+        if is_available():
+            return run_dispatch_stream(api_key, api_secret, chunks, concurrency or SEND_ASYNC_CONCURRENCY,
+                                       on_progress=on_progress)
+        print("aiohttp가 설치되어 있지 않습니다. 스레드 기반 발송을 사용합니다.")
+    
+    concurrency = max(1, int(concurrency or SEND_CONCURRENCY))
+    print(f"스트리밍 청크 발송 시작: 청크 크기 {chunk_size}, 동시 요청 {concurrency}개")
+    report = make_progress_reporter(None, None, on_progress)
+    merged = new_stream_results()
+    
+    def collect(future, chunk):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"error": str(e)}
+        merged["total"] += len(chunk)
+        add_chunk_result(merged, chunk, result)
+        if report:
+            report(chunk, result)
+    
+    pending = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for chunk in chunks:
+            # 동시 요청 수만큼 발송 중이면 하나가 끝날 때까지 다음 청크를 읽지 않음
+            if len(pending) >= concurrency:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future, pending.pop(future))
+            pending[executor.submit(send_many_messages, api_key, api_secret, chunk)] = chunk
+        for future in as_completed(pending):
+            collect(future, pending[future])
+    
+    print(f"스트리밍 발송 건수: {merged['total']}건")
+    return finish_chunk_results(merged)
+
+def queue_retryable_failures(messages, failed_messages, campaign_id=None):
+    """재시도 가능한 실패 메시지를 재시도 큐에 저장합니다. 큐 오류는 발송 결과에 영향을 주지 않습니다."""
     try:
-        # CSV 파일 읽기
-        csv_text = excel_data.decode('utf-8-sig')  # BOM 처리
-        csv_file = StringIO(csv_text)
-        csv_reader = csv.reader(csv_file)
-        
-        print(f"CSV 파일 읽기 시작: {filename}")
-        
-        # 헤더 읽기
-        headers = next(csv_reader, None)
-        if not headers:
-            print("CSV 파일에 헤더가 없습니다.")
-            return {"success": False, "message": "CSV 파일에 헤더가 없습니다."}
-            
-        print(f"CSV 헤더: {headers}")
+        return retry_queue.enqueue_failures(messages, failed_messages, campaign_id)
+    except Exception as e:
+        print(f"재시도 큐 저장 중 오류 발생: {str(e)}")
+        return 0
+
+def build_failed_list(failed_messages):
+    """솔라피 failedMessageList를 화면 표시용 실패 목록으로 변환합니다."""
+    failed_list = []
+    for failed in failed_messages:
+        error_info = {
+            "to": failed.get("to", "알 수 없음"),
+            "reason": "알 수 없는 오류"
+        }
         
-        # B열 (인덱스 1)에서 전화번호 추출
-        recipients = []
-        names = []  # 이름 목록도 추출
-        for row_idx, row in enumerate(csv_reader, 1):
-            try:
-                if len(row) > 1:  # B열이 있는지 확인
-                    phone = str(row[1]).strip()  # B열 (인덱스 1)
-                    # 숫자만 추출
-                    phone = ''.join(c for c in phone if c.isdigit())
-                    
-                    # 이름 추출 (A열)
-                    name = row[0].strip() if len(row) > 0 else ""
-                    
-                    if phone and len(phone) >= 10:
-                        recipients.append(phone)
-                        names.append(name)
-                        print(f"행 {row_idx}: 전화번호 추출 성공 - {phone}, 이름: {name}")
-                    else:
-                        print(f"행 {row_idx}: 유효하지 않은 전화번호 형식 - {row[1]}")
-                else:
-                    print(f"행 {row_idx}: B열이 없음")
-            except Exception as row_error:
-                print(f"행 {row_idx} 처리 중 오류: {str(row_error)}")
-                continue
+        if "errorCode" in failed:
+            code = failed["errorCode"]
+            if code in ERROR_MESSAGES:
+                error_info["reason"] = ERROR_MESSAGES[code]
+            else:
+                error_info["reason"] = f"오류 코드: {code}"
         
-        print(f"CSV 처리 완료: 총 {len(recipients)}개의 전화번호 추출")
+        failed_list.append(error_info)
+    return failed_list
+
+def has_file_data(file_data):
+    """파일 필드에 원본 바이트(content), S3 객체 키(s3Key) 또는 base64 데이터(data)가 있는지 확인합니다."""
+    return isinstance(file_data, dict) and bool(
+        file_data.get('content') or file_data.get('s3Key') or file_data.get('data')
+    )
+
+def get_file_field(body, field='excel'):
+    """
+    요청 본문에서 파일 필드를 꺼냅니다. JSON 문자열로 전달된 필드와
+    브라우저 직접 업로드 후 최상위로 전달된 객체 키(s3Key, filename)도 지원합니다.
+    """
+    file_data = body.get(field)
+    if isinstance(file_data, str):
+        file_data = json.loads(file_data)
+    if not file_data and body.get('s3Key'):
+        file_data = {'s3Key': body['s3Key'], 'filename': body.get('filename')}
+    return file_data
+
+def read_file_data(file_data):
+    """
+    파일 필드의 내용을 바이트로 반환합니다.
+    인프로세스 호출은 원본 바이트(content)를, S3 전송 모드는 객체 키(s3Key)를,
+    그 외 HTTP 호출은 base64 문자열(data)을 전달합니다.
+    """
+    content = file_data.get('content')
+    if content:
+        return bytes(content)
+    
+    s3_key = file_data.get('s3Key')
+    if s3_key:
+        from s3_helper import read_object_from_s3, is_upload_key
+        if not is_upload_key(s3_key):
+            raise ValueError(f'허용되지 않은 파일 경로입니다: {s3_key}')
+        success, content = read_object_from_s3(s3_key)
+        if not success:
+            raise ValueError(f'S3 파일 읽기 실패: {content}')
+        print(f"S3 파일 읽기 완료: {s3_key}, 크기={len(content)} bytes")
+        return content
+    
+    return base64.b64decode(file_data['data'])
+
+def to_log_json(value):
+    """로그 출력용 JSON 문자열을 만듭니다. 원본 바이트는 크기만 표시합니다."""
+    def describe(obj):
+        if isinstance(obj, (bytes, bytearray, memoryview)):
+            return f"<{len(obj)} bytes>"
+        return str(obj)
+    return json.dumps(value, default=describe)
+
+def parse_recipients_only(excel_data, filename=None):
+    """
+    CSV 파일에서 수신자 번호만 추출합니다. (B열: 전화번호, A열: 이름, 첫 행은 헤더)
+    인코딩(UTF-8/UTF-8 BOM/CP949/EUC-KR)은 자동으로 판별하고, 유효하지 않은 행은 건수로만 보고합니다.
+    """
+    try:
+        print(f"CSV 파일 읽기 시작: {filename}")
+        result = recipient_pipeline.parse_csv_bytes(excel_data, phone_index=1, name_index=0, has_header=True)
+        if not result['success']:
+            return result
         
-        if not recipients:
+        if not result['recipients']:
             return {
                 "success": False,
-                "message": "유효한 전화번호를 찾을 수 없습니다."
+                "message": "유효한 전화번호를 찾을 수 없습니다.",
+                "invalidCount": result['invalidCount'],
+                "invalidRows": result['invalidRows']
             }
         
         return {
             "success": True,
-            "recipients": recipients,
-            "names": names,
-            "count": len(recipients)
+            "recipients": result['recipients'],
+            "names": result['names'],
+            "count": result['count'],
+            "encoding": result['encoding'],
+            "duplicateCount": result['duplicateCount'],
+            "invalidCount": result['invalidCount'],
+            "invalidRows": result['invalidRows']
         }
     except Exception as e:
         print(f"CSV 파일 처리 중 오류 발생: {str(e)}")
         return {"success": False, "message": str(e)}
 
-def lambda_handler(event, context):
+def lambda_handler(event, context, on_progress=None):
+    """
+    Lambda 진입점. 요청 타입(type)에 따라 미리보기, 발송 등을 처리합니다.
+    on_progress는 프로세스 내에서 직접 호출할 때 대량 발송 진행 상황을 받기 위한 콜백입니다.
+    Lambda 함수 URL 요청은 압축된 본문을 해제하고, Accept-Encoding에 맞춰 응답을 압축합니다.
+    """
+    if isinstance(event, dict) and 'body' in event:
+        event = payload_codec.decode_event(event)
+        return payload_codec.encode_response(handle_event(event, context, on_progress), event)
+    return handle_event(event, context, on_progress)
+
+def handle_event(event, context, on_progress=None):
+    """요청 본문을 해석하고 요청 타입별 처리 결과 딕셔너리를 반환합니다."""
     try:
         # 환경 변수 가져오기
         api_key = os.environ.get('API_KEY', '')
@@ -324,7 +698,7 @@ def lambda_handler(event, context):
         print(f"MY_AWS_REGION: {aws_region}")
         
         # 디버깅: 입력 이벤트 로깅
-        print(f"받은 이벤트: {json.dumps(event)}")
+        print(f"받은 이벤트: {to_log_json(event)}")
         
         # Lambda URL을 통한 요청 처리
         if 'body' in event:
@@ -353,7 +727,7 @@ def lambda_handler(event, context):
             print("직접 Lambda 호출 감지됨")
             body = event
 
-        print(f"처리할 본문 데이터: {json.dumps(body)}")
+        print(f"처리할 본문 데이터: {to_log_json(body)}")
 
         # 요청 타입 확인
         if 'type' not in body:
@@ -370,34 +744,37 @@ def lambda_handler(event, context):
             return {
                 'success': True,
                 'message': 'Lambda 함수가 정상적으로 응답했습니다.',
-                'request': body
+                'request': body,
+                'rateLimit': SOLAPI_LIMITER.snapshot()
             }
             
         # 자동메시지 엑셀 미리보기 요청 처리
         elif request_type == 'auto_excel_preview':
             print("자동메시지 엑셀 미리보기 요청 처리 시작")
             
-            if 'excel' not in body or not body['excel']:
+            excel_data = get_file_field(body)
+            if not excel_data:
                 return {
                     'success': False,
                     'message': '엑셀 파일이 필요합니다.'
                 }
                 
-            excel_data = body['excel']
-            if isinstance(excel_data, str):
-                excel_data = json.loads(excel_data)
-                
-            if 'data' not in excel_data or not excel_data['data']:
+            if not has_file_data(excel_data):
                 return {
                     'success': False,
                     'message': '엑셀 파일 데이터가 비어있습니다.'
                 }
                 
-            excel_content = base64.b64decode(excel_data['data'])
+            excel_content = read_file_data(excel_data)
             excel_filename = excel_data.get('filename', 'excel.xlsx')
             
+            # 미리보기는 앞 N건만 렌더링 (fullPreview 요청 시 전체 수신자 목록까지 반환)
+            preview_limit = None if body.get('fullPreview') else int(body.get('previewRows') or PREVIEW_ROWS)
+            
             # 자동 메시지 템플릿 처리
-            result = process_auto_excel_template(excel_content, excel_filename, body, sender_phone)
+            result = process_auto_excel_template(
+                excel_content, excel_filename, body, sender_phone, preview_limit=preview_limit
+            )
             print(f"자동메시지 엑셀 미리보기 결과: {json.dumps(result)}")
             
             return result
@@ -405,121 +782,147 @@ def lambda_handler(event, context):
         elif request_type == 'auto_excel_send':
             print("자동메시지 엑셀 발송 요청 처리 시작")
             
-            if 'excel' not in body or not body['excel']:
-                return {
-                    'success': False,
-                    'message': '엑셀 파일이 필요합니다.'
-                }
-                
-            excel_data = body['excel']
-            excel_content = base64.b64decode(excel_data['data'])
-            excel_filename = excel_data['filename']
+            excel_data = get_file_field(body)
+            cache_key, entry = None, None
             
-            # 자동 메시지 템플릿 처리
-            template_result = process_auto_excel_template(excel_content, excel_filename, body, sender_phone)
+            # 미리보기에서 받은 준비된 캠페인 토큰이 있으면 엑셀 업로드 없이 캐시된 렌더링 결과로 발송
+            campaign_token = body.get('campaignToken')
+            if campaign_token:
+                entry = open_prepared_campaign(campaign_token)
+                if entry is None and not has_file_data(excel_data):
+                    return {
+                        'success': False,
+                        'campaignExpired': True,
+                        'message': '미리보기 결과가 만료되었습니다. 엑셀 파일을 다시 업로드해 주세요.'
+                    }
+            
+            if entry is None:
+                if not has_file_data(excel_data):
+                    return {
+                        'success': False,
+                        'message': '엑셀 파일이 필요합니다.'
+                    }
+                    
+                excel_content = read_file_data(excel_data)
+                excel_filename = excel_data.get('filename') or 'excel.xlsx'
+                print(f"자동메시지 엑셀 스트리밍 발송: {excel_filename}, 크기: {len(excel_content)} bytes")
+                
+                # 미리보기에서 이미 파싱한 파일이면 캐시된 렌더링 결과로 발송 (엑셀을 다시 읽지 않음)
+                cache_key, entry = open_auto_excel_cache(excel_content)
+            wb = None
+            if entry is None:
+                try:
+                    wb = excel_reader.load_workbook(excel_content)
+                except Exception as e:
+                    print(f"엑셀 파일 열기 실패: {str(e)}")
+                    return {
+                        'success': False,
+                        'message': f'엑셀 파일을 열 수 없습니다: {str(e)}'
+                    }
             
-            if not template_result['success']:
-                return template_result
+            try:
+                if entry is not None:
+                    stats = entry.meta['stats']
+                    rows = iter_cached_auto_excel_rows(entry)
+                else:
+                    # 자동 메시지 템플릿과 데이터 시트 준비 (행은 발송하면서 읽음)
+                    source = open_auto_excel_source(wb)
+                    if not source['success']:
+                        return source
+                    stats = source['stats']
+                    rows = iter_rendered_auto_excel_rows(source, cache_key)
+                
+                # 이미지가 있는 경우 처리
+                image_id = None
+                if 'image' in body and body['image']:
+                    image_data = body['image']
+                    # 문자열로 전달된 경우 JSON으로 파싱
+                    if isinstance(image_data, str):
+                        try:
+                            image_data = json.loads(image_data)
+                        except Exception as e:
+                            print(f"이미지 데이터 파싱 오류: {str(e)}")
+                            return {
+                                'success': False,
+                                'message': f'이미지 데이터 형식 오류: {str(e)}'
+                            }
+                    
+                    if has_file_data(image_data):
+                        image_content = read_file_data(image_data)
+                        image_filename = image_data.get('filename', 'image.jpg')
+                        
+                        # 솔라피 API에 이미지 업로드
+                        image_id, error = upload_file(
+                            api_key, 
+                            api_secret, 
+                            file_content=image_content, 
+                            filename=image_filename
+                        )
+                        
+                        if not image_id:
+                            return {
+                                'success': False,
+                                'message': f'이미지 업로드 실패: {error}'
+                            }
                 
-            recipients = template_result['recipients']
+                # 캐시된 렌더링 결과는 발송 전에 타입별 건수와 예상 비용을 알 수 있음
+                if entry is not None and 'messageTypes' in entry.meta:
+                    print(f"발송 예정: {message_types.describe(message_types.summarize(entry.meta['messageTypes'], image_id))}")
+                
+                # 엑셀 행을 읽는 대로 메시지를 만들어 청크 단위로 발송
+                tally = message_types.new_tally()
+                result = dispatch_message_stream(
+                    api_key,
+                    api_secret,
+                    iter_auto_excel_messages(rows, stats, sender_phone, image_id, tally=tally),
+                    chunk_size=body.get('chunkSize'),
+                    concurrency=body.get('concurrency'),
+                    backend=body.get('sendBackend'),
+                    on_progress=on_progress
+                )
+            finally:
+                if wb is not None:
+                    wb.close()
             
-            if not recipients:
+            if stats['checked'] == 0:
+                return no_checked_rows_result()
+            if result['total'] == 0:
                 return {
                     'success': False,
                     'message': '발송할 메시지가 없습니다.'
                 }
             
-            # 이미지가 있는 경우 처리
-            if 'image' in body and body['image']:
-                image_data = body['image']
-                # 문자열로 전달된 경우 JSON으로 파싱
-                if isinstance(image_data, str):
-                    try:
-                        image_data = json.loads(image_data)
-                    except Exception as e:
-                        print(f"이미지 데이터 파싱 오류: {str(e)}")
-                        return {
-                            'success': False,
-                            'message': f'이미지 데이터 형식 오류: {str(e)}'
-                        }
-                
-                if isinstance(image_data, dict) and 'data' in image_data and image_data['data']:
-                    image_content = base64.b64decode(image_data['data'])
-                    image_filename = image_data.get('filename', 'image.jpg')
-                    
-                    # 솔라피 API에 이미지 업로드
-                    image_id, error = upload_file(
-                        api_key, 
-                        api_secret, 
-                        file_content=image_content, 
-                        filename=image_filename
-                    )
-                    
-                    if image_id:
-                        # 모든 메시지에 이미지 추가
-                        for recipient in recipients:
-                            recipient['imageId'] = image_id
-                            recipient['type'] = 'MMS'
-                    else:
-                        return {
-                            'success': False,
-                            'message': f'이미지 업로드 실패: {error}'
-                        }
-            
-            # 메시지 발송
-            for recipient in recipients:
-                if 'text' in recipient and recipient['text']:
-                    recipient['text'] = format_message_for_sms(recipient['text'])
-            
-            result = send_many_messages(
-                os.environ.get('API_KEY', ''),
-                os.environ.get('API_SECRET', ''),
-                recipients
-            )
-            
             # 응답 결과 가공
             response = {
                 'success': True,
-                'total': len(recipients),
+                'total': result['total'],
                 'failedCount': 0,
                 'failedList': [],
-                'message': '자동 메시지가 성공적으로 발송되었습니다.'
+                'message': '자동 메시지가 성공적으로 발송되었습니다.',
+                'duplicateCount': stats['duplicates'],
+                'messageTypes': message_types.summarize(tally),
+                'rateLimit': result.get('rateLimit')
             }
             
             # 실패 메시지 처리
-            if "failedMessageList" in result and result["failedMessageList"]:
+            if result["failedMessageList"]:
                 failed_list = result["failedMessageList"]
                 response["failedCount"] = len(failed_list)
-                
-                error_messages = {
-                    "ValidationError": "유효성 검사 오류",
-                    "HttpError": "HTTP 오류",
-                    "InsufficientBalance": "잔액 부족",
-                    "NotEnoughBalance": "잔액 부족",
-                    "RateLimitError": "요청 한도 초과",
-                    "ServerError": "서버 오류",
-                    "InvalidPhoneNumber": "유효하지 않은 전화번호",
-                    "InvalidFrom": "발신번호 오류",
-                    "BlockedNumber": "차단된 번호"
-                }
-                
-                for failed in failed_list:
-                    error_info = {
-                        "to": failed.get("to", "알 수 없음"),
-                        "reason": "알 수 없는 오류"
-                    }
-                    
-                    if "errorCode" in failed:
-                        code = failed["errorCode"]
-                        if code in error_messages:
-                            error_info["reason"] = error_messages[code]
-                        else:
-                            error_info["reason"] = f"오류 코드: {code}"
-                    
-                    response["failedList"].append(error_info)
+                response["failedList"] = build_failed_list(failed_list)
+                response["retryQueued"] = queue_retryable_failures(result["failedOriginals"], failed_list, body.get('campaignId'))
             
             return response
         
+        elif request_type == 'retry_drain':
+            # 재시도 큐 처리 (스케줄 호출 또는 수동 호출)
+            result = retry_queue.drain(api_key, api_secret, send_many_messages, limit=body.get('limit'))
+            return {
+                'success': True,
+                'message': f"재시도 처리 완료: {result['processed']}건",
+                'result': result,
+                'queue': retry_queue.stats()
+            }
+        
         elif request_type == 'test':
             return {
                 'success': True,
@@ -547,7 +950,7 @@ def lambda_handler(event, context):
             # 이미지 처리
             image_id = None
             if 'image' in body:
-                print(f"이미지 필드 발견: {json.dumps(body['image'])}")
+                print(f"이미지 필드 발견: {to_log_json(body['image'])}")
                 
                 image_data = body['image']
                 # 이미지 데이터가 비어있거나 null인 경우 처리
@@ -559,7 +962,7 @@ def lambda_handler(event, context):
                         'success': False,
                         'message': f'이미지 데이터 형식 오류: 딕셔너리 형태여야 합니다.'
                     }
-                elif 'data' not in image_data or not image_data.get('data'):
+                elif not has_file_data(image_data):
                     print("이미지 데이터에 'data' 필드가 없거나 비어있습니다.")
                     return {
                         'success': False,
@@ -567,8 +970,7 @@ def lambda_handler(event, context):
                     }
                 else:
                     try:
-                        print(f"이미지 데이터 처리 시작: data 길이={len(image_data['data'])}")
-                        image_content = base64.b64decode(image_data['data'])
+                        image_content = read_file_data(image_data)
                         image_filename = image_data.get('filename', 'image.jpg')
                         
                         print(f"이미지 디코딩 완료: 크기={len(image_content)} bytes, 파일명={image_filename}")
@@ -604,16 +1006,16 @@ def lambda_handler(event, context):
             return result
             
         elif request_type == 'parse_recipients':
-            if 'excel' not in body or not body['excel']:
+            excel_data = get_file_field(body)
+            if not has_file_data(excel_data):
                 return {
                     'success': False,
                     'message': '파일이 필요합니다.'
                 }
                     
             try:
-                excel_data = body['excel']
-                csv_content = base64.b64decode(excel_data['data'])
-                csv_filename = excel_data.get('filename', 'recipients.csv')
+                csv_content = read_file_data(excel_data)
+                csv_filename = excel_data.get('filename') or 'recipients.csv'
                 
                 print(f"CSV 파일 읽기 시작: {csv_filename}")
                 
@@ -674,7 +1076,7 @@ def lambda_handler(event, context):
                         'name': name,
                         'phone': recipient,
                         'text': message_text,
-                        'type': 'LMS' if len(message_text) > 90 else 'SMS'
+                        'type': recipient_pipeline.message_type(message_text)
                     }
                     preview_messages.append(preview)
                 
@@ -727,10 +1129,10 @@ def lambda_handler(event, context):
                         }
                 
                 # 2. excel 데이터가 본문에 포함된 경우 (Lambda API Gateway 호출)
-                elif 'excel' in body and isinstance(body['excel'], dict) and 'data' in body['excel']:
+                elif 'excel' in body and has_file_data(body['excel']):
                     # CSV 파일에서 수신자 목록 추출
                     excel_data = body['excel']
-                    csv_content = base64.b64decode(excel_data['data'])
+                    csv_content = read_file_data(excel_data)
                     csv_filename = excel_data.get('filename', 'recipients.csv')
                     
                     print(f"CSV 파일에서 수신자 목록 추출: {csv_filename}")
@@ -744,10 +1146,10 @@ def lambda_handler(event, context):
                         print(f"CSV 파일 처리 실패: {recipients_result['message']}")
                 
                 # 3. file 필드가 전달된 경우 (이 경우는 app.py에서 처리함)
-                elif 'file' in body and isinstance(body['file'], dict) and 'data' in body['file']:
+                elif 'file' in body and has_file_data(body['file']):
                     # 파일에서 수신자 목록 추출
                     file_data = body['file']
-                    file_content = base64.b64decode(file_data['data'])
+                    file_content = read_file_data(file_data)
                     file_name = file_data.get('filename', 'recipients.csv')
                     
                     print(f"file 필드에서 수신자 목록 추출: {file_name}")
@@ -813,8 +1215,8 @@ def lambda_handler(event, context):
                                 'message': f'이미지 데이터 형식 오류: {str(e)}'
                             }
                     
-                    if isinstance(image_data, dict) and 'data' in image_data and image_data['data']:
-                        image_content = base64.b64decode(image_data['data'])
+                    if has_file_data(image_data):
+                        image_content = read_file_data(image_data)
                         image_filename = image_data.get('filename', 'image.jpg')
                         
                         # 솔라피 API에 이미지 업로드
@@ -831,81 +1233,58 @@ def lambda_handler(event, context):
                                 'message': f'이미지 업로드 실패: {error}'
                             }
                 
-                # 메시지 객체 생성
-                messages = []
-                for recipient in recipients:
-                    # 메시지 타입 자동 감지
-                    msg_type = 'MMS' if image_id else ('LMS' if len(text) > 90 else 'SMS')
-                    
-                    # 메시지 객체 생성
-                    phone_clean = recipient.replace('-', '')
-                    # 국제번호 형식으로 시작하는 경우 국내 형식으로 변환
-                    if phone_clean.startswith('82') and len(phone_clean) >= 10:
-                        phone_clean = '0' + phone_clean[2:]  # 82 제거하고 앞에 0 추가
-                        print(f"국제번호 형식 -> 국내번호 형식 변환: {phone_clean}")
-                    
-                    message = {
-                        'to': phone_clean,  # 정제된 번호 사용
-                        'from': sender_phone.replace('-', ''),  # 하이픈 제거
-                        'text': format_message_for_sms(text),  # 메시지 포맷팅 적용
-                        'type': msg_type  # 명시적으로 메시지 타입 지정
+                # 수신번호 열 단위 정제 (숫자만 남기고 82 국제번호 형식은 국내 형식으로 변환, 10자리 미만 제외)
+                # 같은 번호는 처음 나온 순서대로 한 번만 발송 (DEDUPE_RECIPIENTS)
+                phone_list, invalid_count, duplicate_count = recipient_pipeline.select_phone_list(recipients)
+                
+                if not phone_list:
+                    return {
+                        'success': False,
+                        'message': '유효한 수신번호가 없습니다.'
                     }
-                    
-                    # subject는 SMS에서 사용할 수 없음 - LMS와 MMS 타입에만 추가
-                    if msg_type in ['LMS', 'MMS']:
-                        message['subject'] = "[자동메시지]"
-                    
-                    if image_id:
-                        message['imageId'] = image_id
-                        
-                    messages.append(message)
+                
+                # 모든 수신자에게 같은 내용 - 포맷팅과 타입 결정은 한 번만 (subject는 LMS/MMS에만 추가)
+                tally = message_types.new_tally()
+                messages = recipient_pipeline.build_messages(
+                    phone_list, text, sender_phone, image_id, subject="[자동메시지]", tally=tally
+                )
+                message_summary = message_types.summarize(tally)
                 
                 print(f"발송할 메시지 수: {len(messages)}")
                 print(f"메시지 내용: '{text}'")
+                print(f"발송 예정: {message_types.describe(message_summary)}")
                 
-                # 대량 메시지 발송 API 호출
-                result = send_many_messages(api_key, api_secret, messages)
+                # 대량 메시지 청크 병렬 발송
+                result = dispatch_messages(
+                    api_key,
+                    api_secret,
+                    messages,
+                    chunk_size=body.get('chunkSize'),
+                    concurrency=body.get('concurrency'),
+                    backend=body.get('sendBackend'),
+                    on_progress=on_progress
+                )
                 
                 # 응답 결과 가공
                 response = {
                     'success': True,
                     'total': len(messages),
+                    'failedCount': 0,
+                    'failedList': [],
                     'message': '대량 메시지가 성공적으로 발송되었습니다.',
-                    'text': text
+                    'text': text,
+                    'invalidCount': invalid_count,
+                    'duplicateCount': duplicate_count,
+                    'messageTypes': message_summary,
+                    'rateLimit': result.get('rateLimit') if isinstance(result, dict) else None
                 }
                 
                 # 실패 메시지 처리
                 if isinstance(result, dict) and "failedMessageList" in result and result["failedMessageList"]:
                     failed_list = result["failedMessageList"]
                     response["failedCount"] = len(failed_list)
-                    
-                    error_messages = {
-                        "ValidationError": "유효성 검사 오류",
-                        "HttpError": "HTTP 오류",
-                        "InsufficientBalance": "잔액 부족",
-                        "NotEnoughBalance": "잔액 부족",
-                        "RateLimitError": "요청 한도 초과",
-                        "ServerError": "서버 오류",
-                        "InvalidPhoneNumber": "유효하지 않은 전화번호",
-                        "InvalidFrom": "발신번호 오류",
-                        "BlockedNumber": "차단된 번호"
-                    }
-                    
-                    failed_list_info = []
-                    for failed in failed_list:
-                        error_info = {
-                            "to": failed.get("to", "알 수 없음"),
-                            "reason": "알 수 없는 오류"
-                        }
-                        
-                        if "errorCode" in failed:
-                            code = failed["errorCode"]
-                            if code in error_messages:
-                                error_info["reason"] = error_messages[code]
-                            else:
-                                error_info["reason"] = f"오류 코드: {code}"
-                        
-                        failed_list_info.append(error_info)
+                    response["failedList"] = build_failed_list(failed_list)
+                    response["retryQueued"] = queue_retryable_failures(messages, failed_list, body.get('campaignId'))
                 
                 return response
                 
@@ -956,26 +1335,16 @@ def lambda_handler(event, context):
             'message': f'오류 발생: {str(e)}'
         }
 
-# 메시지 포맷팅 함수 추가
-def format_message_for_sms(text):
+# 자동메시지 처리를 위한 함수 추가
+def process_auto_excel_template(excel_content, filename=None, body=None, sender_phone=None, preview_limit=None):
     """
-    문자 메시지에 최적화된 포맷팅을 적용합니다.
-    솔라피 메시지 전송 시 줄바꿈과 공백이 유지되도록 처리합니다.
+    자동 메시지 템플릿을 처리하여 메시지를 생성합니다.
+    preview_limit를 주면 유효한 행 중 앞 preview_limit건만 미리보기로 반환하고 recipients는 반환하지 않습니다.
+    전체 렌더링 결과는 파일 SHA-256으로 파싱 캐시(parse_cache)에 보관해 같은 파일의 발송 단계에서 재사용합니다.
+    (미리보기는 PREVIEW_FILL_CACHE를 끄지 않았으면 캐시를 채움)
+    미리보기의 타입별 건수/예상 비용은 캐시를 채우거나 캐시 항목이 있거나 body의 estimateCost로 전체 렌더링을 요청했을 때만 계산하며,
+    body의 hasImage(또는 image)가 있으면 모든 메시지를 MMS로 계산합니다.
     """
-    if not text:
-        return text
-    
-    text = text.replace('\r\n', '\n').replace('\r', '\n')
-    text = text.replace('\xa0', ' ')
-    text = text.replace(': ', ':').replace(':', ': ')
-    while "  " in text: text = text.replace("  ", " ")
-    text = text.replace('\n', '\r\n')
-    print(f"포맷팅 후 메시지 확인: {repr(text)}")
-    return text
-
-# 자동메시지 처리를 위한 함수 추가
-def process_auto_excel_template(excel_content, filename=None, body=None, sender_phone=None):
-    """자동 메시지 템플릿을 처리하여 메시지를 생성합니다."""
     try:
         print("=" * 80)
         print("자동메시지 엑셀 처리 시작")
@@ -989,468 +1358,487 @@ def process_auto_excel_template(excel_content, filename=None, body=None, sender_
                 'message': '엑셀 데이터가 비어 있습니다.'
             }
             
-        # 엑셀 파일 임시 저장
-        temp_excel_path = '/tmp/temp_excel.xlsx'
-        with open(temp_excel_path, 'wb') as f:
-            f.write(excel_content)
-        print(f"엑셀 파일 임시 저장 완료: {temp_excel_path}")
+        body = body or {}
+        has_image = bool(body.get('hasImage') or body.get('image'))
         
-        # 샘플 템플릿 확인 (A2 셀)
-        has_template_from_a2 = False
-        sample_template = "안녕하세요 {{이름}}님, {{주문일자}}에 주문하신 상품의 금액은 {{주문금액}}원입니다."
+        # 같은 파일을 이미 파싱했으면 캐시된 렌더링 결과 사용
+        cache_key, entry = open_auto_excel_cache(excel_content)
+        if entry is not None:
+            if preview_limit is not None:
+                return preview_cached_auto_excel_messages(entry, preview_limit, has_image)
+            return collect_auto_excel_messages(iter_cached_auto_excel_rows(entry), entry.meta['stats'], sender_phone,
+                                               entry.key)
         
+        # 엑셀 파일을 메모리에서 한 번만 열어 템플릿 셀과 데이터 시트를 함께 읽음
         try:
-            import openpyxl
-            wb = openpyxl.load_workbook(temp_excel_path, read_only=True, data_only=True)
-            
-            # 시트 이름 출력
-            print(f"엑셀 파일에 있는 모든 시트: {wb.sheetnames}")
-            
-            # 자동메시지 시트 찾기 (여러 가능한 이름 시도)
-            template_sheet = None
-            for sheet_name in ['자동메시지', '자동메시지템플릿', 'sample', 'template', 'Sheet1']:
-                if sheet_name in wb.sheetnames:
-                    template_sheet = wb[sheet_name]
-                    print(f"템플릿 시트 '{sheet_name}' 발견됨")
-                    break
-            
-            if template_sheet:
-                a2_value = template_sheet['A2'].value
-
-                if a2_value and a2_value.strip():
-                    print(f"원본 A2 셀 값: '{a2_value}'")    
-                    sample_template = str(a2_value)
-                    sample_template = sample_template.replace('\r\n', '\n').replace('\r', '\n')
-                    
-                    print(f"A2 셀에서 읽은 템플릿(띄어쓰기 확인): '{sample_template}'")
-                    print(f"템플릿 문자 코드 확인: {[ord(c) for c in sample_template[:20]]}")
-                    
-                    # 가독성 향상을 위한 줄바꿈 처리
-                    if "\n" not in sample_template:
-                        if "]" in sample_template:
-                            bracket_pos = sample_template.find("]")
-                            if bracket_pos > 0:
-                                sample_template = sample_template[:bracket_pos+1] + "\n" + sample_template[bracket_pos+1:]
-                        
-                        if "님," in sample_template:
-                            sample_template = sample_template.replace("님,", "님,\n")
-                        
-                        if "쇼핑몰입니다" in sample_template:
-                            sample_template = sample_template.replace("쇼핑몰입니다", "쇼핑몰입니다.\n")
-                        
-                        if "발송됩니다" in sample_template:
-                            sample_template = sample_template.replace("발송됩니다", "발송됩니다.\n")
-                        
-                        if "◎" in sample_template:
-                            sample_template = sample_template.replace("◎", "\n◎")
-                        
-                        if "감사합니다" in sample_template:
-                            sample_template = sample_template.replace("감사합니다", "\n감사합니다")
-                    
-                    while "\n\n" in sample_template: 
-                        sample_template = sample_template.replace("\n\n", "\n")
-                    sample_template = sample_template.replace(":", ": ")
-                    while "  " in sample_template: 
-                        sample_template = sample_template.replace("  ", " ")
-                    
-                    print(f"처리된 템플릿:\n{sample_template}")
-                    print(f"처리된 템플릿 문자 코드: {[ord(c) for c in sample_template[:20]]}")
-                    has_template_from_a2 = True
-                else:
-                    print("A2 셀이 비어 있거나 값이 없습니다. 기본 템플릿을 사용합니다.")
-            else:
-                print("템플릿 시트를 찾을 수 없습니다. 첫 번째 시트의 A2 셀을 확인합니다.")
-                try:
-                    first_sheet = wb[wb.sheetnames[0]]
-                    a2_value = first_sheet['A2'].value
-                    if a2_value and a2_value.strip():
-                        print(f"첫 번째 시트의 A2 셀 값: '{a2_value}'")
-                        sample_template = str(a2_value)
-                        has_template_from_a2 = True
-                except Exception as e:
-                    print(f"첫 번째 시트 A2 셀 접근 중 오류: {str(e)}")
-                    print("기본 템플릿을 사용합니다.")
+            wb = excel_reader.load_workbook(excel_content)
         except Exception as e:
-            print(f"템플릿 추출 중 오류 발생: {str(e)}")
-            traceback.print_exc()
-            print("기본 템플릿을 사용합니다.")
-            
-        # 데이터 시트 읽기
-        print("엑셀 파일 데이터 시트 읽기 시작")
+            print(f"엑셀 파일 열기 실패: {str(e)}")
+            return {
+                'success': False,
+                'message': f'엑셀 파일을 열 수 없습니다: {str(e)}'
+            }
+        
         try:
-            # 다양한 시트 이름 시도
-            df = None
-            sheet_names_tried = []
-            
-            try:
-                # 먼저 모든 시트 이름 가져오기
-                all_sheets = pd.ExcelFile(temp_excel_path).sheet_names
-                print(f"파일의 모든 시트: {all_sheets}")
-                
-                # 시트 이름 리스트 준비 - 알려진 이름 + 파일의 모든 시트
-                sheet_name_candidates = ['data', 'Data', '데이터', 'Sheet1', '발송', '발송목록', 'data-sheet'] + all_sheets
-                
-                # 중복 제거
-                sheet_name_candidates = list(dict.fromkeys(sheet_name_candidates))
+            source = open_auto_excel_source(wb)
+            if not source['success']:
+                return source
+            if preview_limit is not None:
+                # 건수를 세는 김에 캐시를 채움 (PREVIEW_FILL_CACHE를 끄면 첫 발송에서 채움)
+                fill_key = cache_key if PREVIEW_FILL_CACHE else None
+                return preview_auto_excel_messages(source, sender_phone, preview_limit, fill_key,
+                                                   estimate_cost=bool(body.get('estimateCost')), has_image=has_image)
+            rows = iter_rendered_auto_excel_rows(source, cache_key)
+            return collect_auto_excel_messages(rows, source['stats'], sender_phone, cache_key)
+        finally:
+            wb.close()
+    except Exception as e:
+        print(f"자동 메시지 처리 중 오류 발생: {str(e)}")
+        traceback.print_exc()
+        return {
+            'success': False,
+            'message': f'자동 메시지 처리 중 오류가 발생했습니다: {str(e)}'
+        }
+
+def read_auto_excel_template(wb):
+    """워크북의 템플릿 시트 A2 셀에서 메시지 템플릿을 읽습니다. 없으면 기본 템플릿을 반환합니다."""
+    sample_template = "안녕하세요 {{이름}}님, {{주문일자}}에 주문하신 상품의 금액은 {{주문금액}}원입니다."
+    
+    try:
+        # 시트 이름 출력
+        print(f"엑셀 파일에 있는 모든 시트: {wb.sheetnames}")
+        
+        # 자동메시지 시트 찾기 (여러 가능한 이름 시도)
+        template_sheet = None
+        for sheet_name in ['자동메시지', '자동메시지템플릿', 'sample', 'template', 'Sheet1']:
+            if sheet_name in wb.sheetnames:
+                template_sheet = wb[sheet_name]
+                print(f"템플릿 시트 '{sheet_name}' 발견됨")
+                break
+        
+        if template_sheet:
+            a2_value = template_sheet['A2'].value
+
+            if a2_value and a2_value.strip():
+                print(f"원본 A2 셀 값: '{a2_value}'")    
+                sample_template = str(a2_value)
+                sample_template = sample_template.replace('\r\n', '\n').replace('\r', '\n')
                 
-                for sheet_name in sheet_name_candidates:
-                    try:
-                        sheet_names_tried.append(sheet_name)
-                        df = pd.read_excel(temp_excel_path, sheet_name=sheet_name, engine='openpyxl')
-                        print(f"시트 '{sheet_name}' 발견됨, 행 수: {len(df)}")
-                        
-                        # 데이터 확인 (최소 헤더 + 1행)
-                        if len(df) >= 1:
-                            break
-                        else:
-                            print(f"시트 '{sheet_name}'에 데이터가 없음, 다음 시트 시도")
-                            df = None
-                    except Exception as e:
-                        print(f"시트 '{sheet_name}' 읽기 실패: {str(e)}")
-                        continue
-            except Exception as e:
-                print(f"시트 목록 가져오기 실패: {str(e)}")
-            
-            # 아직 데이터를 찾지 못했으면 첫 번째 시트 시도
-            if df is None:
-                try:
-                    print("시트 이름 지정 없이 첫 번째 시트 시도")
-                    df = pd.read_excel(temp_excel_path, engine='openpyxl')
-                    print(f"첫 번째 시트 사용: 행 수: {len(df)}")
-                except Exception as e:
-                    print(f"첫 번째 시트 읽기 실패: {str(e)}")
-            
-            # 여전히 데이터가 없으면 오류 반환
-            if df is None:
-                error_message = f"엑셀 파일에서 데이터를 찾을 수 없습니다. 시도한 시트: {', '.join(sheet_names_tried)}"
-                print(error_message)
-                return {
-                    'success': False,
-                    'message': error_message
-                }
+                print(f"A2 셀에서 읽은 템플릿(띄어쓰기 확인): '{sample_template}'")
+                print(f"템플릿 문자 코드 확인: {[ord(c) for c in sample_template[:20]]}")
                 
-            print(f"데이터 로드 완료: {df.shape[0]}행, {df.shape[1]}열")
-            print(f"엑셀 파일 열: {df.columns.tolist()}")
-            
-            # 체크박스 열 확인
-            has_checkbox = False
-            checkbox_col = None
-            
-            # '조건' 열 확인
-            for col in df.columns:
-                col_str = str(col).lower()
-                if col_str == '조건' or col_str == '발송여부' or col_str == 'send' or col_str == '전송':  # '조건' 열이 TRUE/FALSE 값을 가짐
-                    has_checkbox = True
-                    checkbox_col = col
-                    print(f"조건 열 발견: {checkbox_col}")
-                    break
-            
-            # 이름이 없는 첫 번째 열이 체크박스일 수 있음
-            if checkbox_col is None:
-                for col in df.columns:
-                    if str(col).startswith('Unnamed') or col == 0:  # 체크박스는 보통 이름이 없는 첫 번째 열
-                        has_checkbox = True
-                        checkbox_col = col
-                        print(f"체크박스 열 발견: {checkbox_col}")
-                        break
-                        
-            # 필수 열 확인 및 찾기 - 열 이름을 더 유연하게 인식
-            name_col = None
-            phone_col = None
-            date_col = None
-            amount_col = None
-            product_col = None
-            
-            # 이름 열 찾기 - 다양한 열 이름 지원
-            for col in df.columns:
-                col_str = str(col).lower()
-                if col_str == '이름' or '성명' in col_str or '고객' in col_str or '고객명' in col_str or '수신자' in col_str or 'name' in col_str:
-                    name_col = col
-                    print(f"이름 열 발견: {name_col}")
-                    break
+                # 가독성 향상을 위한 줄바꿈 처리
+                if "\n" not in sample_template:
+                    if "]" in sample_template:
+                        bracket_pos = sample_template.find("]")
+                        if bracket_pos > 0:
+                            sample_template = sample_template[:bracket_pos+1] + "\n" + sample_template[bracket_pos+1:]
                     
-            # 전화번호 열 찾기 - 다양한 열 이름 지원
-            if '휴대폰번호' in df.columns:
-                phone_col = '휴대폰번호'
-                print(f"정확한 휴대폰번호 열 발견: {phone_col}")
-            else:
-                for col in df.columns:
-                    col_str = str(col).lower()
-                    if (col_str == '전화번호' or '수신' in col_str or '휴대' in col_str or '전화' in col_str 
-                        or '연락' in col_str or '폰' in col_str or '번호' in col_str or 'phone' in col_str 
-                        or 'mobile' in col_str or 'tel' in col_str):
-                        phone_col = col
-                        print(f"유사한 휴대폰번호 열 발견: {phone_col}")
-                        break
-                
-            # 주문일자 열 찾기 - 다양한 열 이름 지원
-            for col in df.columns:
-                col_str = str(col).lower()
-                if ('주문일자' in col_str or '주문날짜' in col_str or '결제일' in col_str or '주문일' in col_str 
-                    or '결제일자' in col_str or '구매일' in col_str or 'order date' in col_str 
-                    or 'orderdate' in col_str or 'date' == col_str):
-                    date_col = col
-                    print(f"주문일자 열 발견: {date_col}")
-                    break
+                    if "님," in sample_template:
+                        sample_template = sample_template.replace("님,", "님,\n")
                     
-            # 주문금액 열 찾기 - 다양한 열 이름 지원
-            for col in df.columns:
-                col_str = str(col).lower()
-                if ('주문금액' in col_str or '결제금액' in col_str or '금액' in col_str or '가격' in col_str 
-                    or '비용' in col_str or 'price' in col_str or 'amount' in col_str or 'cost' in col_str):
-                    amount_col = col
-                    print(f"주문금액 열 발견: {amount_col}")
-                    break
+                    if "쇼핑몰입니다" in sample_template:
+                        sample_template = sample_template.replace("쇼핑몰입니다", "쇼핑몰입니다.\n")
                     
-            # 주문상품 열 찾기 - 다양한 열 이름 지원
-            for col in df.columns:
-                col_str = str(col).lower()
-                if ('주문상품' in col_str or '상품명' in col_str or '제품명' in col_str or '상품' in col_str 
-                    or '제품' in col_str or 'product' in col_str or 'item' in col_str):
-                    product_col = col
-                    print(f"주문상품 열 발견: {product_col}")
-                    break
-            
-            # 필수 열 확인 - 필수는 아니지만 추천하는 열 표시
-            missing_columns = []
-            if not name_col: missing_columns.append('이름')
-            if not phone_col: missing_columns.append('휴대폰번호')
-            
-            # 전화번호 열은 필수
-            if not phone_col:
-                return {
-                    'success': False,
-                    'message': f'엑셀 파일에 휴대폰번호 열이 없습니다. 수신자 정보를 확인해주세요.'
-                }
-            
-            # 템플릿에 변수가 있는지 확인하고 안내
-            import re
-            variables = re.findall(r'\{\{([^{}]+)\}\}', sample_template)
-            if variables:
-                print(f"템플릿에서 발견된 변수: {variables}")
-                missing_vars = []
-                
-                var_mapping = {
-                    '이름': name_col,
-                    '주문일자': date_col,
-                    '주문금액': amount_col,
-                    '주문상품': product_col
-                }
+                    if "발송됩니다" in sample_template:
+                        sample_template = sample_template.replace("발송됩니다", "발송됩니다.\n")
+                    
+                    if "◎" in sample_template:
+                        sample_template = sample_template.replace("◎", "\n◎")
+                    
+                    if "감사합니다" in sample_template:
+                        sample_template = sample_template.replace("감사합니다", "\n감사합니다")
                 
-                for var in variables:
-                    if var in var_mapping and not var_mapping[var]:
-                        missing_vars.append(var)
+                while "\n\n" in sample_template: 
+                    sample_template = sample_template.replace("\n\n", "\n")
+                sample_template = sample_template.replace(":", ": ")
+                while "  " in sample_template: 
+                    sample_template = sample_template.replace("  ", " ")
                 
-                if missing_vars:
-                    print(f"[경고] 템플릿에 사용된 변수 중 해당하는 열을 찾을 수 없습니다: {', '.join(missing_vars)}")
-                    print("해당 변수는 치환되지 않거나 기본값으로 대체될 수 있습니다.")
-            
-            # 체크된 행만 필터링
-            if has_checkbox:
-                checkbox_values = df[checkbox_col].astype(str).str.upper()
-                is_checked = checkbox_values.isin(['TRUE', '1', 'YES', 'Y', 'O', 'V', 'T', 'TRUE', 'OK'])
-                filtered_df = df[is_checked].copy()
-                print(f"체크된 행만 필터링: 전체 {df.shape[0]}행 중 {filtered_df.shape[0]}행 선택됨")
+                print(f"처리된 템플릿:\n{sample_template}")
+                print(f"처리된 템플릿 문자 코드: {[ord(c) for c in sample_template[:20]]}")
             else:
-                filtered_df = df.copy()
-                print(f"체크박스 없음, 모든 행 처리: {filtered_df.shape[0]}행")
-            
-            if filtered_df.empty:
-                return {
-                    'success': False,
-                    'message': '처리할 행이 없습니다. 체크박스가 있는 경우 최소 하나의 행을 체크하세요.'
-                }
-            
-            # 미리보기용 메시지 생성
-            preview_messages = []
-            recipients = []
-            
-            processed_count = 0
-            skipped_count = 0
-            
-            # 각 행 처리
-            for idx, row in filtered_df.iterrows():
-                # 전화번호 확인
-                if phone_col not in row.index or pd.isna(row[phone_col]) or str(row[phone_col]).strip() == '':
-                    print(f"[경고] 행 {idx+1}: 수신번호가 없음 -> 건너뛰기")
-                    skipped_count += 1
-                    continue
-                
-                # 전화번호 정제
-                phone = str(row[phone_col])
-                phone = ''.join(filter(str.isdigit, phone))
-                
-                if not phone or len(phone) < 10:
-                    print(f"[경고] 행 {idx+1}: 유효하지 않은 전화번호: {row[phone_col]} -> 건너뛰기")
-                    skipped_count += 1
-                    continue
-                
-                # 변수값 추출
-                name = str(row[name_col]) if name_col and not pd.isna(row[name_col]) else ""
-                date = str(row[date_col]) if date_col and not pd.isna(row[date_col]) else ""
-                amount = str(row[amount_col]) if amount_col and not pd.isna(row[amount_col]) else ""
-                product = str(row[product_col]) if product_col and not pd.isna(row[product_col]) else ""
-                
-                # 날짜 형식 정리 - 더 많은 형식 지원
-                if date and (date_col is not None) and ('일자' in str(date_col) or '날짜' in str(date_col) or 'date' in str(date_col).lower()):
-                    try:
-                        # 여러 날짜 형식 처리
-                        if ' 00:00:00' in date:  # 'YYYY-MM-DD 00:00:00' 형식
-                            date = date.split(' ')[0]
-                        elif 'T00:00:00' in date:  # 'YYYY-MM-DDT00:00:00' 형식
-                            date = date.split('T')[0]
-                        elif '.' in date and len(date) > 10:  # 'YYYY-MM-DD.000000' 형식
-                            date = date.split('.')[0]
-                        
-                        # pandas Timestamp 처리
-                        from pandas import Timestamp
-                        if isinstance(row[date_col], Timestamp):
-                            date = row[date_col].strftime('%Y-%m-%d')
-                            
-                        print(f"날짜 변환: {row[date_col]} -> {date}")
-                    except Exception as e:
-                        print(f"날짜 변환 중 오류: {str(e)}")
-                
-                # 금액 형식 정리 - 천 단위 구분기호 처리
-                if amount and amount_col is not None:
-                    try:
-                        # 원본 값 백업
-                        original_amount = amount
-                        # 숫자만 추출
-                        numeric_amount = ''.join(filter(str.isdigit, amount))
-                        if numeric_amount:
-                            # 천 단위 구분기호 추가
-                            formatted_amount = format(int(numeric_amount), ',')
-                            
-                            # '원'이 있는지 확인하고 유지
-                            if '원' in original_amount:
-                                formatted_amount += '원'
-                                
-                            amount = formatted_amount
-                            print(f"금액 변환: {row[amount_col]} -> {amount}")
-                    except Exception as e:
-                        print(f"금액 변환 중 오류: {str(e)}")
-                
-                # 템플릿에 변수 적용 - 변수 치환 기능 강화
-                message_text = sample_template
-                
-                # 변수 치환 - 이중 중괄호 처리 개선
-                import re
-                
-                # 정해진 변수들 처리
-                var_dict = {
-                    '이름': name,
-                    '주문일자': date,
-                    '주문금액': amount,
-                    '주문상품': product
-                }
-                
-                # 변수 치환 처리
-                for var_name, var_value in var_dict.items():
-                    if var_value:  # 값이 있을 때만 치환
-                        pattern = re.compile(r'\{\{' + re.escape(var_name) + r'\}\}')
-                        if re.search(pattern, message_text):
-                            message_text = re.sub(pattern, var_value, message_text)
-                            print(f"{var_name} 치환: '{var_value}'")
-                
-                # 동적 변수 치환 - 열 이름 기반
-                remaining_vars = re.findall(r'\{\{([^{}]+)\}\}', message_text)
-                for var_name in remaining_vars:
-                    if var_name in row.index and not pd.isna(row[var_name]):
-                        var_value = str(row[var_name])
-                        
-                        # 날짜 형식 특별 처리
-                        if '일자' in var_name or '날짜' in var_name or 'date' in var_name.lower():
-                            try:
-                                if ' 00:00:00' in var_value:
-                                    var_value = var_value.split(' ')[0]
-                                elif 'T00:00:00' in var_value:
-                                    var_value = var_value.split('T')[0]
-                                
-                                from pandas import Timestamp
-                                if isinstance(row[var_name], Timestamp):
-                                    var_value = row[var_name].strftime('%Y-%m-%d')
-                            except Exception as e:
-                                print(f"변수 {var_name} 날짜 변환 중 오류: {str(e)}")
-                        
-                        # 금액 형식 특별 처리
-                        if '금액' in var_name or '가격' in var_name or 'price' in var_name.lower() or 'amount' in var_name.lower():
-                            try:
-                                # 원본 값 백업
-                                original_value = var_value
-                                numeric_value = ''.join(filter(str.isdigit, var_value))
-                                if numeric_value:
-                                    formatted_value = format(int(numeric_value), ',')
-                                    
-                                    # '원'이 있는지 확인하고 유지
-                                    if '원' in original_value:
-                                        formatted_value += '원'
-                                        
-                                    var_value = formatted_value
-                            except Exception as e:
-                                print(f"변수 {var_name} 금액 변환 중 오류: {str(e)}")
-                                
-                        var_pattern = re.compile(r'\{\{' + re.escape(var_name) + r'\}\}')
-                        message_text = re.sub(var_pattern, var_value, message_text)
-                        print(f"변수 {var_name} 치환: '{var_value}'")
-                        
-                # 남은 이중 중괄호 제거
-                if '{{' in message_text and '}}' in message_text:
-                    message_text = re.sub(r'\{\{([^{}]+)\}\}', r'\1', message_text)
-                
-                # 메시지 태그 또는 자동문자 관련 ID 추가
-                message_id = f"AUTO_{idx+1}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                
-                # 메시지 객체 생성
-                message = {
-                    'to': phone.replace('-', ''),  # 하이픈 제거
-                    'from': sender_phone.replace('-', ''),  # 하이픈 제거
-                    'text': format_message_for_sms(message_text),  # 메시지 포맷팅 적용
-                    'type': 'LMS' if len(message_text) > 90 else 'SMS'  # 명시적으로 메시지 타입 지정
-                }
-                
-                recipients.append(message)
-                
-                # 미리보기용 메시지 추가
-                preview = {
-                    'index': len(preview_messages) + 1,
-                    'phone': phone,
-                    'text': message_text
-                }
-                preview_messages.append(preview)
-                processed_count += 1
-                
-                # 첫 몇 개 메시지는 상세 로그 기록
-                if processed_count <= 3:
-                    preview_text = message_text[:50] + "..." if len(message_text) > 50 else message_text
-                    print(f"행 {idx+1}: 메시지 생성 (길이: {len(message_text)}자) - {preview_text}")
-            
-            print(f"\n총 {filtered_df.shape[0]}행 중 {processed_count}개 처리됨, {skipped_count}개 건너뜀")
-            
-            if has_checkbox:
-                print("체크박스 선택된 항목만 처리되었습니다.")
+                print("A2 셀이 비어 있거나 값이 없습니다. 기본 템플릿을 사용합니다.")
+        else:
+            print("템플릿 시트를 찾을 수 없습니다. 첫 번째 시트의 A2 셀을 확인합니다.")
+            try:
+                first_sheet = wb[wb.sheetnames[0]]
+                a2_value = first_sheet['A2'].value
+                if a2_value and a2_value.strip():
+                    print(f"첫 번째 시트의 A2 셀 값: '{a2_value}'")
+                    sample_template = str(a2_value)
+            except Exception as e:
+                print(f"첫 번째 시트 A2 셀 접근 중 오류: {str(e)}")
+                print("기본 템플릿을 사용합니다.")
+    except Exception as e:
+        print(f"템플릿 추출 중 오류 발생: {str(e)}")
+        traceback.print_exc()
+        print("기본 템플릿을 사용합니다.")
+    
+    return sample_template
+
+def open_auto_excel_source(wb):
+    """
+    워크북에서 템플릿과 데이터 시트를 찾아 행 레코드 스트림과 열 정보를 준비합니다.
+    행은 아직 읽지 않으며, iter_auto_excel_rows로 한 행씩 읽습니다.
+    """
+    sample_template = read_auto_excel_template(wb)
+    
+    # 데이터 시트 읽기
+    print("엑셀 파일 데이터 시트 읽기 시작")
+    columns = None
+    records = None
+    sheet_names_tried = []
+    
+    # 시트 이름 리스트 준비 - 알려진 이름 + 파일의 모든 시트 (중복 제거)
+    all_sheets = wb.sheetnames
+    print(f"파일의 모든 시트: {all_sheets}")
+    sheet_name_candidates = list(dict.fromkeys(['data', 'Data', '데이터', 'Sheet1', '발송', '발송목록', 'data-sheet'] + all_sheets))
+    
+    for sheet_name in sheet_name_candidates:
+        if sheet_name not in all_sheets:
+            continue
+        try:
+            sheet_names_tried.append(sheet_name)
+            sheet_columns, sheet_rows = excel_reader.sheet_records(wb[sheet_name])
             
-            # 결과 반환
-            result = {
-                'success': True,
-                'message': f'자동 메시지 템플릿 처리 완료: {processed_count}건',
-                'total': processed_count,
-                'preview': preview_messages[:5],  # 미리보기는 최대 5건만 표시
-                'recipients': recipients  # 발송 목적인 경우 사용할 전체 수신자 목록
-            }
+            # 데이터 확인 (최소 헤더 + 1행) - 첫 행만 읽어 보고 다시 스트림 앞에 붙임
+            first_row = next(sheet_rows, None)
+            if first_row is None:
+                print(f"시트 '{sheet_name}'에 데이터가 없음, 다음 시트 시도")
+                continue
             
-            return result
+            print(f"시트 '{sheet_name}' 발견됨")
+            columns = sheet_columns
+            records = chain([first_row], sheet_rows)
+            break
         except Exception as e:
-            print(f"데이터 처리 중 오류 발생: {str(e)}")
-            traceback.print_exc()
-            return {
-                'success': False,
-                'message': f'엑셀 파일 처리 중 오류가 발생했습니다: {str(e)}'
-            }
-    except Exception as e:
-        print(f"자동 메시지 처리 중 오류 발생: {str(e)}")
-        traceback.print_exc()
+            print(f"시트 '{sheet_name}' 읽기 실패: {str(e)}")
+            continue
+    
+    # 데이터를 찾지 못하면 오류 반환
+    if records is None:
+        error_message = f"엑셀 파일에서 데이터를 찾을 수 없습니다. 시도한 시트: {', '.join(sheet_names_tried)}"
+        print(error_message)
         return {
             'success': False,
-            'message': f'자동 메시지 처리 중 오류가 발생했습니다: {str(e)}'
-        }
\ No newline at end of file
+            'message': error_message
+        }
+    
+    print(f"엑셀 파일 열: {columns}")
+    
+    # 열 역할(체크박스/전화번호/이름/주문일자/주문금액/주문상품)은 헤더 구성별로 한 번만 추론 (recipient_pipeline)
+    source = recipient_pipeline.recipient_source(columns, records)
+    schema = source['schema']
+    name_col = schema.name
+    phone_col = schema.phone
+    date_col = schema.date
+    amount_col = schema.amount
+    product_col = schema.product
+    
+    # 전화번호 열은 필수
+    if not phone_col:
+        return {
+            'success': False,
+            'message': f'엑셀 파일에 휴대폰번호 열이 없습니다. 수신자 정보를 확인해주세요.'
+        }
+    
+    # 템플릿에 변수가 있는지 확인하고 안내
+    variables = re.findall(r'\{\{([^{}]+)\}\}', sample_template)
+    if variables:
+        print(f"템플릿에서 발견된 변수: {variables}")
+        missing_vars = []
+        
+        var_mapping = {
+            '이름': name_col,
+            '주문일자': date_col,
+            '주문금액': amount_col,
+            '주문상품': product_col
+        }
+        
+        for var in variables:
+            if var in var_mapping and not var_mapping[var]:
+                missing_vars.append(var)
+        
+        if missing_vars:
+            print(f"[경고] 템플릿에 사용된 변수 중 해당하는 열을 찾을 수 없습니다: {', '.join(missing_vars)}")
+            print("해당 변수는 치환되지 않거나 기본값으로 대체될 수 있습니다.")
+    
+    source.update({
+        'template': sample_template,
+        'name_col': name_col,
+        'date_col': date_col,
+        'amount_col': amount_col,
+        'product_col': product_col,
+        'render': build_auto_excel_renderer(sample_template, columns, name_col, date_col, amount_col, product_col),
+        'tally': message_types.new_tally()
+    })
+    return source
+
+def iter_auto_excel_batches(source):
+    """
+    데이터 시트를 ROW_BATCH_SIZE행씩 묶어 수신번호 정제와 발송 대상(체크된 행 중 유효한 번호) 선택을 열 단위로 수행합니다.
+    같은 번호가 다시 나오면 처음 나온 행만 발송 대상으로 남기며(DEDUPE_RECIPIENTS),
+    읽은 행/체크된 행/건너뛴 행/중복 제거된 행 수는 source['stats']에 누적합니다.
+    """
+    return recipient_pipeline.iter_source_batches(source)
+
+def iter_auto_excel_rows(source):
+    """발송 대상 행을 (행 번호, 레코드, 정제된 전화번호)로 하나씩 반환합니다."""
+    return recipient_pipeline.iter_source_rows(source)
+
+def auto_excel_value_formatter(var_name):
+    """열 이름과 같은 변수의 값 변환 함수 (날짜/금액 변수는 형식 정리)"""
+    is_date = message_template.is_date_name(var_name)
+    is_amount = message_template.is_amount_name(var_name)
+
+    def format_value(value):
+        text = message_template.format_date_value(value) if is_date else str(value)
+        return message_template.format_amount_value(text) if is_amount else text
+    return format_value
+
+def build_auto_excel_renderer(template, columns, name_col, date_col, amount_col, product_col):
+    """
+    템플릿을 한 번만 컴파일하고 변수마다 값을 가져올 열과 형식 변환을 미리 정해 행 렌더링 함수를 만듭니다.
+    정해진 변수(이름/주문일자/주문금액/주문상품)는 찾은 열의 값을, 그 밖의 변수나 값이 없는 경우는
+    이름이 같은 열의 값을 사용하고, 값이 없는 변수는 중괄호만 제거합니다.
+    """
+    date_formatter = str
+    if date_col is not None and message_template.is_date_name(date_col):
+        date_formatter = lambda value: message_template.format_date_value(value, strip_fraction=True)
+    fixed_columns = {
+        '이름': (name_col, str),
+        '주문일자': (date_col, date_formatter),
+        '주문금액': (amount_col, message_template.format_amount_value),
+        '주문상품': (product_col, str)
+    }
+
+    def resolve(var_name, raw):
+        getters = []
+        column, formatter = fixed_columns.get(var_name, (None, None))
+        if column is not None:
+            getters.append(message_template.column_getter(column, formatter))
+        if var_name in columns:
+            getters.append(message_template.column_getter(var_name, auto_excel_value_formatter(var_name)))
+        return message_template.first_value(getters, var_name)
+
+    return message_template.bind_template(message_template.compile_template(template), resolve)
+
+def build_auto_excel_message(phone, message_text, sender_phone, image_id=None, tally=None):
+    """정제된 전화번호와 렌더링된 메시지 원문으로 발송 메시지를 만듭니다. (image_id가 있으면 MMS, tally에 타입별 건수 집계)"""
+    return recipient_pipeline.build_message(phone, message_text, sender_phone, image_id, tally=tally)
+
+def iter_rendered_auto_excel_rows(source, cache_key=None):
+    """
+    발송 대상 행을 묶음 단위로 렌더링해 (행 번호, 전화번호, 메시지 원문)으로 하나씩 반환합니다.
+    묶음마다 메시지 바이트 길이와 타입을 한 번에 계산해 source['tally']에 타입별 건수를 누적합니다.
+    cache_key가 주어지면 렌더링 결과를 함께 기록하고, 끝까지 읽었을 때만 파싱 캐시에 등록합니다.
+    """
+    render = source['render']
+    cache_writer = open_auto_excel_cache_writer(cache_key)
+    completed = False
+    try:
+        for start, batch, phones, selected in iter_auto_excel_batches(source):
+            offsets = np.flatnonzero(selected)
+            texts = [render(batch[offset]) for offset in offsets]
+            recipient_pipeline.tally_texts(source['tally'], texts)
+            for offset, message_text in zip(offsets, texts):
+                phone = phones[offset]
+                if cache_writer is not None:
+                    cache_writer.append(phone, message_text)
+                yield start + int(offset), phone, message_text
+        completed = True
+    finally:
+        if cache_writer is not None:
+            if completed:
+                cache_writer.commit({'stats': source['stats'], 'template': source['template'],
+                                     'messageTypes': source['tally']})
+            else:
+                cache_writer.abort()
+
+def iter_cached_auto_excel_rows(entry):
+    """파싱 캐시 항목의 수신자를 (순번, 전화번호, 메시지 원문)으로 반환합니다."""
+    for idx, (phone, message_text) in enumerate(entry.iter_rows()):
+        yield idx, phone, message_text
+
+def iter_auto_excel_messages(rows, stats, sender_phone, image_id=None, preview=None, tally=None):
+    """
+    렌더링된 행(iter_rendered_auto_excel_rows 또는 iter_cached_auto_excel_rows)을 메시지로 만들어 하나씩 반환합니다.
+    (dispatch_message_stream 입력용) image_id가 있으면 MMS로 만들고, preview 리스트가 주어지면 앞 5건의 미리보기를 채웁니다.
+    tally가 주어지면 만든 메시지의 타입별 건수를 집계합니다.
+    """
+    processed_count = 0
+    for idx, phone, message_text in rows:
+        message = build_auto_excel_message(phone, message_text, sender_phone, image_id, tally)
+        processed_count += 1
+        
+        # 미리보기용 메시지 추가
+        if preview is not None and len(preview) < 5:
+            preview.append({
+                'index': processed_count,
+                'phone': message['to'],
+                'text': message_text
+            })
+        
+        # 첫 몇 개 메시지는 상세 로그 기록
+        if processed_count <= 3:
+            preview_text = message_text[:50] + "..." if len(message_text) > 50 else message_text
+            print(f"행 {idx+1}: 메시지 생성 (길이: {len(message_text)}자) - {preview_text}")
+        
+        yield message
+    
+    print(f"\n총 {stats['rows']}행 중 체크된 {stats['checked']}행, {processed_count}개 처리됨, {stats['skipped']}개 건너뜀, 중복 {stats['duplicates']}개 제외")
+
+def open_auto_excel_cache(excel_content):
+    """
+    자동 메시지 엑셀의 파싱 캐시를 확인합니다.
+    (캐시 키, 캐시 항목 또는 None)을 반환하며 캐시를 사용하지 않으면 (None, None)입니다.
+    """
+    cache = parse_cache.get_cache()
+    if cache is None:
+        return None, None
+    key = parse_cache.cache_key(parse_cache.content_hash(excel_content), {
+        'type': 'auto_excel',
+        'dedupe': recipient_columns.DEDUPE_RECIPIENTS
+    })
+    entry = cache.get(key)
+    if entry is not None:
+        print(f"파싱 캐시 사용: {key[:12]}... ({entry.count}건, 엑셀 파싱 생략)")
+    return key, entry
+
+def open_prepared_campaign(token):
+    """
+    미리보기 응답의 준비된 캠페인 토큰(campaignToken)이 가리키는 파싱 캐시 항목을 엽니다.
+    캐시를 사용하지 않거나, 항목이 삭제되었거나(LRU, 다른 Lambda 컨테이너), 토큰 형식이 아니면 None입니다.
+    """
+    cache = parse_cache.get_cache()
+    if cache is None:
+        return None
+    entry = cache.get(token)
+    if entry is None:
+        print(f"준비된 캠페인을 찾을 수 없습니다: {str(token)[:12]}...")
+        return None
+    print(f"준비된 캠페인 사용: {entry.key[:12]}... ({entry.count}건, 엑셀 업로드/파싱 생략)")
+    return entry
+
+def prepared_campaign_token(key):
+    """미리보기 렌더링 결과가 파싱 캐시에 등록되었으면 발송 요청에 쓸 토큰(캐시 키)을, 아니면 None을 반환합니다."""
+    cache = parse_cache.get_cache()
+    if cache is None or key is None or cache.get(key) is None:
+        return None
+    return key
+
+def open_auto_excel_cache_writer(key):
+    """파싱 캐시 기록기를 엽니다. (캐시를 사용하지 않거나 열 수 없으면 None)"""
+    cache = parse_cache.get_cache()
+    if cache is None or key is None:
+        return None
+    try:
+        return cache.writer(key)
+    except OSError as e:
+        print(f"파싱 캐시 기록 실패: {str(e)}")
+        return None
+
+def no_checked_rows_result():
+    """발송 대상으로 체크된 행이 없을 때의 결과"""
+    return {
+        'success': False,
+        'message': '처리할 행이 없습니다. 체크박스가 있는 경우 최소 하나의 행을 체크하세요.'
+    }
+
+def preview_auto_excel_messages(source, sender_phone, preview_limit, cache_key=None, estimate_cost=False, has_image=False):
+    """
+    유효한 행 중 앞 preview_limit건만 렌더링하고 나머지는 열 단위 선택 마스크로 전체 건수만 계산합니다.
+    cache_key가 주어지면 발송 단계에서 엑셀을 다시 읽지 않도록 모든 행을 렌더링해 파싱 캐시에 기록하고,
+    estimate_cost이면 모든 행을 렌더링합니다. 두 경우에는 타입별 건수/예상 비용도 함께 반환합니다.
+    (타입은 메시지 길이로 정해지므로 건수만 계산하는 미리보기에서는 알 수 없음)
+    """
+    preview_messages = []
+    valid_count = 0
+    tally = None
+    
+    if cache_key is not None or estimate_cost:
+        tally = source['tally']
+        for idx, phone, message_text in iter_rendered_auto_excel_rows(source, cache_key):
+            valid_count += 1
+            if len(preview_messages) < preview_limit:
+                preview_messages.append({
+                    'index': len(preview_messages) + 1,
+                    'phone': phone,
+                    'text': message_text
+                })
+    else:
+        render = source['render']
+        for start, batch, phones, selected in iter_auto_excel_batches(source):
+            valid_count += int(selected.sum())
+            if len(preview_messages) >= preview_limit:
+                continue
+            for offset in np.flatnonzero(selected)[:preview_limit - len(preview_messages)]:
+                preview_messages.append({
+                    'index': len(preview_messages) + 1,
+                    'phone': phones[offset],
+                    'text': render(batch[offset])
+                })
+    
+    stats = source['stats']
+    print(f"미리보기 모드: 총 {stats['rows']}행 중 체크된 {stats['checked']}행, 유효한 행 {valid_count}개 중 {len(preview_messages)}개 미리보기")
+    return auto_excel_preview_result(stats, valid_count, preview_messages, preview_limit,
+                                     prepared_campaign_token(cache_key), tally, has_image)
+
+def preview_cached_auto_excel_messages(entry, preview_limit, has_image=False):
+    """파싱 캐시 항목에서 앞 preview_limit건의 미리보기를 만듭니다."""
+    preview_messages = [
+        {'index': index + 1, 'phone': phone, 'text': message_text}
+        for index, (phone, message_text) in enumerate(entry.iter_rows(limit=preview_limit))
+    ]
+    return auto_excel_preview_result(entry.meta['stats'], entry.count, preview_messages, preview_limit, entry.key,
+                                     entry.meta.get('messageTypes'), has_image)
+
+def auto_excel_preview_result(stats, total, preview_messages, preview_limit, campaign_token=None, tally=None,
+                              has_image=False):
+    """
+    미리보기 응답 (preview_limit건 미리보기 + 전체 건수, tally가 있으면 타입별 건수와 예상 비용 - has_image이면 MMS)
+    campaign_token이 있으면 발송 요청에 엑셀 대신 보낼 수 있도록 campaignToken으로 함께 반환합니다.
+    """
+    if stats['checked'] == 0:
+        return no_checked_rows_result()
+    
+    result = {
+        'success': True,
+        'message': f'자동 메시지 템플릿 처리 완료: {total}건',
+        'total': total,
+        'duplicateCount': stats['duplicates'],
+        'preview': preview_messages,
+        'previewRows': preview_limit
+    }
+    if tally is not None:
+        result['messageTypes'] = message_types.summarize(tally, has_image)
+        print(f"발송 예정: {message_types.describe(result['messageTypes'])}")
+    if campaign_token:
+        result['campaignToken'] = campaign_token
+    return result
+
+def collect_auto_excel_messages(rows, stats, sender_phone, cache_key=None):
+    """
+    전체 수신자 메시지 목록을 만듭니다. (fullPreview 요청용 - 발송은 iter_auto_excel_messages로 스트리밍)
+    렌더링 결과가 cache_key로 파싱 캐시에 등록되었으면 발송 요청에 쓸 campaignToken도 반환합니다.
+    """
+    preview_messages = []
+    tally = message_types.new_tally()
+    recipients = list(iter_auto_excel_messages(rows, stats, sender_phone, preview=preview_messages, tally=tally))
+    if stats['checked'] == 0:
+        return no_checked_rows_result()
+    
+    result = {
+        'success': True,
+        'message': f'자동 메시지 템플릿 처리 완료: {len(recipients)}건',
+        'total': len(recipients),
+        'duplicateCount': stats['duplicates'],
+        'messageTypes': message_types.summarize(tally),
+        'preview': preview_messages,  # 미리보기는 최대 5건만 표시
+        'recipients': recipients  # 전체 수신자 목록
+    }
+    campaign_token = prepared_campaign_token(cache_key)
+    if campaign_token:
+        result['campaignToken'] = campaign_token
+    return result
@@ -0,0 +1,96 @@
+import re
+from datetime import datetime
+
+# {{변수}} 형식의 변수
+DOUBLE_BRACE_PATTERN = re.compile(r'\{\{([^{}]+)\}\}')
+# {{변수}} 또는 {변수} 형식의 변수
+ANY_BRACE_PATTERN = re.compile(r'\{\{([^{}]+)\}\}|\{([^{}]+)\}')
+
+def compile_template(template, pattern=DOUBLE_BRACE_PATTERN):
+    """
+    템플릿을 리터럴 조각과 변수 조각으로 한 번만 분해합니다.
+    반환값의 'parts'는 [리터럴, None, 리터럴, ..., None, 리터럴] 형태로 None 자리에 변수 값이 들어가고,
+    'variables'는 변수마다 (변수 이름, 템플릿 원문)입니다.
+    """
+    parts = []
+    variables = []
+    position = 0
+    for match in pattern.finditer(template):
+        name = next(group for group in match.groups() if group is not None)
+        parts.append(template[position:match.start()])
+        parts.append(None)
+        variables.append((name, match.group(0)))
+        position = match.end()
+    parts.append(template[position:])
+    return {'parts': parts, 'variables': variables}
+
+def bind_template(compiled, resolve):
+    """
+    컴파일된 템플릿의 변수마다 resolve(변수 이름, 템플릿 원문)로 값 함수를 한 번만 정해
+    행 레코드를 받아 메시지를 만드는 렌더링 함수를 반환합니다. (행마다 join 한 번)
+    """
+    parts = compiled['parts']
+    getters = [resolve(name, raw) for name, raw in compiled['variables']]
+    if not getters:
+        text = parts[0]
+        return lambda row: text
+
+    def render(row):
+        values = parts[:]
+        values[1::2] = [getter(row) for getter in getters]
+        return ''.join(values)
+    return render
+
+def column_getter(column, formatter=str):
+    """행에서 column 값을 formatter로 변환해 반환하는 함수를 만듭니다. (값이 없거나 빈 문자열이면 None)"""
+    def get(row):
+        value = row.get(column)
+        if value is None or value != value:  # 값 없음 또는 NaN
+            return None
+        return formatter(value) or None
+    return get
+
+def first_value(getters, default):
+    """값 함수를 차례로 적용해 처음으로 값이 있는 결과를, 모두 없으면 default를 반환하는 함수를 만듭니다."""
+    if not getters:
+        return lambda row: default
+
+    def get(row):
+        for getter in getters:
+            value = getter(row)
+            if value:
+                return value
+        return default
+    return get
+
+def is_date_name(name):
+    """날짜 값으로 다룰 열/변수 이름인지 확인합니다."""
+    name = str(name)
+    return '일자' in name or '날짜' in name or 'date' in name.lower()
+
+def is_amount_name(name):
+    """금액 값으로 다룰 열/변수 이름인지 확인합니다."""
+    name = str(name)
+    return '금액' in name or '가격' in name or 'price' in name.lower() or 'amount' in name.lower()
+
+def format_date_value(value, strip_fraction=False):
+    """날짜 셀은 'YYYY-MM-DD'로, 문자열은 시간 부분('00:00:00')을 잘라 반환합니다."""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    text = str(value)
+    if ' 00:00:00' in text:  # 'YYYY-MM-DD 00:00:00' 형식
+        return text.split(' ')[0]
+    if 'T00:00:00' in text:  # 'YYYY-MM-DDT00:00:00' 형식
+        return text.split('T')[0]
+    if strip_fraction and '.' in text and len(text) > 10:  # 'YYYY-MM-DD.000000' 형식
+        return text.split('.')[0]
+    return text
+
+def format_amount_value(value):
+    """숫자만 추출해 천 단위 구분기호를 붙입니다. ('원'이 있으면 유지, 숫자가 없으면 원래 값)"""
+    text = str(value)
+    digits = ''.join(filter(str.isdigit, text))
+    if not digits:
+        return text
+    formatted = format(int(digits), ',')
+    return formatted + '원' if '원' in text else formatted
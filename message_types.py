@@ -0,0 +1,106 @@
+import os
+import codecs
+import numpy as np
+
+# 문자 종류(SMS/LMS/MMS) 판별과 발송 비용 추정
+#
+# 이통사는 문자 길이를 글자 수가 아니라 EUC-KR 바이트 수로 셉니다.
+# (영문/숫자/공백/기호 1바이트, 한글/한자/특수문자 2바이트, 줄바꿈 \r\n 2바이트)
+# SMS_MAX_BYTES 이하는 SMS, 넘으면 LMS, 이미지가 있으면 MMS이며 LMS_MAX_BYTES를 넘으면 발송되지 않습니다.
+
+SMS_MAX_BYTES = int(os.environ.get('SMS_MAX_BYTES', '90'))
+LMS_MAX_BYTES = int(os.environ.get('LMS_MAX_BYTES', '2000'))
+
+# 타입별 건당 예상 단가 (원) - 계약 단가에 맞게 설정
+SMS_UNIT_PRICE = float(os.environ.get('SMS_UNIT_PRICE', '20'))
+LMS_UNIT_PRICE = float(os.environ.get('LMS_UNIT_PRICE', '50'))
+MMS_UNIT_PRICE = float(os.environ.get('MMS_UNIT_PRICE', '120'))
+
+MESSAGE_TYPES = ('SMS', 'LMS', 'MMS')
+
+def unit_prices():
+    """타입별 건당 예상 단가 (원)"""
+    return {'SMS': SMS_UNIT_PRICE, 'LMS': LMS_UNIT_PRICE, 'MMS': MMS_UNIT_PRICE}
+
+def _count_as_wide(error):
+    # EUC-KR에 없는 문자(이모지 등)도 한 글자당 2바이트로 계산
+    return b'??' * (error.end - error.start), error.end
+
+codecs.register_error('sms_bytes', _count_as_wide)
+
+def byte_length(text):
+    """문자 메시지 길이 (EUC-KR 바이트 수)"""
+    if not text:
+        return 0
+    if text.isascii():
+        return len(text)
+    # CP949는 EUC-KR에 없는 현대 한글 음절도 2바이트로 인코딩
+    return len(text.encode('cp949', 'sms_bytes'))
+
+def classify(length, image_id=None):
+    """바이트 길이로 메시지 타입을 정합니다. (이미지가 있으면 MMS)"""
+    if image_id:
+        return 'MMS'
+    return 'SMS' if length <= SMS_MAX_BYTES else 'LMS'
+
+def message_type(text, image_id=None):
+    """메시지 타입 (이미지가 있으면 MMS, SMS_MAX_BYTES 바이트를 넘으면 LMS, 아니면 SMS)"""
+    return classify(byte_length(text), image_id)
+
+def new_tally():
+    """타입별 건수, LMS_MAX_BYTES를 넘는 건수, 가장 긴 메시지의 바이트 수"""
+    return {'SMS': 0, 'LMS': 0, 'MMS': 0, 'overLimit': 0, 'maxBytes': 0}
+
+def count_message(tally, msg_type, length, count=1):
+    """타입과 바이트 길이가 정해진 메시지 count건을 tally에 더합니다."""
+    tally[msg_type] += count
+    if length > LMS_MAX_BYTES:
+        tally['overLimit'] += count
+    if length > tally['maxBytes']:
+        tally['maxBytes'] = length
+
+def tally_texts(tally, texts, image_id=None):
+    """
+    메시지 원문 묶음의 바이트 길이를 한 번에 계산해 타입별 건수를 tally에 더하고 바이트 길이 배열을 반환합니다.
+    (texts는 발송할 때와 같이 포맷팅된 원문이어야 합니다.)
+    """
+    lengths = np.fromiter(map(byte_length, texts), dtype=np.int64, count=len(texts))
+    if not len(lengths):
+        return lengths
+
+    if image_id:
+        tally['MMS'] += len(lengths)
+    else:
+        sms_count = int(np.count_nonzero(lengths <= SMS_MAX_BYTES))
+        tally['SMS'] += sms_count
+        tally['LMS'] += len(lengths) - sms_count
+    tally['overLimit'] += int(np.count_nonzero(lengths > LMS_MAX_BYTES))
+    tally['maxBytes'] = max(tally['maxBytes'], int(lengths.max()))
+    return lengths
+
+def summarize(tally, image_id=None):
+    """
+    타입별 건수와 예상 비용 (응답/로그용)
+    텍스트만으로 집계한 tally라도 image_id가 주어지면 모든 메시지를 MMS로 계산합니다.
+    """
+    counts = {msg_type: tally[msg_type] for msg_type in MESSAGE_TYPES}
+    if image_id:
+        counts = {'SMS': 0, 'LMS': 0, 'MMS': sum(counts.values())}
+    prices = unit_prices()
+    summary = dict(counts)
+    summary.update({
+        'total': sum(counts.values()),
+        'overLimitCount': tally['overLimit'],
+        'maxBytes': tally['maxBytes'],
+        'estimatedCost': round(sum(counts[t] * prices[t] for t in MESSAGE_TYPES), 2),
+        'unitPrices': prices
+    })
+    return summary
+
+def describe(summary):
+    """요약 한 줄 (로그용)"""
+    text = (f"SMS {summary['SMS']}건, LMS {summary['LMS']}건, MMS {summary['MMS']}건, "
+            f"예상 비용 {summary['estimatedCost']:,.0f}원")
+    if summary['overLimitCount']:
+        text += f" (LMS 최대 {LMS_MAX_BYTES}바이트 초과 {summary['overLimitCount']}건)"
+    return text
@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from array import array
+import numpy as np
+
+# 엑셀 파싱/렌더링 결과 캐시 설정
+# 같은 파일로 미리보기 후 발송할 때 발송 단계에서 엑셀을 다시 읽지 않도록 /tmp에 보관
+# (웜 Lambda 컨테이너와 로컬 실행에서 유효)
+PARSE_CACHE_ENABLED = os.environ.get('PARSE_CACHE_ENABLED', 'True').lower() == 'true'
+PARSE_CACHE_DIR = os.environ.get('PARSE_CACHE_DIR', '/tmp/solapi_parse_cache')
+# 캐시 전체 최대 크기(바이트) - 넘으면 가장 오래 사용하지 않은 항목부터 삭제
+PARSE_CACHE_MAX_BYTES = int(os.environ.get('PARSE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# 저장 형식이나 파싱/렌더링 규칙이 바뀌면 올려서 이전 항목을 무효화
+FORMAT_VERSION = 3
+
+# 캐시 키 형식 (SHA-256 16진수) - 요청으로 받은 키(준비된 캠페인 토큰)를 경로로 쓰기 전에 확인
+KEY_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+# 작성 중 중단된 임시 항목을 정리하기까지의 시간(초)
+STALE_TEMP_SECONDS = 60 * 60
+
+def content_hash(content):
+    """업로드 파일 바이트의 SHA-256"""
+    return hashlib.sha256(content).hexdigest()
+
+def cache_key(sha256, options=None):
+    """업로드 파일의 SHA-256과 파싱/렌더링 옵션으로 캐시 키를 만듭니다."""
+    raw = json.dumps(
+        {'sha256': sha256, 'options': options or {}, 'version': FORMAT_VERSION},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def is_cache_key(key):
+    """cache_key로 만든 형식의 키인지 확인합니다."""
+    return isinstance(key, str) and KEY_PATTERN.fullmatch(key) is not None
+
+class CachedEntry:
+    """
+    캐시 항목 (열 단위 파일)
+      - phones.txt: 수신번호 (한 줄에 하나)
+      - text.bin: 렌더링된 메시지 원문을 UTF-8로 이어 붙인 바이트
+      - offsets.npy: text.bin에서 각 메시지의 시작 위치 (int64, 행 수 + 1개)
+      - meta.json: 건수, 통계 등 부가 정보
+    """
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+
+    @property
+    def key(self):
+        return os.path.basename(self.path)
+
+    @property
+    def count(self):
+        return self.meta['count']
+
+    def iter_rows(self, limit=None):
+        """(수신번호, 메시지 원문)을 파일에서 차례로 읽어 반환합니다. (전체를 메모리에 올리지 않음)"""
+        offsets = np.load(os.path.join(self.path, 'offsets.npy'), mmap_mode='r')
+        count = self.count if limit is None else min(limit, self.count)
+        with open(os.path.join(self.path, 'phones.txt'), 'r', encoding='ascii') as phones, \
+                open(os.path.join(self.path, 'text.bin'), 'rb') as texts:
+            for row in range(count):
+                phone = phones.readline().rstrip('\n')
+                text = texts.read(int(offsets[row + 1] - offsets[row])).decode('utf-8')
+                yield phone, text
+
+class EntryWriter:
+    """
+    렌더링된 수신자를 한 행씩 받아 열 단위 파일로 기록합니다.
+    commit 전까지는 임시 디렉터리에 쓰고, 항목 크기가 캐시 최대 크기를 넘으면 기록을 포기합니다.
+    """
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.temp_path = os.path.join(cache.directory, f".{key}.{uuid.uuid4().hex}")
+        os.makedirs(self.temp_path)
+        self.phones = open(os.path.join(self.temp_path, 'phones.txt'), 'w', encoding='ascii')
+        self.texts = open(os.path.join(self.temp_path, 'text.bin'), 'wb')
+        self.offsets = array('q', [0])
+        self.size = 0
+        self.aborted = False
+
+    def append(self, phone, text):
+        if self.aborted:
+            return
+        data = text.encode('utf-8')
+        self.phones.write(phone + '\n')
+        self.texts.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+        self.size += len(data) + len(phone) + 9
+        if self.size > self.cache.max_bytes:
+            print(f"[정보] 파싱 결과가 캐시 최대 크기를 넘어 캐시하지 않습니다: {self.size} bytes")
+            self.abort()
+
+    def commit(self, meta=None):
+        """기록을 마치고 캐시 항목으로 등록합니다. 등록하지 못하면 False"""
+        if self.aborted:
+            return False
+        self.phones.close()
+        self.texts.close()
+        meta = dict(meta or {}, count=len(self.offsets) - 1, createdAt=time.time())
+        np.save(os.path.join(self.temp_path, 'offsets.npy'), np.frombuffer(self.offsets, dtype=np.int64))
+        with open(os.path.join(self.temp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        try:
+            os.rename(self.temp_path, os.path.join(self.cache.directory, self.key))
+        except OSError:
+            # 같은 키를 다른 요청이 먼저 등록함
+            shutil.rmtree(self.temp_path, ignore_errors=True)
+            return False
+        self.cache.evict()
+        return True
+
+    def abort(self):
+        """기록을 취소하고 임시 파일을 삭제합니다."""
+        if self.aborted:
+            return
+        self.aborted = True
+        self.phones.close()
+        self.texts.close()
+        shutil.rmtree(self.temp_path, ignore_errors=True)
+
+class ParseCache:
+    """/tmp 디렉터리의 파싱/렌더링 결과 캐시 (키별 하위 디렉터리, 크기 기준 LRU 삭제)"""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or PARSE_CACHE_DIR
+        self.max_bytes = max_bytes or PARSE_CACHE_MAX_BYTES
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key):
+        """캐시 항목을 반환합니다. 없거나 손상되었거나 키 형식이 아니면 None"""
+        if not is_cache_key(key):
+            return None
+        path = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            # 최근 사용 시각 갱신 (LRU)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CachedEntry(path, meta)
+
+    def writer(self, key):
+        return EntryWriter(self, key)
+
+    def evict(self):
+        """전체 크기가 최대 크기 이하가 되도록 가장 오래 사용하지 않은 항목부터 삭제합니다."""
+        with self._lock:
+            entries = []
+            total = 0
+            now = time.time()
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                try:
+                    mtime = os.path.getmtime(path)
+                    if name.startswith('.'):
+                        # 작성 중 중단된 임시 항목 정리
+                        if now - mtime > STALE_TEMP_SECONDS:
+                            shutil.rmtree(path, ignore_errors=True)
+                        continue
+                    size = sum(entry.stat().st_size for entry in os.scandir(path))
+                except OSError:
+                    continue
+                entries.append((mtime, size, path))
+                total += size
+
+            for mtime, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                print(f"파싱 캐시 항목 삭제 (LRU): {os.path.basename(path)[:12]}..., {size} bytes")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """프로세스 전역 파싱 캐시 (PARSE_CACHE_ENABLED가 False이거나 디렉터리를 만들 수 없으면 None)"""
+    global _cache
+    if not PARSE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ParseCache()
+            except OSError as e:
+                print(f"파싱 캐시 디렉터리를 만들 수 없습니다: {str(e)}")
+                return None
+        return _cache
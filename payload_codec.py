@@ -0,0 +1,119 @@
+import os
+import gzip
+import json
+import base64
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Flask ↔ Lambda 본문 압축 설정
+# 이 크기(바이트)보다 작은 본문은 압축하지 않음
+PAYLOAD_COMPRESSION_MIN_SIZE = int(os.environ.get('PAYLOAD_COMPRESSION_MIN_SIZE', '1024'))
+PAYLOAD_GZIP_LEVEL = int(os.environ.get('PAYLOAD_GZIP_LEVEL', '6'))
+PAYLOAD_ZSTD_LEVEL = int(os.environ.get('PAYLOAD_ZSTD_LEVEL', '3'))
+
+# 상대방이 지원하는 압축 방식을 알리는 응답 헤더
+ACCEPT_ENCODING_HEADER = 'X-Accept-Encoding'
+
+# 압축 데이터 시작 바이트 (이미 해제된 본문을 다시 해제하지 않도록 확인)
+MAGIC_BYTES = {
+    'gzip': b'\x1f\x8b',
+    'zstd': b'\x28\xb5\x2f\xfd'
+}
+
+def supported_encodings():
+    """사용 가능한 압축 방식을 선호 순서대로 반환합니다."""
+    if zstandard is not None:
+        return ['zstd', 'gzip']
+    return ['gzip']
+
+def accept_encoding_value():
+    """Accept-Encoding 헤더 값을 만듭니다."""
+    return ', '.join(supported_encodings())
+
+def choose_encoding(accept_encoding):
+    """상대방의 Accept-Encoding 값 중 지원하는 가장 선호하는 압축 방식을 반환합니다. 없으면 None."""
+    if not accept_encoding:
+        return None
+    offered = {item.split(';')[0].strip().lower() for item in accept_encoding.split(',')}
+    for encoding in supported_encodings():
+        if encoding in offered:
+            return encoding
+    return None
+
+def compress(data, encoding):
+    """바이트를 지정한 방식으로 압축합니다."""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=PAYLOAD_ZSTD_LEVEL).compress(data)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=PAYLOAD_GZIP_LEVEL)
+    return data
+
+def decompress(data, encoding):
+    """압축된 바이트를 해제합니다. 압축 형식이 아니면 그대로 반환합니다."""
+    encoding = (encoding or '').lower()
+    magic = MAGIC_BYTES.get(encoding)
+    if not magic or not data.startswith(magic):
+        return data
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise ValueError('zstd 압축 해제에 필요한 zstandard 모듈이 없습니다.')
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return gzip.decompress(data)
+
+def _header(headers, name):
+    for key, value in (headers or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+def decode_event(event):
+    """
+    Lambda 함수 URL 이벤트의 본문을 base64/압축 해제한 JSON 문자열로 바꾼 이벤트를 반환합니다.
+    압축되지 않은 이벤트는 그대로 반환합니다.
+    """
+    body = event.get('body')
+    encoding = _header(event.get('headers'), 'Content-Encoding')
+    if not isinstance(body, str) or not (event.get('isBase64Encoded') or encoding):
+        return event
+
+    raw = base64.b64decode(body) if event.get('isBase64Encoded') else body.encode('utf-8')
+    if encoding:
+        raw = decompress(raw, encoding)
+        print(f"요청 본문 압축 해제: {encoding}, {len(body)} → {len(raw)} bytes")
+    return dict(event, body=raw.decode('utf-8'), isBase64Encoded=False)
+
+def encode_response(result, event):
+    """
+    처리 결과를 Lambda 함수 URL 응답으로 만듭니다.
+    요청의 Accept-Encoding에 맞춰 본문을 압축하고 지원하는 압축 방식을 헤더로 알립니다.
+    """
+    # 이미 HTTP 응답 형식인 결과(본문 파싱 오류 등)는 그대로 반환
+    if isinstance(result, dict) and 'statusCode' in result:
+        return result
+
+    body = json.dumps(result).encode('utf-8')
+    headers = {
+        'Content-Type': 'application/json',
+        ACCEPT_ENCODING_HEADER: accept_encoding_value()
+    }
+
+    encoding = choose_encoding(_header(event.get('headers'), 'Accept-Encoding'))
+    if encoding and len(body) >= PAYLOAD_COMPRESSION_MIN_SIZE:
+        compressed = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': base64.b64encode(compressed).decode('ascii'),
+            'isBase64Encoded': True
+        }
+
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': body.decode('utf-8'),
+        'isBase64Encoded': False
+    }
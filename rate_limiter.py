@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import asyncio
+import threading
+
+# 솔라피 호출 속도 제한 설정 (초당 요청 수)
+SOLAPI_RATE_LIMIT = float(os.environ.get('SOLAPI_RATE_LIMIT', '10'))
+SOLAPI_RATE_MIN = float(os.environ.get('SOLAPI_RATE_MIN', '1'))
+SOLAPI_RATE_MAX = float(os.environ.get('SOLAPI_RATE_MAX', '50'))
+
+# AIMD 조정 값: 성공 시 더하는 양, 제한 감지 시 곱하는 비율, 연속 감속 방지 간격(초)
+RATE_INCREASE_STEP = float(os.environ.get('RATE_INCREASE_STEP', '0.5'))
+RATE_DECREASE_FACTOR = float(os.environ.get('RATE_DECREASE_FACTOR', '0.5'))
+RATE_DECREASE_COOLDOWN = float(os.environ.get('RATE_DECREASE_COOLDOWN', '1'))
+
+# 응답에서 속도 제한/서버 과부하로 판단하는 HTTP 상태 코드와 (200이 아닌 응답 본문 최상위의) 솔라피 오류 코드
+THROTTLE_STATUS_CODES = {429, 503}
+THROTTLE_ERROR_CODES = ('RateLimitError', 'ServerError')
+
+def response_error_code(body_text):
+    """응답 본문(JSON) 최상위의 errorCode를 반환합니다. (JSON이 아니거나 없으면 None)"""
+    try:
+        body = json.loads(body_text) if body_text else None
+    except ValueError:
+        return None
+    return body.get('errorCode') if isinstance(body, dict) else None
+
+def is_throttled(status_code, body_text=''):
+    """
+    응답이 속도 제한 또는 서버 과부하를 나타내는지 확인합니다.
+    200 응답 본문(send-many의 failedMessageList 등 메시지별 실패)은 보지 않습니다.
+    """
+    if status_code in THROTTLE_STATUS_CODES:
+        return True
+    if status_code != 200:
+        return response_error_code(body_text) in THROTTLE_ERROR_CODES
+    return False
+
+class AdaptiveRateLimiter:
+    """
+    토큰 버킷 + AIMD 방식의 적응형 속도 제한기.
+    성공하면 허용 속도와 동시 요청 수를 조금씩 올리고(가산),
+    RateLimitError/429가 감지되면 절반으로 줄입니다(승산).
+    """
+
+    def __init__(self, rate=None, min_rate=None, max_rate=None, max_concurrency=4):
+        self.min_rate = min_rate or SOLAPI_RATE_MIN
+        self.max_rate = max_rate or SOLAPI_RATE_MAX
+        self.rate = min(max(rate or SOLAPI_RATE_LIMIT, self.min_rate), self.max_rate)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.concurrency = float(self.max_concurrency)
+
+        self.tokens = 1.0
+        self.in_flight = 0
+        self.success_count = 0
+        self.throttle_count = 0
+        self.last_refill = time.monotonic()
+        self.last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        # 버킷 크기는 1초 분량의 토큰
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.tokens = min(max(self.rate, 1.0), self.tokens + elapsed * self.rate)
+
+    def _try_acquire(self):
+        """슬롯을 얻으면 0을, 아니면 다시 시도하기까지 기다릴 시간(초)을 반환합니다."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.in_flight >= int(self.concurrency):
+                return 0.01
+            if self.tokens < 1.0:
+                return (1.0 - self.tokens) / self.rate
+            self.tokens -= 1.0
+            self.in_flight += 1
+            return 0
+
+    def acquire(self):
+        """토큰과 동시 요청 슬롯을 얻을 때까지 대기합니다."""
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """이벤트 루프를 막지 않고 토큰과 동시 요청 슬롯을 기다립니다."""
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self, throttled=False):
+        """
+        요청 결과를 반영하고 슬롯을 반환합니다.
+        throttled가 None이면(응답을 받지 못한 연결/DNS 오류 등) 속도를 조정하지 않고 슬롯만 반환합니다.
+        """
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if throttled is None:
+                return
+            if throttled:
+                self.throttle_count += 1
+                now = time.monotonic()
+                # 같은 혼잡 구간에서 여러 번 감속하지 않도록 간격 유지
+                if now - self.last_decrease >= RATE_DECREASE_COOLDOWN:
+                    self.last_decrease = now
+                    self.rate = max(self.min_rate, self.rate * RATE_DECREASE_FACTOR)
+                    self.concurrency = max(1.0, self.concurrency * RATE_DECREASE_FACTOR)
+                    self.tokens = min(self.tokens, 0.0)
+                    print(f"속도 제한 감지: 허용 속도 {self.rate:.2f}req/s, 동시 요청 {int(self.concurrency)}개로 감소")
+            else:
+                self.success_count += 1
+                self.rate = min(self.max_rate, self.rate + RATE_INCREASE_STEP)
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+
+    def snapshot(self):
+        """현재 허용 속도와 상태를 반환합니다."""
+        with self._lock:
+            return {
+                'rate': round(self.rate, 2),
+                'maxRate': self.max_rate,
+                'utilization': round(self.rate / self.max_rate, 2),
+                'concurrency': int(self.concurrency),
+                'maxConcurrency': self.max_concurrency,
+                'inFlight': self.in_flight,
+                'successCount': self.success_count,
+                'throttleCount': self.throttle_count
+            }
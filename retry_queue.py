@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import random
+import sqlite3
+from contextlib import closing
+
+# 재시도 큐 설정
+RETRY_QUEUE_ENABLED = os.environ.get('RETRY_QUEUE_ENABLED', 'True').lower() == 'true'
+RETRY_QUEUE_PATH = os.environ.get('RETRY_QUEUE_PATH', '/tmp/solapi_retry_queue.db')
+RETRY_MAX_ATTEMPTS = int(os.environ.get('RETRY_MAX_ATTEMPTS', '5'))
+RETRY_BASE_DELAY = float(os.environ.get('RETRY_BASE_DELAY', '30'))
+RETRY_MAX_DELAY = float(os.environ.get('RETRY_MAX_DELAY', '3600'))
+RETRY_BATCH_SIZE = int(os.environ.get('RETRY_BATCH_SIZE', '500'))
+
+# 발송 중 상태로 이 시간(초) 이상 남은 항목은 작업자 중단으로 보고 다시 대기 상태로 돌림
+RETRY_STALE_SECONDS = 600
+
+# 재시도 대상 오류 코드 (청크 요청이 429/5xx로 실패하거나 요청을 보내기 전 연결에 실패하면 HttpError로 기록됨)
+RETRYABLE_ERROR_CODES = {'RateLimitError', 'ServerError', 'HttpError'}
+
+def _connect(path=None):
+    conn = sqlite3.connect(path or RETRY_QUEUE_PATH, timeout=30, isolation_level=None)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS retry_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id TEXT,
+            recipient TEXT NOT NULL,
+            message TEXT NOT NULL,
+            error_code TEXT,
+            last_error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending',
+            next_attempt_at REAL NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_retry_due ON retry_queue (status, next_attempt_at)")
+    return conn
+
+def is_retryable(failed):
+    """실패 항목이 재시도 대상인지 확인합니다."""
+    return failed.get('errorCode') in RETRYABLE_ERROR_CODES
+
+def backoff_delay(attempts):
+    """시도 횟수에 따른 지수 백오프 + 지터 대기 시간(초)을 계산합니다."""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** max(0, attempts - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def enqueue_failures(messages, failed_messages, campaign_id=None, path=None):
+    """
+    발송 실패 목록 중 재시도 가능한 항목을 원본 메시지와 함께 큐에 저장합니다.
+    저장된 항목 수를 반환합니다.
+    """
+    if not RETRY_QUEUE_ENABLED or not failed_messages:
+        return 0
+
+    # 실패 항목에는 수신번호만 있으므로 원본 메시지를 번호로 찾음
+    messages_by_to = {}
+    for message in messages:
+        messages_by_to.setdefault(message.get('to'), message)
+
+    now = time.time()
+    rows = []
+    for failed in failed_messages:
+        if not is_retryable(failed):
+            continue
+        message = messages_by_to.get(failed.get('to'))
+        if not message:
+            continue
+        rows.append((
+            campaign_id,
+            message.get('to'),
+            json.dumps(message, ensure_ascii=False),
+            failed.get('errorCode'),
+            failed.get('errorMessage', ''),
+            1,
+            now + backoff_delay(1),
+            now,
+            now
+        ))
+
+    if not rows:
+        return 0
+
+    with closing(_connect(path)) as conn:
+        conn.executemany("""
+            INSERT INTO retry_queue
+                (campaign_id, recipient, message, error_code, last_error, attempts, next_attempt_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    print(f"재시도 큐 저장: {len(rows)}건 (캠페인: {campaign_id})")
+    return len(rows)
+
+def _claim_due(conn, limit, now):
+    """발송 시점이 된 항목을 발송 중 상태로 바꾸고 반환합니다."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "UPDATE retry_queue SET status = 'pending' WHERE status = 'sending' AND updated_at < ?",
+            (now - RETRY_STALE_SECONDS,)
+        )
+        rows = conn.execute("""
+            SELECT id, recipient, message, attempts FROM retry_queue
+            WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY next_attempt_at
+            LIMIT ?
+        """, (now, limit)).fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE retry_queue SET status = 'sending', updated_at = ? WHERE id = ?",
+                [(now, row[0]) for row in rows]
+            )
+        conn.execute("COMMIT")
+        return rows
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def drain(api_key, api_secret, send_fn, limit=None, path=None):
+    """
+    재시도 시점이 된 항목을 send_fn(send_many_messages 형식)으로 다시 발송하고
+    성공/재시도 예약/최종 실패 결과를 기록합니다.
+    """
+    now = time.time()
+    with closing(_connect(path)) as conn:
+        rows = _claim_due(conn, limit or RETRY_BATCH_SIZE, now)
+        if not rows:
+            return {'processed': 0, 'sent': 0, 'rescheduled': 0, 'failed': 0}
+
+        print(f"재시도 발송 시작: {len(rows)}건")
+        messages = [json.loads(row[2]) for row in rows]
+
+        try:
+            result = send_fn(api_key, api_secret, messages)
+        except Exception as e:
+            result = {'error': str(e), 'errorCode': 'RequestError'}
+
+        # 수신번호별 실패 정보 - 요청 자체가 실패하면 전부 청크 오류 코드(errorCode)로 처리
+        if not isinstance(result, dict) or 'error' in result:
+            error = result.get('error') if isinstance(result, dict) else str(result)
+            error_code = (result.get('errorCode') if isinstance(result, dict) else None) or 'RequestError'
+            failures = {row[1]: {'errorCode': error_code, 'errorMessage': str(error)} for row in rows}
+        else:
+            failures = {f.get('to'): f for f in result.get('failedMessageList') or []}
+
+        sent = rescheduled = failed = 0
+        updates = []
+        finished_at = time.time()
+        for row_id, recipient, _, attempts in rows:
+            failure = failures.get(recipient)
+            if failure is None:
+                updates.append(('sent', None, None, attempts, finished_at, finished_at, row_id))
+                sent += 1
+            elif is_retryable(failure) and attempts < RETRY_MAX_ATTEMPTS:
+                updates.append((
+                    'pending', failure.get('errorCode'), failure.get('errorMessage', ''),
+                    attempts + 1, finished_at + backoff_delay(attempts + 1), finished_at, row_id
+                ))
+                rescheduled += 1
+            else:
+                updates.append((
+                    'failed', failure.get('errorCode'), failure.get('errorMessage', ''),
+                    attempts, finished_at, finished_at, row_id
+                ))
+                failed += 1
+
+        conn.executemany("""
+            UPDATE retry_queue
+            SET status = ?, error_code = COALESCE(?, error_code), last_error = COALESCE(?, last_error),
+                attempts = ?, next_attempt_at = ?, updated_at = ?
+            WHERE id = ?
+        """, updates)
+
+    print(f"재시도 발송 완료: 성공 {sent}건, 재예약 {rescheduled}건, 최종 실패 {failed}건")
+    return {'processed': len(rows), 'sent': sent, 'rescheduled': rescheduled, 'failed': failed}
+
+def stats(path=None):
+    """상태별 항목 수를 반환합니다."""
+    with closing(_connect(path)) as conn:
+        rows = conn.execute("SELECT status, COUNT(*) FROM retry_queue GROUP BY status").fetchall()
+    return {status: count for status, count in rows}
+
+def run_worker(api_key, api_secret, send_fn, poll_interval=5, path=None):
+    """로컬 환경에서 큐를 계속 비우는 작업자 루프입니다."""
+    print(f"재시도 작업자 시작: {path or RETRY_QUEUE_PATH}")
+    while True:
+        result = drain(api_key, api_secret, send_fn, path=path)
+        if not result['processed']:
+            time.sleep(poll_interval)
+
+if __name__ == '__main__':
+    from lambda_update import send_many_messages
+    run_worker(os.environ.get('API_KEY', ''), os.environ.get('API_SECRET', ''), send_many_messages)
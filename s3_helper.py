@@ -10,6 +10,12 @@ AWS_SECRET_KEY = os.environ.get('MY_AWS_SECRET_KEY')
 AWS_BUCKET_NAME = os.environ.get('MY_AWS_BUCKET_NAME', 'solapi-files')
 AWS_REGION = os.environ.get('MY_AWS_REGION', 'ap-northeast-2')
 
+# 업로드 파일 키 접두사 (Lambda는 이 접두사 아래의 객체만 읽음)
+UPLOAD_PREFIX = os.environ.get('MY_AWS_UPLOAD_PREFIX', 'uploads/')
+
+# 브라우저 직접 업로드(presigned POST) 최대 파일 크기(바이트)
+PRESIGNED_UPLOAD_MAX_SIZE = int(os.environ.get('PRESIGNED_UPLOAD_MAX_SIZE', str(50 * 1024 * 1024)))
+
 def get_s3_client():
     """S3 클라이언트 객체를 반환합니다."""
     return boto3.client(
@@ -24,7 +30,7 @@ def upload_file_to_s3(local_file_path, s3_file_key=None):
     if s3_file_key is None:
         # 고유한 파일 이름 생성
         file_ext = os.path.splitext(local_file_path)[1]
-        s3_file_key = f"uploads/{uuid.uuid4()}{file_ext}"
+        s3_file_key = f"{UPLOAD_PREFIX}{uuid.uuid4()}{file_ext}"
     
     try:
         s3_client = get_s3_client()
@@ -45,7 +51,7 @@ def upload_fileobj_to_s3(file_obj, original_filename=None):
     try:
         s3_client = get_s3_client()
         file_ext = os.path.splitext(original_filename)[1] if original_filename else '.bin'
-        s3_file_key = f"uploads/{uuid.uuid4()}{file_ext}"
+        s3_file_key = f"{UPLOAD_PREFIX}{uuid.uuid4()}{file_ext}"
         
         s3_client.upload_fileobj(file_obj, AWS_BUCKET_NAME, s3_file_key)
         
@@ -57,6 +63,14 @@ def upload_fileobj_to_s3(file_obj, original_filename=None):
     except Exception as e:
         return False, str(e), None
 
+def is_upload_key(s3_file_key):
+    """업로드 접두사 아래의 객체 키인지 확인합니다."""
+    return (
+        isinstance(s3_file_key, str)
+        and s3_file_key.startswith(UPLOAD_PREFIX)
+        and '..' not in s3_file_key
+    )
+
 def download_file_from_s3(s3_file_key, local_file_path):
     """S3에서 파일을 다운로드합니다."""
     try:
@@ -96,4 +110,24 @@ def generate_presigned_url(s3_file_key, expiration=3600):
         )
         return True, url
     except Exception as e:
-        return False, str(e) 
\ No newline at end of file
+        return False, str(e)
+
+def generate_presigned_upload(original_filename=None, expiration=900, max_size=None):
+    """브라우저가 S3에 직접 업로드할 수 있는 presigned POST 정보(url, fields)와 객체 키를 생성합니다."""
+    try:
+        s3_client = get_s3_client()
+        file_ext = os.path.splitext(original_filename)[1] if original_filename else '.bin'
+        s3_file_key = f"{UPLOAD_PREFIX}{uuid.uuid4()}{file_ext}"
+        
+        # 업로드 크기를 S3 정책으로 제한
+        post = s3_client.generate_presigned_post(
+            AWS_BUCKET_NAME,
+            s3_file_key,
+            Conditions=[['content-length-range', 1, max_size or PRESIGNED_UPLOAD_MAX_SIZE]],
+            ExpiresIn=expiration
+        )
+        return True, post, s3_file_key
+    except NoCredentialsError:
+        return False, "AWS 자격 증명이 올바르지 않습니다.", None
+    except Exception as e:
+        return False, str(e), None 
\ No newline at end of file
@@ -0,0 +1,88 @@
+import os
+import base64
+import hashlib
+import tempfile
+from flask import Request, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# 업로드 수신 설정
+# 요청 1건의 최대 크기(바이트) - Content-Length로 먼저 확인하고, 수신 중에도 파일별로 확인
+UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', str(50 * 1024 * 1024)))
+# 이 크기(바이트)까지는 메모리에 두고, 넘으면 임시 파일로 옮김
+UPLOAD_SPOOL_SIZE = int(os.environ.get('UPLOAD_SPOOL_SIZE', str(1024 * 1024)))
+
+# 업로드 파일을 나누어 읽는 단위 (base64 인코딩이 청크 경계에서 끊기지 않도록 3의 배수)
+READ_CHUNK_SIZE = 3 * 256 * 1024
+
+class HashingSpooledFile(tempfile.SpooledTemporaryFile):
+    """
+    multipart 본문을 청크 단위로 받아 쓰는 임시 파일.
+    쓰는 동안 SHA-256을 계산하고 최대 크기를 넘으면 바로 수신을 중단합니다.
+    """
+
+    def __init__(self, limit=None, spool_size=None):
+        super().__init__(max_size=spool_size or UPLOAD_SPOOL_SIZE, mode='w+b')
+        self.limit = limit or UPLOAD_MAX_SIZE
+        self.size = 0
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            raise RequestEntityTooLarge()
+        self.hash.update(data)
+        return super().write(data)
+
+    @property
+    def sha256(self):
+        return self.hash.hexdigest()
+
+class StreamingRequest(Request):
+    """업로드 파일을 HashingSpooledFile로 수신하는 요청 클래스"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingSpooledFile()
+
+def init_app(app):
+    """Flask 앱에 스트리밍 업로드 수신을 설정합니다."""
+    app.request_class = StreamingRequest
+    app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_SIZE
+
+    @app.before_request
+    def receive_uploads():
+        # 라우트의 일반 예외 처리보다 먼저 본문을 받아 크기 초과를 413으로 응답
+        if request.mimetype == 'multipart/form-data':
+            request.files
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def upload_too_large(error):
+        return jsonify({
+            'success': False,
+            'message': f'업로드 파일이 너무 큽니다. (최대 {UPLOAD_MAX_SIZE // (1024 * 1024)}MB)'
+        }), 413
+
+def file_info(file):
+    """업로드 파일의 크기와 SHA-256을 반환합니다. (수신 중 계산된 값)"""
+    stream = file.stream
+    if isinstance(stream, HashingSpooledFile):
+        return stream.size, stream.sha256
+
+    # 다른 경로로 만들어진 파일 객체는 나누어 읽으며 계산
+    digest = hashlib.sha256()
+    size = 0
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(READ_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    stream.seek(0)
+    return size, digest.hexdigest()
+
+def read_base64(file):
+    """업로드 파일을 나누어 읽으며 base64 문자열로 인코딩합니다. (원본 전체 복사본을 만들지 않음)"""
+    stream = file.stream
+    stream.seek(0)
+    encoded = [
+        base64.b64encode(chunk).decode('ascii')
+        for chunk in iter(lambda: stream.read(READ_CHUNK_SIZE), b'')
+    ]
+    return ''.join(encoded)